@@ -3,7 +3,7 @@ Admin configuration for accounts app.
 """
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User
+from .models import User, RevokedRefreshToken
 
 
 @admin.register(User)
@@ -14,3 +14,11 @@ class UserAdmin(BaseUserAdmin):
     search_fields = ('username', 'email')
     ordering = ('username',)
 
+
+
+@admin.register(RevokedRefreshToken)
+class RevokedRefreshTokenAdmin(admin.ModelAdmin):
+    """Admin interface for the refresh-token blacklist."""
+    list_display = ('jti', 'expires_at')
+    search_fields = ('jti',)
+    ordering = ('-expires_at',)
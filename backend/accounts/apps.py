@@ -6,3 +6,5 @@ class AccountsConfig(AppConfig):
     name = 'accounts'
     verbose_name = 'Аккаунты'
 
+    def ready(self):
+        import accounts.signals  # noqa
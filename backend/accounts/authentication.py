@@ -0,0 +1,94 @@
+"""
+JWT authentication that resolves users from a short-TTL cache.
+"""
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+User = get_user_model()
+
+
+def _user_key(user_id):
+    return f'accounts:user:{user_id}'
+
+
+def _version_key(user_id):
+    return f'accounts:user_version:{user_id}'
+
+
+def get_cached_user(user_id):
+    """Cached user for the id, or None if missing or stale."""
+    entries = cache.get_many([_user_key(user_id), _version_key(user_id)])
+    version = entries.get(_version_key(user_id))
+    cached = entries.get(_user_key(user_id))
+    if version is None or cached is None or cached[0] != version:
+        return None
+    return cached[1]
+
+
+def user_version(user_id):
+    """The user's current version stamp, created if missing."""
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), uuid.uuid4().hex, timeout=None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def cache_user(user, version):
+    """
+    Store the user under `version`, which must be read with user_version()
+    before the user is loaded from the database.
+    """
+    cache.set(_user_key(user.pk), (version, user), timeout=settings.AUTH_USER_CACHE_TTL)
+
+
+def invalidate_user(user_id):
+    """
+    Bump the user's version stamp so every cached copy becomes stale.
+    A request that loaded the user before this change stores it under the
+    stamp it read before loading, so its copy is stale as well.
+    """
+    cache.set(_version_key(user_id), uuid.uuid4().hex, timeout=None)
+    cache.delete(_user_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that avoids the per-request user query.
+
+    Users are cached for AUTH_USER_CACHE_TTL seconds keyed on their id and a
+    version stamp that is bumped on every User save or delete, so password
+    changes and deactivation take effect on the next request. Changes that
+    bypass signals (queryset.update) are honoured once the TTL expires.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            # Метка читается до загрузки: изменение между ними сделает эту копию устаревшей
+            version = user_version(user_id)
+            user = super().get_user(validated_token)
+            cache_user(user, version)
+            return user
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+        return user
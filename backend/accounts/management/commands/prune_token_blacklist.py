@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from accounts.tokens import prune
+
+
+class Command(BaseCommand):
+    help = 'Delete blacklisted refresh tokens that have already expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Количество записей, удаляемых за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено истекших записей: {deleted}'))
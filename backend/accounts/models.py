@@ -31,3 +31,26 @@ class User(AbstractUser):
         """Check if user is authorized (not guest and not staff/admin)."""
         return not self.is_guest and not self.is_staff
 
+
+
+class RevokedRefreshToken(models.Model):
+    """
+    Compact refresh-token blacklist: only the jti and its expiry are kept,
+    and rows are pruned once the token would have expired anyway.
+    """
+    jti = models.CharField(
+        max_length=64,
+        primary_key=True,
+        verbose_name='JTI'
+    )
+    expires_at = models.DateTimeField(
+        db_index=True,
+        verbose_name='Истекает'
+    )
+
+    class Meta:
+        verbose_name = 'Отозванный refresh-токен'
+        verbose_name_plural = 'Отозванные refresh-токены'
+
+    def __str__(self):
+        return self.jti
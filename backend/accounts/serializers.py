@@ -4,7 +4,11 @@ Serializers for accounts app.
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from games.models import UserProfile
+from .tokens import RefreshToken
 
 User = get_user_model()
 
@@ -70,3 +74,30 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'profile', 'date_joined')
         read_only_fields = ('id', 'date_joined',)
 
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    """
+    Refresh serializer using the compact blacklist.
+    With rotation, the old token is revoked by a single primary-key INSERT
+    that doubles as the reuse check, instead of a lookup followed by a write.
+    """
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        rotate = api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION
+        try:
+            # При ротации подпись и срок проверяются без обращения к БД, затем токен атомарно отзывается
+            refresh = self.token_class(attrs['refresh'], check_blacklist=not rotate)
+            if rotate:
+                refresh.blacklist()
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
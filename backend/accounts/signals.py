@@ -0,0 +1,16 @@
+"""
+Signals for accounts app.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.contrib.auth import get_user_model
+from .authentication import invalidate_user
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the cached copy used by CachedJWTAuthentication."""
+    invalidate_user(instance.pk)
@@ -0,0 +1,75 @@
+"""
+Refresh tokens backed by the compact RevokedRefreshToken blacklist.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+from .models import RevokedRefreshToken
+
+
+def _expires_at(token):
+    return datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+
+
+def revoke(token):
+    """
+    Atomically blacklist the token's jti.
+
+    Returns False if it was already revoked, which makes "check and revoke"
+    a single INSERT on the primary key, safe against concurrent reuse.
+    """
+    try:
+        with transaction.atomic():
+            RevokedRefreshToken.objects.create(
+                jti=token[api_settings.JTI_CLAIM],
+                expires_at=_expires_at(token),
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def is_revoked(token):
+    return RevokedRefreshToken.objects.filter(pk=token[api_settings.JTI_CLAIM]).exists()
+
+
+def prune(batch_size=10000):
+    """Delete blacklist rows for tokens that have expired. Returns the count."""
+    deleted = 0
+    while True:
+        expired = list(
+            RevokedRefreshToken.objects.filter(expires_at__lt=timezone.now())
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not expired:
+            return deleted
+        deleted += RevokedRefreshToken.objects.filter(pk__in=expired).delete()[0]
+
+
+class RefreshToken(BaseRefreshToken):
+    """RefreshToken whose verify() honours the RevokedRefreshToken blacklist."""
+
+    def __init__(self, token=None, verify=True, check_blacklist=True):
+        # check_blacklist=False используется при ротации: проверку выполняет сам blacklist()
+        self._check_blacklist = check_blacklist
+        super().__init__(token, verify)
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+        if self._check_blacklist:
+            self.check_blacklist()
+
+    def check_blacklist(self):
+        if is_revoked(self):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        """Revoke this token; raises TokenError if it was already revoked."""
+        if not revoke(self):
+            raise TokenError(_("Token is blacklisted"))
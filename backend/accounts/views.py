@@ -1,16 +1,21 @@
 """
 Views for accounts app - authentication and user management.
 """
+from functools import partial
+
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from reaction_game.replicas import ReplicaReadMixin
+from reaction_game.throttling import LoginThrottle, RegisterThrottle
 from .serializers import (
     UserRegistrationSerializer,
     UserProfileSerializer,
     UserSerializer
 )
+from games import versions
 from games.models import UserProfile
 
 User = get_user_model()
@@ -34,6 +39,7 @@ class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserRegistrationSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [RegisterThrottle]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -67,15 +73,20 @@ class LoginView(TokenObtainPairView):
     Returns JWT tokens on successful authentication.
     """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LoginThrottle]
 
 
-class ProfileView(generics.RetrieveUpdateAPIView):
+class ProfileView(versions.VersionedResponseMixin, generics.RetrieveUpdateAPIView):
     """
     Get and update user profile.
     Only authenticated users can access their own profile.
     """
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    version_resources = (versions.PROFILE,)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.versioned(request, partial(super().retrieve, request, *args, **kwargs))
 
     def get_object(self):
         profile, created = UserProfile.objects.get_or_create(user=self.request.user)
@@ -90,7 +101,7 @@ class ProfileView(generics.RetrieveUpdateAPIView):
         return Response(serializer.data)
 
 
-class UserDetailView(generics.RetrieveAPIView):
+class UserDetailView(ReplicaReadMixin, generics.RetrieveAPIView):
     """
     Get public user information.
     Can be accessed by anyone (read-only).
@@ -0,0 +1,332 @@
+"""
+Achievement rule evaluation shared by views, serializers and commands.
+
+A requirement JSON maps to exactly one rule, resolved in the same order as
+GameSessionViewSet._meets_requirement: score, then reaction, then games,
+then streak. History-wide statistics combine the recent raw sessions with
+the SessionRollup rows older sessions were compacted into.
+"""
+import logging
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, IntegerField, Max, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from . import versions
+from .models import Achievement, GameSession, PlayerStreak, SessionRollup, UserAchievement
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+MIN_SCORE = 'min_score'
+MAX_REACTION_TIME = 'max_reaction_time'
+MIN_GAMES = 'min_games'
+MIN_STREAK = 'min_streak'
+
+# Значения по умолчанию совпадают с _meets_requirement
+DEFAULT_TARGETS = {
+    MIN_SCORE: 500,
+    MAX_REACTION_TIME: 500,
+    MIN_GAMES: 3,
+    MIN_STREAK: 3,
+}
+
+# Какую статистику из user_stats() использует каждое правило
+RULE_STATS = {
+    MIN_SCORE: 'best_score',
+    MAX_REACTION_TIME: 'best_reaction_time',
+    MIN_GAMES: 'games_played',
+    MIN_STREAK: 'best_streak',
+}
+
+
+def resolve_rule(requirement):
+    """Return (rule, target) for a requirement, or (None, None) if it has no rule."""
+    if not requirement:
+        return None, None
+    achievement_type = requirement.get('achievement_type')
+    if achievement_type == 'high_score' or MIN_SCORE in requirement:
+        rule = MIN_SCORE
+    elif achievement_type == 'fast_reaction' or MAX_REACTION_TIME in requirement:
+        rule = MAX_REACTION_TIME
+    elif achievement_type == 'games_played' or MIN_GAMES in requirement:
+        rule = MIN_GAMES
+    elif achievement_type == 'streak' or MIN_STREAK in requirement:
+        rule = MIN_STREAK
+    else:
+        return None, None
+    return rule, requirement.get(rule, DEFAULT_TARGETS[rule])
+
+
+def _best(pick, *values):
+    values = [value for value in values if value is not None]
+    return pick(values) if values else None
+
+
+def _user_aggregate(queryset, aggregate):
+    """Correlated subquery: `aggregate` over the outer user's rows of `queryset`."""
+    return Subquery(
+        queryset.filter(user_id=OuterRef('pk'))
+        .order_by()
+        .values('user_id')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+
+
+def user_stats(user):
+    """
+    Every statistic any rule needs, in one query: the user's row with
+    aggregates over their recent sessions, compacted rollups and streak
+    as correlated subqueries.
+    """
+    row = User.objects.filter(pk=user.pk).values(
+        games_played=(
+            Coalesce(_user_aggregate(GameSession.objects.filter(is_completed=True), Count('id')), 0, output_field=IntegerField())
+            + Coalesce(_user_aggregate(SessionRollup.objects, Sum('completed_count')), 0, output_field=IntegerField())
+        ),
+        recent_score=_user_aggregate(GameSession.objects, Max('score')),
+        rolled_score=_user_aggregate(SessionRollup.objects, Max('best_score')),
+        recent_reaction_time=_user_aggregate(GameSession.objects, Min('avg_reaction_time')),
+        rolled_reaction_time=_user_aggregate(SessionRollup.objects, Min('best_reaction_time')),
+        best_streak=Coalesce(Subquery(PlayerStreak.objects.filter(user_id=OuterRef('pk')).values('best_streak')[:1]), 0),
+    ).get()
+    # GREATEST/LEAST по-разному обрабатывают NULL в PostgreSQL и SQLite, поэтому выбор здесь
+    return {
+        'games_played': row['games_played'],
+        'best_score': _best(max, row['recent_score'], row['rolled_score']),
+        'best_reaction_time': _best(min, row['recent_reaction_time'], row['rolled_reaction_time']),
+        'best_streak': row['best_streak'],
+    }
+
+
+def games_played(user):
+    """Completed games across recent sessions and compacted rollups."""
+    recent = GameSession.objects.filter(user=user, is_completed=True).count()
+    rolled = SessionRollup.objects.filter(user=user).aggregate(total=Sum('completed_count'))['total']
+    return recent + (rolled or 0)
+
+
+def is_met(rule, target, current):
+    """Whether the current statistic value satisfies the rule."""
+    if current is None:
+        return False
+    if rule == MAX_REACTION_TIME:
+        return current <= target
+    return current >= target
+
+
+def progress(requirement, stats):
+    """Progress towards a requirement as {'current', 'target', 'percent'}."""
+    rule, target = resolve_rule(requirement)
+    if rule is None:
+        return {'rule': None, 'current': None, 'target': None, 'percent': 0}
+
+    current = stats.get(RULE_STATS[rule])
+    if is_met(rule, target, current):
+        percent = 100
+    elif current is None:
+        percent = 0
+    elif rule == MAX_REACTION_TIME:
+        # Чем меньше время реакции, тем ближе к цели
+        percent = int(target / current * 100) if current else 0
+    else:
+        percent = int(current / target * 100) if target else 0
+    return {
+        'rule': rule,
+        'current': current,
+        'target': target,
+        'percent': max(0, min(percent, 100)),
+    }
+
+
+def _rule_aggregate(rule):
+    if rule == MIN_SCORE:
+        return Max('score')
+    return Min('avg_reaction_time')
+
+
+def _rollup_aggregate(rule):
+    if rule == MIN_SCORE:
+        return Max('best_score')
+    return Min('best_reaction_time')
+
+
+def qualifying_user_ids(achievement, user_id_gt=None, user_id_lte=None):
+    """
+    Ids of users who meet the achievement's rule but have not unlocked it,
+    as one query over recent sessions and compacted rollups. Optionally
+    restricted to a user id range for chunked processing.
+    """
+    rule, target = resolve_rule(achievement.requirement)
+    if rule is None:
+        return GameSession.objects.none().values_list('user_id', flat=True)
+
+    unlocked = UserAchievement.objects.filter(achievement=achievement).values('user_id')
+    if rule == MIN_STREAK:
+        # Серии уже поддерживаются инкрементально, агрегировать сессии не нужно
+        streaks = PlayerStreak.objects.exclude(user_id__in=unlocked).filter(best_streak__gte=target)
+        if user_id_gt is not None:
+            streaks = streaks.filter(user_id__gt=user_id_gt)
+        if user_id_lte is not None:
+            streaks = streaks.filter(user_id__lte=user_id_lte)
+        return streaks.values_list('user_id', flat=True)
+
+    if rule == MIN_GAMES:
+        # Игры складываются из свежих сессий и сверток, поэтому считаем по пользователям
+        recent = (
+            GameSession.objects.filter(user_id=OuterRef('pk'), is_completed=True)
+            .order_by()
+            .values('user_id')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        rolled = (
+            SessionRollup.objects.filter(user_id=OuterRef('pk'))
+            .order_by()
+            .values('user_id')
+            .annotate(total=Sum('completed_count'))
+            .values('total')
+        )
+        users = User.objects.exclude(pk__in=unlocked)
+        if user_id_gt is not None:
+            users = users.filter(pk__gt=user_id_gt)
+        if user_id_lte is not None:
+            users = users.filter(pk__lte=user_id_lte)
+        return (
+            users.annotate(value=(
+                Coalesce(Subquery(recent), 0, output_field=IntegerField())
+                + Coalesce(Subquery(rolled), 0, output_field=IntegerField())
+            ))
+            .filter(value__gte=target)
+            .values_list('pk', flat=True)
+        )
+
+    sessions = GameSession.objects.exclude(user_id__in=unlocked)
+    rollups = SessionRollup.objects.exclude(user_id__in=unlocked)
+    if user_id_gt is not None:
+        sessions = sessions.filter(user_id__gt=user_id_gt)
+        rollups = rollups.filter(user_id__gt=user_id_gt)
+    if user_id_lte is not None:
+        sessions = sessions.filter(user_id__lte=user_id_lte)
+        rollups = rollups.filter(user_id__lte=user_id_lte)
+
+    lookup = 'value__lte' if rule == MAX_REACTION_TIME else 'value__gte'
+    recent = (
+        sessions.order_by()
+        .values('user_id')
+        .annotate(value=_rule_aggregate(rule))
+        .filter(**{lookup: target})
+        .values_list('user_id', flat=True)
+    )
+    rolled_up = (
+        rollups.order_by()
+        .values('user_id')
+        .annotate(value=_rollup_aggregate(rule))
+        .filter(**{lookup: target})
+        .values_list('user_id', flat=True)
+    )
+    return recent.union(rolled_up)
+
+
+def backfill(achievements, chunk_size=5000, batch_size=1000, start_after=0, on_progress=None):
+    """
+    Award achievements to every qualifying user, walking user ids in chunks.
+
+    Awards are inserted with bulk_create(ignore_conflicts=True), so the run
+    is idempotent and can be resumed from any reported checkpoint.
+    Returns the number of awards made; awards that were granted elsewhere
+    while the run was going on are not counted.
+    """
+    achievements = [a for a in achievements if resolve_rule(a.requirement)[0] is not None]
+    last_user_id = _best(
+        max,
+        GameSession.objects.aggregate(last=Max('user_id'))['last'],
+        SessionRollup.objects.aggregate(last=Max('user_id'))['last'],
+    )
+    if not achievements or last_user_id is None:
+        return 0
+
+    awarded = 0
+    lower = start_after
+    while lower < last_user_id:
+        upper = lower + chunk_size
+        awards = []
+        for achievement in achievements:
+            candidates = set(qualifying_user_ids(achievement, lower, upper))
+            if not candidates:
+                continue
+            # Достижение могли выдать после выборки, например при завершении игры
+            held = UserAchievement.objects.filter(achievement=achievement, user_id__in=candidates)
+            candidates.difference_update(held.values_list('user_id', flat=True))
+            awards.extend(UserAchievement(user_id=user_id, achievement=achievement) for user_id in candidates)
+        UserAchievement.objects.bulk_create(awards, batch_size=batch_size, ignore_conflicts=True)
+        versions.bump({award.user_id for award in awards}, versions.ACHIEVEMENTS)
+        awarded += len(awards)
+        lower = upper
+        if on_progress is not None:
+            on_progress(min(upper, last_user_id), last_user_id, awarded)
+    return awarded
+
+
+BACKFILL_LOCK_KEY = 'games:achievement_backfill_lock'
+BACKFILL_STATUS_KEY = 'games:achievement_backfill_status'
+# Блокировка продлевается после каждого диапазона пользователей; если воркер
+# с выдачей погиб, она истекает и выдачу можно запустить снова
+BACKFILL_LOCK_SECONDS = 300
+
+
+def backfill_status():
+    """
+    The last background backfill as a dict with 'state' ('running',
+    'finished', 'failed' or 'interrupted'), 'achievement_ids', 'checkpoint'
+    and 'awarded', or None if there was none.
+    """
+    status = cache.get(BACKFILL_STATUS_KEY)
+    if status is not None and status['state'] == 'running' and cache.get(BACKFILL_LOCK_KEY) is None:
+        # Процесс с выдачей перезапущен посреди работы: блокировка истекла без отчета
+        status = {**status, 'state': 'interrupted'}
+    return status
+
+
+def start_backfill(achievement_ids):
+    """
+    Run backfill() for the given achievements in a background thread, so
+    an admin request does not wait for a walk over every user. One run at
+    a time across processes sharing the cache; progress, completion and
+    failure are logged and kept for backfill_status(). Returns False when
+    another run holds the lock.
+    """
+    if not cache.add(BACKFILL_LOCK_KEY, 1, timeout=BACKFILL_LOCK_SECONDS):
+        return False
+    status = {'state': 'running', 'achievement_ids': achievement_ids, 'checkpoint': 0, 'awarded': 0}
+    cache.set(BACKFILL_STATUS_KEY, status, timeout=None)
+
+    def on_progress(checkpoint, last_user_id, awarded):
+        cache.set(BACKFILL_LOCK_KEY, 1, timeout=BACKFILL_LOCK_SECONDS)
+        status.update(checkpoint=checkpoint, awarded=awarded)
+        cache.set(BACKFILL_STATUS_KEY, status, timeout=None)
+        logger.info(
+            'Achievement backfill %s: users up to id=%d of %d, awarded %d',
+            achievement_ids, checkpoint, last_user_id, awarded,
+        )
+
+    def run():
+        try:
+            awarded = backfill(list(Achievement.objects.filter(pk__in=achievement_ids)), on_progress=on_progress)
+        except Exception as error:
+            logger.exception('Achievement backfill %s failed at user id=%d', achievement_ids, status['checkpoint'])
+            status.update(state='failed', error=str(error))
+        else:
+            logger.info('Achievement backfill %s finished, awarded %d', achievement_ids, awarded)
+            status.update(state='finished', awarded=awarded)
+        finally:
+            connection.close()
+            cache.set(BACKFILL_STATUS_KEY, status, timeout=None)
+            cache.delete(BACKFILL_LOCK_KEY)
+
+    threading.Thread(target=run, name='achievement-backfill', daemon=True).start()
+    return True
@@ -1,18 +1,22 @@
 """
 Admin configuration for games app with XLSX export functionality.
 """
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.http import HttpResponse
 from django.utils import timezone
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment
+from .achievements import backfill_status, start_backfill
 from .models import (
     UserProfile,
     GameSession,
     Leaderboard,
     Achievement,
     UserAchievement,
-    Friendship
+    Friendship,
+    PlayerStreak,
+    ReactionTimeSketch,
+    SessionRollup
 )
 
 
@@ -146,6 +150,49 @@ def export_leaderboard_to_xlsx(modeladmin, request, queryset):
 export_leaderboard_to_xlsx.short_description = "Экспортировать в XLSX"
 
 
+def backfill_selected_achievements(modeladmin, request, queryset):
+    """
+    Выдать выбранные достижения всем пользователям, которые уже выполнили условия.
+
+    Выдача идет в фоне, чтобы запрос не ждал обхода всех пользователей.
+    """
+    achievement_ids = list(queryset.values_list('pk', flat=True))
+    if start_backfill(achievement_ids):
+        modeladmin.message_user(
+            request,
+            f'Выдача {len(achievement_ids)} достижений запущена в фоне, ее состояние показывается '
+            'в списке достижений и пишется в лог. Для больших баз надежнее команда backfill_achievements.'
+        )
+    else:
+        modeladmin.message_user(
+            request, 'Предыдущая выдача достижений еще выполняется, попробуйте позже.', level=messages.WARNING
+        )
+
+
+backfill_selected_achievements.short_description = "Выдать выбранные достижения существующим игрокам"
+
+
+def report_backfill_status(request):
+    """Показать состояние последней фоновой выдачи достижений."""
+    status = backfill_status()
+    if status is None:
+        return
+    ids = ' '.join(str(pk) for pk in status['achievement_ids'])
+    resume = f'Продолжите командой: backfill_achievements {ids} --start-after {status["checkpoint"]}'
+    if status['state'] == 'running':
+        messages.info(
+            request,
+            f'Выдача достижений {ids} выполняется: обработаны пользователи до id={status["checkpoint"]}, '
+            f'выдано {status["awarded"]}.'
+        )
+    elif status['state'] == 'finished':
+        messages.success(request, f'Выдача достижений {ids} завершена, выдано {status["awarded"]}.')
+    elif status['state'] == 'failed':
+        messages.error(request, f'Выдача достижений {ids} завершилась ошибкой: {status["error"]}. {resume}')
+    else:
+        messages.warning(request, f'Выдача достижений {ids} прервана перезапуском процесса. {resume}')
+
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'bio', 'date_of_birth', 'created_at')
@@ -192,6 +239,12 @@ class AchievementAdmin(admin.ModelAdmin):
     list_filter = ('achievement_type', 'created_at')
     search_fields = ('name', 'description')
     readonly_fields = ('created_at', 'updated_at')
+    actions = [backfill_selected_achievements]
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method == 'GET':
+            report_backfill_status(request)
+        return super().changelist_view(request, extra_context)
 
 
 @admin.register(UserAchievement)
@@ -212,3 +265,26 @@ class FriendshipAdmin(admin.ModelAdmin):
     list_filter = ('status', 'created_at')
     search_fields = ('from_user__username', 'to_user__username')
     readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(PlayerStreak)
+class PlayerStreakAdmin(admin.ModelAdmin):
+    list_display = ('user', 'current_streak', 'best_streak', 'last_day')
+    search_fields = ('user__username',)
+    readonly_fields = ('created_at', 'updated_at')
+    ordering = ['-best_streak']
+
+
+@admin.register(ReactionTimeSketch)
+class ReactionTimeSketchAdmin(admin.ModelAdmin):
+    list_display = ('difficulty', 'count', 'updated_at')
+    readonly_fields = ('difficulty', 'data', 'count', 'created_at', 'updated_at')
+
+
+@admin.register(SessionRollup)
+class SessionRollupAdmin(admin.ModelAdmin):
+    list_display = ('user', 'day', 'difficulty', 'sessions_count', 'completed_count', 'best_score')
+    list_filter = ('difficulty', 'day')
+    search_fields = ('user__username',)
+    readonly_fields = ('created_at', 'updated_at')
+    ordering = ['-day']
@@ -0,0 +1,162 @@
+"""
+Columnar export of game sessions for analytics (Parquet or Arrow IPC).
+
+Each worker thread exports one primary-key range into its own file,
+reading rows from a database cursor and writing them one row group at a
+time, so memory is bounded by the row group size. Reaction times are
+kept as list<double> columns and game_state as JSON text. A watermark
+file records the highest exported id so later runs export only new rows.
+
+Ids are taken from a sequence when a row is inserted, not when it
+commits, so a run stops at the newest session that has not changed for
+ANALYTICS_EXPORT_SETTLE_SECONDS. Every lower id was allocated before
+that, and its transaction (a group commit batch, an import chunk) has
+committed unless it stayed open longer than the settle window.
+"""
+import datetime
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from .models import GameSession
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+WATERMARK_FILE = '_watermark.json'
+COLUMNS = (
+    'id', 'user_id', 'user__username', 'created_at', 'updated_at', 'difficulty', 'score',
+    'time_played', 'is_completed', 'avg_reaction_time', 'reaction_times', 'game_state',
+)
+
+
+def schema():
+    return pa.schema([
+        ('id', pa.int64()),
+        ('user_id', pa.int64()),
+        ('username', pa.string()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+        ('updated_at', pa.timestamp('us', tz='UTC')),
+        ('difficulty', pa.dictionary(pa.int8(), pa.string())),
+        ('score', pa.int32()),
+        ('time_played', pa.int32()),
+        ('is_completed', pa.bool_()),
+        ('avg_reaction_time', pa.float64()),
+        ('reaction_times', pa.list_(pa.float64())),
+        ('game_state', pa.string()),
+    ])
+
+
+def read_watermark(directory):
+    path = os.path.join(directory, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['last_id']
+
+
+def write_watermark(directory, last_id):
+    path = os.path.join(directory, WATERMARK_FILE)
+    partial = path + '.partial'
+    with open(partial, 'w', encoding='utf-8') as f:
+        json.dump({'last_id': last_id, 'exported_at': timezone.now().isoformat()}, f)
+    os.replace(partial, path)
+
+
+def split_ranges(lower, upper, parts):
+    """Split the id range (lower, upper] into at most `parts` contiguous ranges."""
+    size = max(1, -(-(upper - lower) // parts))
+    return [(start, min(start + size, upper)) for start in range(lower, upper, size)]
+
+
+def _table(rows, table_schema):
+    columns = list(zip(*rows))
+    columns[11] = [json.dumps(state, ensure_ascii=False) for state in columns[11]]
+    arrays = [pa.array(values, type=field.type) for values, field in zip(columns, table_schema)]
+    return pa.Table.from_arrays(arrays, schema=table_schema)
+
+
+def export_range(path, fmt, lower, upper, row_group_size):
+    """Export sessions with lower < id <= upper to one file. Returns the row count."""
+    table_schema = schema()
+    rows = (
+        GameSession.objects.filter(id__gt=lower, id__lte=upper)
+        .order_by('id')
+        .values_list(*COLUMNS)
+        .iterator(chunk_size=row_group_size)
+    )
+    exported = 0
+    writer = None
+    batch = []
+    try:
+        for row in rows:
+            batch.append(row)
+            if len(batch) < row_group_size:
+                continue
+            writer = writer or _open_writer(path, fmt, table_schema)
+            writer.write_table(_table(batch, table_schema))
+            exported += len(batch)
+            batch.clear()
+        if batch:
+            writer = writer or _open_writer(path, fmt, table_schema)
+            writer.write_table(_table(batch, table_schema))
+            exported += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return exported
+
+
+def _open_writer(path, fmt, table_schema):
+    if fmt == 'parquet':
+        return pq.ParquetWriter(path, table_schema, compression='zstd')
+    return pa.ipc.new_file(path, table_schema)
+
+
+def export_sessions(directory, fmt='parquet', row_group_size=100_000, workers=4, incremental=False, on_file=None):
+    """
+    Export sessions to a run directory under `directory`. Use incremental
+    runs to keep adding to one dataset; a full run belongs in a fresh
+    directory. Returns (run_directory, exported_rows).
+    """
+    os.makedirs(directory, exist_ok=True)
+    lower = read_watermark(directory) if incremental else 0
+    settled = timezone.now() - datetime.timedelta(seconds=settings.ANALYTICS_EXPORT_SETTLE_SECONDS)
+    bounds = GameSession.objects.filter(id__gt=lower).aggregate(
+        first=Min('id'), last=Max('id', filter=Q(updated_at__lt=settled)),
+    )
+    if bounds['last'] is None:
+        return None, 0
+
+    # Каталог запуска назван по диапазону id, повторная выгрузка того же диапазона его перезапишет
+    run_directory = os.path.join(directory, f"ids_{bounds['first']}_{bounds['last']}")
+    os.makedirs(run_directory, exist_ok=True)
+    ranges = split_ranges(bounds['first'] - 1, bounds['last'], workers)
+
+    def run(part):
+        index, (start, end) = part
+        path = os.path.join(run_directory, f'part-{index:03d}{FORMATS[fmt]}')
+        exported = export_range(path, fmt, start, end, row_group_size)
+        if on_file is not None and exported:
+            on_file(path, exported)
+        return exported
+
+    def run_in_worker(part):
+        try:
+            return run(part)
+        finally:
+            # Каждый поток-воркер открывает собственное подключение к БД
+            connections.close_all()
+
+    if len(ranges) == 1:
+        total = run((0, ranges[0]))
+    else:
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            total = sum(pool.map(run_in_worker, enumerate(ranges)))
+    write_watermark(directory, bounds['last'])
+    return run_directory, total
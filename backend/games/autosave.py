@@ -0,0 +1,225 @@
+"""
+Autosave writes of game_state, with an optional write-behind buffer.
+
+write() applies a JSON Patch straight to the row. With AUTOSAVE_BUFFER on,
+patch() keeps the state of sessions that are not completed in one cache
+entry per session instead: repeated saves coalesce (the last state wins)
+and the entry is written to GameSession later - by a flusher thread every
+AUTOSAVE_FLUSH_SECONDS, when the session is updated or completed through
+the API, and at process exit. A save also writes its entry inline once
+the entry holds AUTOSAVE_MAX_PENDING saves or its oldest unflushed save
+is AUTOSAVE_FLUSH_SECONDS old. Only the worker that buffered an entry
+flushes it, so entries expire ENTRY_TTL_FLUSHES flush intervals after
+their last save: a live worker always flushes first, and the state of a
+worker that died is dropped with at most AUTOSAVE_FLUSH_SECONDS (or
+AUTOSAVE_MAX_PENDING saves) of progress instead of lingering unflushed.
+Every flush bumps the sessions version, so conditional GETs of lists do
+not keep answering 304 with the pre-flush rows. retrieve, latest and the
+dashboard overlay buffered state; lists and delta sync see it after the
+flush. Workers must share the cache (CACHE_URL) for saves and reads that
+land on different workers.
+"""
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.fields import DateTimeField
+
+from . import jsonpatch, versions
+from .models import GameSession
+
+logger = logging.getLogger(__name__)
+
+LOCK_SECONDS = 5
+LOCK_WAIT_SECONDS = 1
+ENTRY_TTL_FLUSHES = 2
+
+_lock = threading.Lock()
+_dirty = set()
+_flusher = None
+
+
+class StaleVersion(Exception):
+    """The patch targets an old state_version; `current` is the latest one."""
+
+    def __init__(self, current):
+        super().__init__(current)
+        self.current = current
+
+
+def _key(session_id):
+    return f'games:autosave:{session_id}'
+
+
+@contextmanager
+def _locked(session_id):
+    key = f'games:autosave_lock:{session_id}'
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while not cache.add(key, 1, timeout=LOCK_SECONDS):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f'autosave lock for session {session_id}')
+        time.sleep(0.005)
+    try:
+        yield
+    finally:
+        cache.delete(key)
+
+
+def write(session, version, operations):
+    """Patch the row directly. Returns (new version, updated_at)."""
+    if session.state_version != version:
+        raise StaleVersion(session.state_version)
+    state = jsonpatch.apply(session.game_state, operations)
+    updated_at = timezone.now()
+    # Условие по версии делает запись атомарной проверкой; created_at отсекает лишние секции
+    updated = GameSession.objects.filter(
+        pk=session.pk, created_at=session.created_at, state_version=version
+    ).update(game_state=state, state_version=F('state_version') + 1, updated_at=updated_at)
+    if not updated:
+        raise StaleVersion(GameSession.objects.filter(pk=session.pk).values_list('state_version', flat=True).first())
+    return version + 1, updated_at
+
+
+def _store(session_id, entry):
+    # Время записи - момент сброса, иначе дельта-синхронизация пропустила бы строку
+    updated = GameSession.objects.filter(
+        pk=session_id, created_at=entry['created_at'], state_version__lt=entry['version']
+    ).update(game_state=entry['state'], state_version=entry['version'], updated_at=timezone.now())
+    # update() не шлет post_save: без новой версии списки отвечали бы 304 со старыми строками
+    if updated:
+        versions.bump([entry['user_id']], versions.SESSIONS)
+
+
+def patch(user_id, session_id, version, operations, load):
+    """
+    Patch the buffered state. load() returns the user's session (only the
+    state fields) when nothing is buffered yet. Returns (new version,
+    updated_at), or None for completed sessions, which are written through.
+    """
+    with _locked(session_id):
+        entry = cache.get(_key(session_id))
+        if entry is None or entry['user_id'] != user_id:
+            session = load()
+            if session.is_completed:
+                return None
+            entry = {
+                'user_id': user_id,
+                'created_at': session.created_at,
+                'state': session.game_state,
+                'version': session.state_version,
+                'pending': 0,
+                'since': time.time(),
+            }
+        if entry['version'] != version:
+            raise StaleVersion(entry['version'])
+        entry['state'] = jsonpatch.apply(entry['state'], operations)
+        entry['version'] += 1
+        entry['pending'] += 1
+        entry['updated_at'] = timezone.now()
+
+        if entry['pending'] >= settings.AUTOSAVE_MAX_PENDING or time.time() - entry['since'] >= settings.AUTOSAVE_FLUSH_SECONDS:
+            _store(session_id, entry)
+            cache.delete(_key(session_id))
+            _forget(session_id)
+        else:
+            cache.set(_key(session_id), entry, timeout=ENTRY_TTL_FLUSHES * settings.AUTOSAVE_FLUSH_SECONDS + LOCK_SECONDS)
+            _remember(session_id)
+    return entry['version'], entry['updated_at']
+
+
+def buffered(session_id):
+    """The buffered entry of a session, or None."""
+    if not settings.AUTOSAVE_BUFFER:
+        return None
+    return cache.get(_key(session_id))
+
+
+def overlay(data):
+    """Serialized session with its buffered state, if any."""
+    entry = buffered(data['id'])
+    if entry is None:
+        return data
+    return {
+        **data,
+        'game_state': entry['state'],
+        'state_version': entry['version'],
+        'updated_at': DateTimeField().to_representation(entry['updated_at']),
+    }
+
+
+def absorb(session):
+    """
+    Flush buffered state before a full save of `session` and copy it into
+    the instance, so the save neither loses nor re-versions it.
+    """
+    with _locked(session.pk):
+        entry = cache.get(_key(session.pk))
+        if entry is not None:
+            _store(session.pk, entry)
+            session.game_state = entry['state']
+            session.state_version = entry['version']
+            cache.delete(_key(session.pk))
+    _forget(session.pk)
+
+
+def discard(session_id):
+    cache.delete(_key(session_id))
+    _forget(session_id)
+
+
+def flush(session_id):
+    """Write the buffered state of one session to the database."""
+    with _locked(session_id):
+        entry = cache.get(_key(session_id))
+        if entry is not None:
+            _store(session_id, entry)
+            cache.delete(_key(session_id))
+    _forget(session_id)
+
+
+def flush_dirty():
+    """Flush every session this process buffered. Returns how many."""
+    with _lock:
+        pending = list(_dirty)
+    for session_id in pending:
+        flush(session_id)
+    return len(pending)
+
+
+def reset():
+    with _lock:
+        _dirty.clear()
+
+
+def _forget(session_id):
+    with _lock:
+        _dirty.discard(session_id)
+
+
+def _remember(session_id):
+    global _flusher
+    with _lock:
+        _dirty.add(session_id)
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_periodically, name='autosave-flusher', daemon=True)
+            _flusher.start()
+            atexit.register(flush_dirty)
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(settings.AUTOSAVE_FLUSH_SECONDS)
+        try:
+            flush_dirty()
+        except Exception:
+            # Поток не должен умирать: несброшенные записи останутся в кеше до следующего прохода
+            logger.exception('Autosave flush failed')
+        finally:
+            connections.close_all()
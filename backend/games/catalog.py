@@ -0,0 +1,143 @@
+"""
+In-process snapshot of the achievement catalog.
+
+The catalog is tiny and only changes when an admin edits it, so it is
+serialized once and served from memory. A version token stored in the
+cache lets every worker notice edits made by another process. Without a
+shared cache (CACHE_URL) the token expires after CACHE_LOCAL_TTL, so other
+workers rebuild their snapshot at least that often (see
+reaction_game/caching.py).
+"""
+import hashlib
+import json
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import serializers
+
+from reaction_game import caching
+
+from .models import Achievement, UserAchievement
+
+VERSION_CACHE_KEY = 'games:achievement_catalog:version'
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+class CatalogSnapshot:
+    """Immutable serialized view of all achievements at a given version."""
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.rows = rows
+        self.by_id = {row['id']: row for row in rows}
+        payload = json.dumps(rows, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        self.digest = hashlib.sha256(payload).hexdigest()
+
+    def etag(self, variant=''):
+        """Strong ETag for a representation of this snapshot."""
+        if variant:
+            variant_hash = hashlib.sha256(variant.encode('utf-8')).hexdigest()[:16]
+            return f'"{self.digest[:32]}-{variant_hash}"'
+        return f'"{self.digest[:32]}"'
+
+    def filter(self, achievement_type=None, search=''):
+        """Apply the same filtering as DjangoFilterBackend + SearchFilter."""
+        rows = self.rows
+        if achievement_type:
+            rows = [row for row in rows if row['achievement_type'] == achievement_type]
+        terms = search.replace('\x00', '').replace(',', ' ').split()
+        for term in terms:
+            term = term.casefold()
+            rows = [
+                row for row in rows
+                if term in row['name'].casefold() or term in row['description'].casefold()
+            ]
+        return rows
+
+
+def _current_version():
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=caching.coherence_timeout())
+        version = cache.get(VERSION_CACHE_KEY)
+    return version
+
+
+def _build(version):
+    # Imported here to avoid a circular import with serializers using the catalog
+    from .serializers import AchievementSerializer
+
+    achievements = Achievement.objects.all()
+    rows = [dict(row) for row in AchievementSerializer(achievements, many=True).data]
+    return CatalogSnapshot(version, rows)
+
+
+def get_snapshot():
+    """Return the current catalog, rebuilding it only if the version changed."""
+    global _snapshot
+    version = _current_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = _build(version)
+        return _snapshot
+
+
+def invalidate():
+    """Publish a new catalog version and drop the local snapshot."""
+    global _snapshot
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=caching.coherence_timeout())
+    with _lock:
+        _snapshot = None
+
+
+def max_age():
+    """Public max-age of catalog responses, bounded by how long workers may lag."""
+    return caching.bounded(settings.ACHIEVEMENT_CATALOG_MAX_AGE)
+
+
+def with_absolute_icon(row, request=None):
+    """Match ImageField output, which is absolute when a request is in context."""
+    if request is not None and row['icon']:
+        row = dict(row, icon=request.build_absolute_uri(row['icon']))
+    return row
+
+
+def unlocked_rows(user, changed_since=None):
+    """The user's unlocked achievement links, newest first, in one small query."""
+    links = UserAchievement.objects.filter(user=user)
+    if changed_since is not None:
+        links = links.filter(updated_at__gte=changed_since)
+    return list(
+        links.order_by('-unlocked_at')
+        .values_list('id', 'achievement_id', 'unlocked_at', 'created_at')
+    )
+
+
+def user_achievements(user, request=None, changed_since=None):
+    """UserAchievementSerializer-shaped rows joined against the catalog snapshot."""
+    snapshot = get_snapshot()
+    datetime_field = serializers.DateTimeField()
+    data = []
+    for pk, achievement_id, unlocked_at, created_at in unlocked_rows(user, changed_since):
+        achievement = snapshot.by_id.get(achievement_id)
+        if achievement is None:
+            continue
+        data.append({
+            'id': pk,
+            'achievement': with_absolute_icon(achievement, request),
+            'unlocked_at': datetime_field.to_representation(unlocked_at),
+            'created_at': datetime_field.to_representation(created_at),
+        })
+    return data
+
+
+def unlocked_achievements(user, request=None):
+    """Catalog rows for every achievement the user has unlocked."""
+    return [row['achievement'] for row in user_achievements(user, request)]
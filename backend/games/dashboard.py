@@ -0,0 +1,135 @@
+"""
+Startup bundle for the frontend: profile, latest session, unlocked
+achievements, leaderboard top and pending friend requests in one response.
+
+Every section carries a version derived from the stamps conditional GET
+already uses (see games/versions.py), the catalog snapshot and the
+leaderboard top token, all read before any query runs. The client sends
+back the versions it holds in ?known=section:version,... and sections
+that did not change are left out of the payload. The remaining sections
+are independent reads of one or two rows each; with DASHBOARD_PARALLEL
+they run concurrently on a shared thread pool. It is off by default:
+every thread opens its own database connection, so the option only pays
+off when database round trips are slow compared to connecting.
+"""
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+from accounts.serializers import UserProfileSerializer
+
+from . import autosave, catalog, leaderboard, versions
+from .models import Friendship, GameSession, UserProfile
+from .sync import FRIENDSHIP_PLAN, SESSION_PLAN
+
+SECTIONS = ('profile', 'latest_session', 'achievements', 'leaderboard_top', 'friend_requests')
+TOP_LIMIT_MAX = 100
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _profile(user, request, top):
+    try:
+        profile = UserProfile.objects.get(user=user)
+    except UserProfile.DoesNotExist:
+        # Профиль создается сигналом при регистрации; сводка только читает и не создает его
+        profile = UserProfile(user=user)
+    # Пользователь уже загружен аутентификацией, сериализатору не нужен второй запрос
+    profile.user = user
+    return UserProfileSerializer(profile, context={'request': request}).data
+
+
+def _latest_session(user, request, top):
+    rows = SESSION_PLAN.render(SESSION_PLAN.values(GameSession.objects.filter(user=user))[:1])
+    return autosave.overlay(rows[0]) if rows else None
+
+
+def _achievements(user, request, top):
+    return catalog.user_achievements(user, request)
+
+
+def _leaderboard_top(user, request, top):
+    return leaderboard.top(*top)
+
+
+def _friend_requests(user, request, top):
+    return FRIENDSHIP_PLAN.render(FRIENDSHIP_PLAN.values(Friendship.objects.filter(to_user=user, status='pending')))
+
+
+BUILDERS = {
+    'profile': _profile,
+    'latest_session': _latest_session,
+    'achievements': _achievements,
+    'leaderboard_top': _leaderboard_top,
+    'friend_requests': _friend_requests,
+}
+
+
+def _digest(*parts):
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def section_versions(user, request, top):
+    """Version of every section for the user; reads only the cache."""
+    profile, profile_all, sessions, sessions_all, unlocked, unlocked_all, friends, friends_all = versions.stamps(
+        user.pk, (versions.PROFILE, versions.SESSIONS, versions.ACHIEVEMENTS, versions.FRIENDS)
+    )
+    # Аватары и иконки отдаются абсолютными ссылками, поэтому хост входит в версию
+    host = request.build_absolute_uri('/')
+    difficulty, limit = top
+    return {
+        'profile': _digest(profile, profile_all, host),
+        'latest_session': _digest(sessions, sessions_all),
+        'achievements': _digest(unlocked, unlocked_all, catalog.get_snapshot().version, host),
+        'leaderboard_top': _digest(leaderboard.top_version(), difficulty or '', str(limit)),
+        'friend_requests': _digest(friends, friends_all),
+    }
+
+
+def parse_known(value):
+    """Section versions the client holds, from 'section:version,...'."""
+    known = {}
+    for item in value.split(','):
+        section, _, version = item.strip().partition(':')
+        if section in BUILDERS and version:
+            known[section] = version
+    return known
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.DASHBOARD_WORKERS, thread_name_prefix='dashboard')
+    return _executor
+
+
+def _in_worker(build, *args):
+    try:
+        return build(*args)
+    finally:
+        # Подключение потока закрывается сразу после секции, чтобы не копить их в простаивающих потоках
+        connections.close_all()
+
+
+def build(user, request, known=None, top=(None, 10)):
+    """Dashboard payload: 'versions' plus every section not in `known`."""
+    current = section_versions(user, request, top)
+    known = known or {}
+    pending = [name for name in SECTIONS if known.get(name) != current[name]]
+    payload = {'versions': current}
+    args = (user, request, top)
+    if settings.DASHBOARD_PARALLEL and len(pending) > 1:
+        # Первая секция читается в потоке запроса его же подключением
+        futures = {name: _pool().submit(_in_worker, BUILDERS[name], *args) for name in pending[1:]}
+        payload[pending[0]] = BUILDERS[pending[0]](*args)
+        for name, future in futures.items():
+            payload[name] = future.result()
+    else:
+        for name in pending:
+            payload[name] = BUILDERS[name](*args)
+    return payload
@@ -0,0 +1,98 @@
+"""
+Streaming personal data export.
+
+A user's complete history is produced as NDJSON, one typed record per
+line, read through .iterator() so rows are never all held in memory.
+The output can be gzip-compressed on the fly as it is streamed.
+"""
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+from .models import Friendship, GameSession, SessionRollup, UserAchievement
+
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+SESSION_FIELDS = (
+    'id', 'created_at', 'updated_at', 'difficulty', 'score', 'time_played',
+    'is_completed', 'reaction_times', 'avg_reaction_time', 'game_state',
+)
+ROLLUP_FIELDS = (
+    'day', 'difficulty', 'sessions_count', 'completed_count', 'best_score',
+    'best_completed_score', 'best_reaction_time', 'reaction_sum', 'reaction_count',
+)
+
+
+def _typed(record_type, rows):
+    for row in rows:
+        yield {'type': record_type, **row}
+
+
+def user_records(user):
+    """Every record of the user's export, in a stable order."""
+    profile = getattr(user, 'profile', None)
+    yield {
+        'type': 'user',
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'date_joined': user.date_joined,
+        'bio': profile.bio if profile else '',
+        'date_of_birth': profile.date_of_birth if profile else None,
+        'avatar': profile.avatar.name if profile and profile.avatar else None,
+    }
+    yield from _typed('session', (
+        GameSession.objects.filter(user=user)
+        .order_by('created_at', 'id')
+        .values(*SESSION_FIELDS)
+        .iterator(chunk_size=CHUNK_SIZE)
+    ))
+    yield from _typed('session_rollup', (
+        SessionRollup.objects.filter(user=user)
+        .order_by('day', 'difficulty')
+        .values(*ROLLUP_FIELDS)
+        .iterator(chunk_size=CHUNK_SIZE)
+    ))
+    yield from _typed('achievement', (
+        UserAchievement.objects.filter(user=user)
+        .order_by('unlocked_at', 'id')
+        .values('achievement_id', 'unlocked_at', name=F('achievement__name'))
+        .iterator(chunk_size=CHUNK_SIZE)
+    ))
+    yield from _typed('friendship', (
+        Friendship.objects.filter(Q(from_user=user) | Q(to_user=user))
+        .order_by('created_at', 'id')
+        .values('id', 'status', 'created_at', 'updated_at', from_username=F('from_user__username'), to_username=F('to_user__username'))
+        .iterator(chunk_size=CHUNK_SIZE)
+    ))
+
+
+def ndjson(records):
+    """Encode records as NDJSON, yielding about FLUSH_BYTES at a time."""
+    buffer = []
+    size = 0
+    for record in records:
+        line = json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False).encode() + b'\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield b''.join(buffer)
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks):
+    """Compress a byte stream into a gzip stream chunk by chunk."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
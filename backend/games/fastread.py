@@ -0,0 +1,92 @@
+"""
+Lightweight read path for hot list endpoints.
+
+A ValuesPlan is compiled once from a serializer class: for every readable
+field it keeps the output name, the ORM lookup for its source and the
+field's own to_representation. List pages are then fetched with
+.values_list() and converted row by row, skipping model instantiation and
+per-row attribute traversal while producing the same output as the
+serializer. Fields whose source is an object (e.g. StringRelatedField)
+need an explicit lookup of a column with the same string representation.
+ISO 8601 datetimes, the most expensive field, resolve their timezone once
+per page rather than once per value.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601
+from rest_framework.fields import DateTimeField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+def _converter(field):
+    """field.to_representation, or an equivalent bound to the current timezone."""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if not isinstance(field, DateTimeField) or not isinstance(output_format, str) or output_format.lower() != ISO_8601:
+        return field.to_representation
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if timezone.is_naive(value):
+            return field.to_representation(value)
+        try:
+            text = value.astimezone(field_timezone).isoformat()
+        except OverflowError:
+            return field.to_representation(value)
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+class ValuesPlan:
+    """Precompiled mapping from .values_list() rows to serializer output."""
+
+    def __init__(self, serializer_class, lookups=None):
+        self.serializer_class = serializer_class
+        self.lookups = lookups or {}
+        self._compiled = None
+
+    def _compile(self):
+        if self._compiled is None:
+            names, lookups, fields = [], [], []
+            for field in self.serializer_class()._readable_fields:
+                lookup = self.lookups.get(field.field_name) or '__'.join(field.source_attrs)
+                if not lookup:
+                    raise ImproperlyConfigured(
+                        f'{self.serializer_class.__name__}.{field.field_name}: нужен lookup для ValuesPlan'
+                    )
+                names.append(field.field_name)
+                lookups.append(lookup)
+                fields.append(field)
+            self._compiled = (tuple(lookups), tuple(names), tuple(fields))
+        return self._compiled
+
+    def values(self, queryset):
+        """The queryset narrowed to the plan's columns, in field order."""
+        lookups, _, _ = self._compile()
+        return queryset.values_list(*lookups)
+
+    def render(self, rows):
+        """Serializer output for rows from values(); None skips conversion like DRF."""
+        _, names, fields = self._compile()
+        fields = tuple(zip(names, map(_converter, fields)))
+        return [
+            {name: None if value is None else convert(value) for (name, convert), value in zip(fields, row)}
+            for row in rows
+        ]
+
+
+class ValuesListMixin:
+    """
+    Viewset mixin: list() is served through values_plan instead of the
+    serializer. Filtering, ordering and pagination work as before.
+    """
+    values_plan = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.values_plan.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.values_plan.render(page))
+        return Response(self.values_plan.render(queryset))
@@ -0,0 +1,68 @@
+"""
+JSONField that stores large values compressed.
+
+Values whose JSON encoding reaches GAME_STATE_COMPRESS_THRESHOLD bytes are
+saved as {"$zlib": "<base64 of zlib-compressed JSON>"} in the same jsonb
+column and unpacked on load, so reads through the ORM (serializers,
+.values_list(), exports, archives) see the original value. The column
+stays valid JSON: COPY loads, partition archives and rows written before
+compression was enabled keep working. A value that already has the
+wrapper's shape is always packed, so every wrapper read back was written
+by pack(). Key lookups (game_state__level) do not see packed values.
+"""
+import base64
+import json
+import zlib
+
+from django.conf import settings
+from django.db import models
+from django.db.models import expressions
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - необязательная зависимость
+    orjson = None
+
+MARKER = '$zlib'
+
+
+def is_packed(value):
+    return isinstance(value, dict) and len(value) == 1 and isinstance(value.get(MARKER), str)
+
+
+def pack(value, encoder=None):
+    """The value itself when small, otherwise its compressed wrapper."""
+    raw = None
+    if orjson is not None and encoder is None:
+        try:
+            raw = orjson.dumps(value)
+        except orjson.JSONEncodeError:
+            pass
+    if raw is None:
+        raw = json.dumps(value, cls=encoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    wrap = is_packed(value)
+    if len(raw) < settings.GAME_STATE_COMPRESS_THRESHOLD and not wrap:
+        return value
+    packed = base64.b64encode(zlib.compress(raw, settings.GAME_STATE_COMPRESS_LEVEL)).decode('ascii')
+    # Несжимаемое состояние выгоднее хранить как есть
+    if len(packed) >= len(raw) and not wrap:
+        return value
+    return {MARKER: packed}
+
+
+def unpack(value, decoder=None):
+    if not is_packed(value):
+        return value
+    return json.loads(zlib.decompress(base64.b64decode(value[MARKER])), cls=decoder)
+
+
+class PackedJSONField(models.JSONField):
+    """models.JSONField with transparent compression of large values (see pack())."""
+
+    def from_db_value(self, value, expression, connection):
+        return unpack(super().from_db_value(value, expression, connection), self.decoder)
+
+    def get_db_prep_save(self, value, connection):
+        if value is not None and not hasattr(value, 'as_sql') and not isinstance(value, expressions.Value):
+            value = pack(value, self.encoder)
+        return super().get_db_prep_save(value, connection)
@@ -0,0 +1,250 @@
+"""
+Bulk import of game session history from NDJSON or CSV.
+
+Records are streamed from the input and loaded in fixed-size chunks, so
+memory stays constant. avg_reaction_time is computed for a whole chunk at
+once with NumPy, matching GameSession.save(). PostgreSQL loads each chunk
+with COPY FROM STDIN; other backends fall back to a batched INSERT.
+"""
+import csv
+import io
+import itertools
+import json
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import versions
+from .fields import pack
+from .models import GameSession
+from .pgcopy import copy_from
+
+User = get_user_model()
+
+DIFFICULTIES = {choice for choice, _ in GameSession.DIFFICULTY_CHOICES}
+COLUMNS = (
+    'user_id', 'game_state', 'score', 'difficulty', 'time_played', 'is_completed',
+    'reaction_times', 'avg_reaction_time', 'created_at', 'updated_at',
+)
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+MAX_REPORTED_ERRORS = 100
+
+
+def read_records(stream, fmt):
+    """
+    Yield (line_number, record) pairs from an NDJSON or CSV text stream.
+    NDJSON lines are yielded unparsed so a bad line only skips that record.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(stream, 1):
+        if line.strip():
+            yield line_number, line
+
+
+def _json_value(value, default):
+    if value is None or value == '':
+        return default
+    # В CSV составные поля передаются как JSON-строки
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _int_value(value, name):
+    if value is None or value == '':
+        return 0
+    number = int(value)
+    if number < 0:
+        raise ValueError(f'{name} не может быть отрицательным')
+    return number
+
+
+def clean(record, now):
+    """Validate one input record into a row dict; raises ValueError."""
+    difficulty = record.get('difficulty') or 'easy'
+    if difficulty not in DIFFICULTIES:
+        raise ValueError(f'неизвестный уровень сложности {difficulty!r}')
+
+    reaction_times = _json_value(record.get('reaction_times'), [])
+    if not isinstance(reaction_times, list) or not all(
+        isinstance(value, (int, float)) and not isinstance(value, bool) for value in reaction_times
+    ):
+        raise ValueError('reaction_times должен быть списком чисел')
+
+    created_at = record.get('created_at')
+    if created_at:
+        created_at = parse_datetime(created_at) if isinstance(created_at, str) else None
+        if created_at is None:
+            raise ValueError('некорректная дата created_at')
+        if timezone.is_naive(created_at):
+            created_at = timezone.make_aware(created_at)
+    else:
+        created_at = now
+
+    is_completed = record.get('is_completed', False)
+    if isinstance(is_completed, str):
+        is_completed = is_completed.strip().lower() in TRUE_VALUES
+
+    avg_reaction_time = record.get('avg_reaction_time')
+    return {
+        'user_id': record.get('user_id') or None,
+        'username': record.get('username') or None,
+        'game_state': _json_value(record.get('game_state'), {}),
+        'score': _int_value(record.get('score'), 'score'),
+        'difficulty': difficulty,
+        'time_played': _int_value(record.get('time_played'), 'time_played'),
+        'is_completed': bool(is_completed),
+        'reaction_times': reaction_times,
+        'avg_reaction_time': float(avg_reaction_time) if avg_reaction_time not in (None, '') else None,
+        'created_at': created_at,
+    }
+
+
+def average_reaction_times(reaction_lists):
+    """Mean of each list (None for empty lists) in one vectorized pass."""
+    lengths = np.fromiter((len(values) for values in reaction_lists), dtype=np.int64, count=len(reaction_lists))
+    flat = np.fromiter(itertools.chain.from_iterable(reaction_lists), dtype=np.float64, count=int(lengths.sum()))
+    nonempty = lengths > 0
+    sums = np.zeros(len(reaction_lists))
+    if flat.size:
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        # Пустые списки не занимают места в flat, поэтому сегменты непустых идут подряд
+        sums[nonempty] = np.add.reduceat(flat, offsets[nonempty])
+    averages = np.divide(sums, lengths, out=np.zeros_like(sums), where=nonempty)
+    return [float(avg) if has_values else None for avg, has_values in zip(averages, nonempty)]
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _resolve_users(rows, skip):
+    """Map usernames to ids and drop rows whose user does not exist."""
+    usernames = {row['username'] for row in rows if row['user_id'] is None and row['username']}
+    by_name = dict(User.objects.filter(username__in=usernames).values_list('username', 'id')) if usernames else {}
+    for row in rows:
+        if row['user_id'] is None:
+            row['user_id'] = by_name.get(row['username'])
+        else:
+            row['user_id'] = _as_id(row['user_id'])
+    ids = {row['user_id'] for row in rows if row['user_id'] is not None}
+    known = set(User.objects.filter(pk__in=ids).values_list('pk', flat=True)) if ids else set()
+
+    resolved = []
+    for row in rows:
+        if row['user_id'] in known:
+            resolved.append(row)
+        else:
+            skip(row['line'], 'пользователь не найден')
+    return resolved
+
+
+def _copy_chunk(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            row['user_id'],
+            json.dumps(pack(row['game_state']), ensure_ascii=False),
+            row['score'],
+            row['difficulty'],
+            row['time_played'],
+            't' if row['is_completed'] else 'f',
+            json.dumps(row['reaction_times']),
+            row['avg_reaction_time'],
+            row['created_at'].isoformat(),
+            row['updated_at'].isoformat(),
+        ])
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        table = GameSession._meta.db_table
+        copy_from(cursor, f'COPY {table} ({", ".join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def _insert_chunk(rows):
+    # bulk_create перезаписал бы created_at через auto_now_add, поэтому вставляем
+    # параметризованным executemany с теми же преобразованиями значений, что и ORM
+    adapt = connection.ops.adapt_datetimefield_value
+    table = GameSession._meta.db_table
+    placeholders = ', '.join(['%s'] * len(COLUMNS))
+    params = [
+        (
+            row['user_id'],
+            json.dumps(pack(row['game_state']), ensure_ascii=False),
+            row['score'],
+            row['difficulty'],
+            row['time_played'],
+            row['is_completed'],
+            json.dumps(row['reaction_times']),
+            row['avg_reaction_time'],
+            adapt(row['created_at']),
+            adapt(row['updated_at']),
+        )
+        for row in rows
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {table} ({", ".join(COLUMNS)}) VALUES ({placeholders})', params)
+
+
+def load_chunk(rows):
+    """Insert one chunk of cleaned rows in a single transaction."""
+    averages = average_reaction_times([row['reaction_times'] for row in rows])
+    # Дельта-синхронизация смотрит назад лишь на SYNC_OVERLAP_SECONDS, поэтому updated_at
+    # ставится непосредственно перед транзакцией чанка, а не в начале всего импорта
+    now = timezone.now()
+    for row, avg in zip(rows, averages):
+        row['updated_at'] = now
+        if avg is not None:
+            row['avg_reaction_time'] = avg
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            _copy_chunk(rows)
+        else:
+            _insert_chunk(rows)
+        versions.bump({row['user_id'] for row in rows}, versions.SESSIONS)
+
+
+def import_sessions(stream, fmt='ndjson', chunk_size=10000, on_progress=None):
+    """
+    Stream records into GameSession. Returns (imported, skipped, errors,
+    user_ids): errors holds the first MAX_REPORTED_ERRORS (line, message)
+    pairs for skipped records, user_ids the users who got completed sessions.
+    """
+    imported = skipped = 0
+    errors = []
+    user_ids = set()
+    now = timezone.now()
+
+    def skip(line_number, message):
+        nonlocal skipped
+        skipped += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append((line_number, message))
+
+    records = read_records(stream, fmt)
+    while batch := list(itertools.islice(records, chunk_size)):
+        rows = []
+        for line_number, record in batch:
+            try:
+                row = clean(json.loads(record) if isinstance(record, str) else record, now)
+            except (ValueError, TypeError, AttributeError) as exc:
+                skip(line_number, str(exc))
+                continue
+            row['line'] = line_number
+            rows.append(row)
+        rows = _resolve_users(rows, skip)
+        if rows:
+            load_chunk(rows)
+            imported += len(rows)
+            user_ids.update(row['user_id'] for row in rows if row['is_completed'])
+        if on_progress is not None:
+            on_progress(imported, skipped)
+    return imported, skipped, errors, user_ids
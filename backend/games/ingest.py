@@ -0,0 +1,206 @@
+"""
+Group commit of completed game sessions.
+
+With SESSION_GROUP_COMMIT on, GameSessionViewSet hands completed sessions
+to submit() instead of saving them itself. A flusher thread collects the
+queued sessions for up to SESSION_GROUP_COMMIT_DELAY_MS after the first
+one arrives (or until SESSION_GROUP_COMMIT_MAX_ROWS are queued) and writes
+the whole batch in one transaction: one bulk INSERT of the sessions, the
+leaderboard maxima and streaks applied set-wise, then a single commit. A
+request thread blocks in submit() until its batch has committed, so the
+client is only acknowledged once its session is durable. If a batch fails
+its sessions are retried one transaction each, so a bad row only fails
+its own request.
+
+The queue lives in the process: it batches the concurrent requests of one
+worker (threaded runserver/gunicorn gthread). Sessions still queued when
+the process dies were never acknowledged; their clients retry.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from . import leaderboard, sketches, streaks, versions
+from .models import GameSession, Leaderboard, PlayerStreak
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue()
+_lock = threading.Lock()
+_flusher = None
+
+
+def enabled():
+    # Без RETURNING у пакетной вставки сессии остались бы без id для ответа
+    return settings.SESSION_GROUP_COMMIT and connection.features.can_return_rows_from_bulk_insert
+
+
+def submit(game_session):
+    """Queue an unsaved completed session and wait until it is committed."""
+    future = Future()
+    _start()
+    _queue.put((game_session, future))
+    return future.result()
+
+
+def commit(batch):
+    """
+    Write a batch of (session, future) pairs in one transaction and resolve
+    the futures. Falls back to one transaction per session on failure.
+    """
+    try:
+        _write([game_session for game_session, _ in batch])
+    except Exception:
+        if len(batch) == 1:
+            raise
+        logger.exception('Group commit of %d sessions failed, retrying one by one', len(batch))
+        for item in batch:
+            _commit_one(item)
+        return
+    _committed(batch)
+
+
+def _commit_one(item):
+    game_session, future = item
+    # Откаченная пачка уже выдала сессии id
+    game_session.pk = None
+    game_session._state.adding = True
+    try:
+        _write([game_session])
+    except Exception as error:
+        future.set_exception(error)
+    else:
+        _committed([item])
+
+
+def _committed(batch):
+    sessions = [game_session for game_session, _ in batch]
+    try:
+        # bulk_create не шлет post_save, поэтому версии и скетчи обновляются здесь
+        versions.bump({game_session.user_id for game_session in sessions}, versions.SESSIONS)
+        for game_session in sessions:
+            sketches.record(game_session.difficulty, game_session.avg_reaction_time)
+    except Exception:
+        # Сессии уже в БД: ошибка кеша или скетча не должна превращаться в повторную вставку
+        logger.exception('Post-commit update of %d sessions failed', len(sessions))
+    for game_session, future in batch:
+        future.set_result(game_session)
+
+
+def _write(sessions):
+    for game_session in sessions:
+        # Как GameSession.save(): bulk_create его не вызывает
+        if game_session.reaction_times and isinstance(game_session.reaction_times, list):
+            game_session.avg_reaction_time = sum(game_session.reaction_times) / len(game_session.reaction_times)
+
+    with transaction.atomic():
+        GameSession.objects.bulk_create(sessions)
+        _raise_records(sessions)
+        _advance_streaks(sessions)
+
+
+def _raise_records(sessions):
+    """Leaderboard maxima for the batch, with the rules of perform_create()."""
+    best = {}
+    for game_session in sessions:
+        key = (game_session.user_id, game_session.difficulty)
+        if key not in best or game_session.score > best[key].score:
+            best[key] = game_session
+
+    existing = {}
+    entries = (
+        Leaderboard.objects.select_for_update()
+        .filter(user_id__in={user_id for user_id, _ in best})
+        .order_by('score')
+    )
+    for entry in entries:
+        existing[(entry.user_id, entry.difficulty)] = entry
+
+    now = timezone.now()
+    created, raised = [], []
+    for key, game_session in best.items():
+        entry = existing.get(key)
+        if entry is None:
+            created.append(Leaderboard(
+                user_id=game_session.user_id,
+                difficulty=game_session.difficulty,
+                score=game_session.score,
+                avg_reaction_time=game_session.avg_reaction_time,
+            ))
+        elif game_session.score > entry.score:
+            entry.score = game_session.score
+            entry.avg_reaction_time = game_session.avg_reaction_time
+            entry.date_achieved = game_session.created_at
+            entry.updated_at = now
+            raised.append(entry)
+
+    # bulk_create не вызывает Leaderboard.save(): ранг новой записи считается так же, по числу очков выше
+    for entry in created:
+        entry.rank = Leaderboard.objects.filter(difficulty=entry.difficulty, score__gt=entry.score).count() + 1
+    Leaderboard.objects.bulk_create(created)
+    Leaderboard.objects.bulk_update(raised, ['score', 'avg_reaction_time', 'date_achieved', 'updated_at'])
+    if created or raised:
+        transaction.on_commit(leaderboard.invalidate_top)
+
+
+def _advance_streaks(sessions):
+    """streaks.record_session() for the batch: one locked read and one write."""
+    user_ids = {game_session.user_id for game_session in sessions}
+    rows = PlayerStreak.objects.select_for_update().filter(user_id__in=user_ids)
+    current = {streak.user_id: streak for streak in rows}
+    missing = user_ids - current.keys()
+    if missing:
+        PlayerStreak.objects.bulk_create([PlayerStreak(user_id=user_id) for user_id in missing], ignore_conflicts=True)
+        current.update((streak.user_id, streak) for streak in rows.filter(user_id__in=missing))
+
+    now = timezone.now()
+    changed = {}
+    for game_session in sessions:
+        streak = current[game_session.user_id]
+        if streak.advance(streaks.session_day(game_session)):
+            streak.updated_at = now
+            changed[streak.user_id] = streak
+        # Кешируем на пользователе, как record_session(), для проверки достижений
+        game_session.user.streak = streak
+    PlayerStreak.objects.bulk_update(changed.values(), ['current_streak', 'best_streak', 'last_day', 'updated_at'])
+
+
+def _collect():
+    batch = [_queue.get()]
+    deadline = time.monotonic() + settings.SESSION_GROUP_COMMIT_DELAY_MS / 1000
+    while len(batch) < settings.SESSION_GROUP_COMMIT_MAX_ROWS:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(_queue.get(timeout=timeout))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _start():
+    global _flusher
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_forever, name='session-group-commit', daemon=True)
+            _flusher.start()
+
+
+def _flush_forever():
+    while True:
+        batch = _collect()
+        # Как в цикле запроса: соединение переиспользуется с учетом CONN_MAX_AGE и проверок здоровья
+        close_old_connections()
+        try:
+            commit(batch)
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
@@ -0,0 +1,133 @@
+"""
+RFC 6902 JSON Patch applied to decoded JSON values.
+
+apply() runs the operations in order against the document and returns the
+result; the document may be modified in place, so callers pass a value
+they own. Any failing operation (bad pointer, missing member, failed
+"test") raises PatchError and the whole patch is rejected.
+"""
+import copy
+
+OPERATIONS = ('add', 'remove', 'replace', 'move', 'copy', 'test')
+
+
+class PatchError(ValueError):
+    """The patch document is malformed or cannot be applied."""
+
+
+def parse_pointer(pointer):
+    """RFC 6901 reference tokens of a JSON Pointer."""
+    if not isinstance(pointer, str):
+        raise PatchError('Путь должен быть строкой JSON Pointer.')
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise PatchError(f'Некорректный JSON Pointer: {pointer!r}.')
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _index(container, token, allow_end=False):
+    if allow_end and token == '-':
+        return len(container)
+    if not token.isdigit() or (token != '0' and token.startswith('0')):
+        raise PatchError(f'Некорректный индекс массива: {token!r}.')
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f'Индекс {index} вне массива.')
+    return index
+
+
+def _resolve(document, tokens):
+    for token in tokens:
+        if isinstance(document, dict):
+            if token not in document:
+                raise PatchError(f'Ключ {token!r} не найден.')
+            document = document[token]
+        elif isinstance(document, list):
+            document = document[_index(document, token)]
+        else:
+            raise PatchError(f'Нельзя перейти к {token!r} внутри скалярного значения.')
+    return document
+
+
+def _parent(document, tokens):
+    if not tokens:
+        raise PatchError('Операция требует непустой путь.')
+    parent = _resolve(document, tokens[:-1])
+    if not isinstance(parent, (dict, list)):
+        raise PatchError('Родитель пути не является объектом или массивом.')
+    return parent, tokens[-1]
+
+
+def _add(document, tokens, value):
+    if not tokens:
+        return value
+    parent, token = _parent(document, tokens)
+    if isinstance(parent, list):
+        parent.insert(_index(parent, token, allow_end=True), value)
+    else:
+        parent[token] = value
+    return document
+
+
+def _remove(document, tokens):
+    parent, token = _parent(document, tokens)
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, token))
+    if token not in parent:
+        raise PatchError(f'Ключ {token!r} не найден.')
+    return parent.pop(token)
+
+
+def equal(left, right):
+    """JSON equality: unlike ==, true is not 1 and 1.0 equals 1."""
+    if isinstance(left, bool) or isinstance(right, bool):
+        return type(left) is type(right) and left == right
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(equal(value, right[key]) for key, value in left.items())
+    if isinstance(left, list) and isinstance(right, list):
+        return len(left) == len(right) and all(equal(a, b) for a, b in zip(left, right))
+    if isinstance(left, (int, float)) and isinstance(right, (int, float)):
+        return left == right
+    return type(left) is type(right) and left == right
+
+
+def _value(operation):
+    if 'value' not in operation:
+        raise PatchError(f'Операция {operation["op"]!r} требует поле value.')
+    return operation['value']
+
+
+def apply(document, operations):
+    """The document with every operation applied, or PatchError."""
+    if not isinstance(operations, list):
+        raise PatchError('JSON Patch должен быть массивом операций.')
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+            raise PatchError(f'Неизвестная операция: {operation!r}.')
+        op = operation['op']
+        tokens = parse_pointer(operation.get('path'))
+        if op == 'add':
+            document = _add(document, tokens, _value(operation))
+        elif op == 'remove':
+            _remove(document, tokens)
+        elif op == 'replace':
+            value = _value(operation)
+            if tokens:
+                _remove(document, tokens)
+            document = _add(document, tokens, value)
+        elif op == 'test':
+            if not equal(_resolve(document, tokens), _value(operation)):
+                raise PatchError(f'Проверка не прошла для пути {operation["path"]!r}.')
+        else:
+            source = parse_pointer(operation.get('from'))
+            if op == 'move':
+                if tokens[:len(source)] == source and tokens != source:
+                    raise PatchError('Нельзя переместить значение внутрь самого себя.')
+                if tokens == source:
+                    continue
+                value = _remove(document, source)
+            else:
+                value = copy.deepcopy(_resolve(document, source))
+            document = _add(document, tokens, value)
+    return document
@@ -0,0 +1,140 @@
+"""
+Set-wise leaderboard maintenance for bulk loads.
+
+GameSessionViewSet.perform_create keeps the leaderboard current one
+session at a time; after bulk imports rebuild() folds every user's best
+completed session into it with a few set queries and re-ranks the table.
+
+The leaderboard top is cached in the shared cache under a version token
+that every leaderboard write replaces.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import Rank, RowNumber
+from django.utils import timezone
+
+from .fastread import ValuesPlan
+from .models import GameSession, Leaderboard
+from .serializers import LeaderboardSerializer
+
+TOP_VERSION_CACHE_KEY = 'games:leaderboard_top:version'
+TOP_PLAN = ValuesPlan(LeaderboardSerializer)
+
+
+def top_version():
+    version = cache.get(TOP_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(TOP_VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(TOP_VERSION_CACHE_KEY)
+    return version
+
+
+def invalidate_top():
+    cache.set(TOP_VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def cached_top(difficulty, limit, build):
+    """Rows of the leaderboard top from the cache, calling build() on a miss."""
+    key = f'games:leaderboard_top:{top_version()}:{difficulty or ""}:{limit}'
+    rows = cache.get(key)
+    if rows is None:
+        rows = build()
+        cache.set(key, rows, timeout=settings.LEADERBOARD_TOP_CACHE_SECONDS)
+    return rows
+
+
+def top(difficulty=None, limit=10):
+    """Serialized top `limit` leaderboard rows, optionally for one difficulty."""
+    def build():
+        queryset = Leaderboard.objects.select_related('user').all()
+        if difficulty:
+            queryset = queryset.filter(difficulty=difficulty)
+        return TOP_PLAN.render(TOP_PLAN.values(queryset)[:limit])
+
+    return cached_top(difficulty, limit, build)
+
+
+def best_sessions(user_ids=None):
+    """Best completed session per (user, difficulty), earliest first on ties."""
+    sessions = GameSession.objects.filter(is_completed=True)
+    if user_ids is not None:
+        sessions = sessions.filter(user_id__in=user_ids)
+    return (
+        sessions.annotate(position=Window(
+            RowNumber(),
+            partition_by=[F('user_id'), F('difficulty')],
+            order_by=[F('score').desc(), F('created_at').asc()],
+        ))
+        .filter(position=1)
+        .values('user_id', 'difficulty', 'score', 'avg_reaction_time', 'created_at')
+    )
+
+
+def rerank(difficulties, batch_size=1000):
+    """Recompute rank as 1 + number of higher scores, like Leaderboard.save()."""
+    updated = []
+    ranked = (
+        Leaderboard.objects.filter(difficulty__in=difficulties)
+        .annotate(new_rank=Window(Rank(), partition_by=[F('difficulty')], order_by=F('score').desc()))
+        .only('id', 'rank')
+    )
+    for entry in ranked:
+        if entry.rank != entry.new_rank:
+            entry.rank = entry.new_rank
+            updated.append(entry)
+    Leaderboard.objects.bulk_update(updated, ['rank'], batch_size=batch_size)
+    return len(updated)
+
+
+def rebuild(user_ids=None, batch_size=1000):
+    """
+    Raise leaderboard entries to each user's best completed session (never
+    lowering an existing score), create missing entries and re-rank.
+    Returns the number of entries created or raised.
+    """
+    with transaction.atomic():
+        existing = {}
+        entries = Leaderboard.objects.order_by('score')
+        if user_ids is not None:
+            entries = entries.filter(user_id__in=user_ids)
+        for entry in entries:
+            existing[(entry.user_id, entry.difficulty)] = entry
+
+        now = timezone.now()
+        created, raised, difficulties = [], [], set()
+        for best in best_sessions(user_ids).iterator(chunk_size=batch_size):
+            entry = existing.get((best['user_id'], best['difficulty']))
+            if entry is None:
+                created.append(Leaderboard(
+                    user_id=best['user_id'],
+                    difficulty=best['difficulty'],
+                    score=best['score'],
+                    avg_reaction_time=best['avg_reaction_time'],
+                    date_achieved=best['created_at'],
+                ))
+            elif best['score'] > entry.score:
+                entry.score = best['score']
+                entry.avg_reaction_time = best['avg_reaction_time']
+                entry.date_achieved = best['created_at']
+                entry.updated_at = now
+                raised.append(entry)
+            else:
+                continue
+            difficulties.add(best['difficulty'])
+
+        # bulk_create не вызывает save(), ранги выставляет rerank();
+        # auto_now_add перезаписывает date_achieved, поэтому возвращаем дату рекорда отдельно
+        achieved = [entry.date_achieved for entry in created]
+        Leaderboard.objects.bulk_create(created, batch_size=batch_size)
+        for entry, date_achieved in zip(created, achieved):
+            entry.date_achieved = date_achieved
+        Leaderboard.objects.bulk_update(created, ['date_achieved'], batch_size=batch_size)
+        Leaderboard.objects.bulk_update(raised, ['score', 'avg_reaction_time', 'date_achieved', 'updated_at'], batch_size=batch_size)
+        if difficulties:
+            rerank(difficulties, batch_size)
+            transaction.on_commit(invalidate_top)
+    return len(created) + len(raised)
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from games.achievements import backfill
+from games.models import Achievement
+
+
+class Command(BaseCommand):
+    help = 'Award achievements to all existing users who already meet their requirements'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'achievement_ids',
+            nargs='*',
+            type=int,
+            help='ID достижений (по умолчанию все)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Размер диапазона id пользователей на один проход',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета bulk_create',
+        )
+        parser.add_argument(
+            '--start-after',
+            type=int,
+            default=0,
+            help='Продолжить с контрольной точки (id последнего обработанного пользователя)',
+        )
+
+    def handle(self, *args, **options):
+        achievements = Achievement.objects.all()
+        if options['achievement_ids']:
+            achievements = achievements.filter(id__in=options['achievement_ids'])
+            missing = set(options['achievement_ids']) - set(achievements.values_list('id', flat=True))
+            if missing:
+                raise CommandError(f'Достижения не найдены: {sorted(missing)}')
+
+        def report(checkpoint, last_user_id, awarded):
+            self.stdout.write(
+                f'Пользователи до id={checkpoint} из {last_user_id} обработаны, '
+                f'выдано достижений: {awarded} (--start-after {checkpoint})'
+            )
+
+        awarded = backfill(
+            list(achievements),
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+            start_after=options['start_after'],
+            on_progress=report,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Готово! Выдано достижений: {awarded}'))
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from reaction_game import compression
+
+DEFAULT_PATHS = (
+    '/api/games/leaderboard/',
+    '/api/games/leaderboard/top/?limit=100',
+    '/api/games/achievements/',
+    '/api/schema/',
+)
+
+
+class Command(BaseCommand):
+    help = 'Measure compression CPU time against bytes saved for API responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS, help='Замеряемые URL')
+        parser.add_argument('--repeat', type=int, default=5, help='Повторов каждого замера')
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST='localhost')
+        variants = [('gzip', False), ('gzip', True)]
+        if compression.brotli is not None:
+            variants += [('br', False), ('br', True)]
+        else:
+            self.stderr.write(self.style.WARNING('brotli не установлен, замеряется только gzip'))
+
+        self.stdout.write(f'{"URL":<42} {"метод":<10} {"байт":>9} {"сжато":>9} {"экономия":>9} {"мс":>8} {"МБ/с":>8}')
+        for path in options['paths']:
+            response = client.get(path, secure=True)
+            if response.status_code != 200:
+                raise CommandError(f'{path}: код ответа {response.status_code}')
+            content = response.content
+            for encoding, cached in variants:
+                seconds = self._best_of(lambda: compression.compress(content, encoding, cached=cached), options['repeat'])
+                encoded = compression.compress(content, encoding, cached=cached)
+                label = f'{encoding}{" кеш" if cached else ""}'
+                self.stdout.write(
+                    f'{path[:42]:<42} {label:<10} {len(content):>9} {len(encoded):>9} '
+                    f'{100 * (1 - len(encoded) / len(content)):>8.1f}% {seconds * 1000:>8.2f} '
+                    f'{len(content) / seconds / 2 ** 20:>8.1f}'
+                )
+            compression.compress_cached(content, variants[-1][0])
+            hit = self._best_of(lambda: compression.compress_cached(content, variants[-1][0]), options['repeat'])
+            self.stdout.write(f'{"":<42} {"попадание":<10} {"":>9} {"":>9} {"":>9} {hit * 1000:>8.3f}')
+
+    @staticmethod
+    def _best_of(func, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+        return best
@@ -0,0 +1,73 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure request latency and new DB connections under concurrency '
+        'for the current DB_CONN_MODE (run once per mode to compare)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/games/leaderboard/', help='Запрашиваемый URL')
+        parser.add_argument('--requests', type=int, default=500, help='Всего запросов')
+        parser.add_argument('--concurrency', type=int, default=16, help='Число параллельных потоков')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        total = options['requests']
+        concurrency = options['concurrency']
+
+        opened = []
+        lock = threading.Lock()
+
+        def on_connection_created(sender, connection, **kwargs):
+            with lock:
+                opened.append(connection.alias)
+
+        connection_created.connect(on_connection_created)
+
+        latencies = []
+        per_thread = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+
+        def worker(count):
+            client = Client(HTTP_HOST='localhost')
+            local = []
+            for _ in range(count):
+                started = time.perf_counter()
+                # Тестовый клиент отключает close_old_connections, поэтому
+                # жизненный цикл подключения как в WSGI-обработчике воспроизводится вручную
+                close_old_connections()
+                client.get(path, secure=True)
+                close_old_connections()
+                local.append((time.perf_counter() - started) * 1000)
+            with lock:
+                latencies.extend(local)
+            connections.close_all()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(count,)) for count in per_thread]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        connection_created.disconnect(on_connection_created)
+
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        self.stdout.write(f'Режим подключений: {settings.DB_CONN_MODE}')
+        self.stdout.write(f'Запросов: {len(latencies)}, потоков: {concurrency}, время: {elapsed:.2f} c')
+        self.stdout.write(f'Пропускная способность: {len(latencies) / elapsed:.1f} запр/с')
+        self.stdout.write(
+            f'Задержка, мс: p50={statistics.median(latencies):.2f} '
+            f'p95={p95:.2f} max={latencies[-1]:.2f}'
+        )
+        self.stdout.write(self.style.SUCCESS(f'Открыто новых подключений к БД: {len(opened)}'))
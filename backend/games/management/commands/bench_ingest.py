@@ -0,0 +1,103 @@
+import contextlib
+import io
+import random
+import statistics
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from games import ingest, sketches
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test of completed session POSTs: sustained sessions per second and latency '
+        'with a commit per request and with group commit (games/ingest.py)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=10, help='Длительность каждого замера')
+        parser.add_argument('--concurrency', type=int, default=32, help='Число параллельных клиентов')
+        parser.add_argument('--users', type=int, default=200, help='Временных игроков')
+
+    def handle(self, *args, **options):
+        stamp = random.randrange(10 ** 9)
+        users = []
+        for index in range(options['users']):
+            username = f'bench-ingest-{stamp}-{index}'
+            users.append(User.objects.create_user(username=username, email=f'{username}@example.com'))
+
+        try:
+            for label, group_commit in (('Коммит на запрос', False), ('Групповой коммит', True)):
+                with override_settings(SESSION_GROUP_COMMIT=group_commit):
+                    if group_commit and not ingest.enabled():
+                        self.stdout.write(self.style.WARNING('БД не возвращает id из пакетной вставки, групповой коммит недоступен'))
+                        continue
+                    self._report(label, *self._run(users, options['concurrency'], options['seconds']))
+        finally:
+            # Сессии, рекорды и серии удаляются каскадом вместе с временными игроками
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            sketches.reset()
+
+    @staticmethod
+    def _run(users, concurrency, seconds):
+        latencies, errors = [], []
+        lock = threading.Lock()
+        deadline = time.monotonic() + seconds
+
+        def client_loop(number):
+            rng = random.Random(number)
+            client = APIClient(HTTP_HOST='localhost', raise_request_exception=False)
+            local, failed = [], 0
+            while time.monotonic() < deadline:
+                client.force_authenticate(user=rng.choice(users))
+                reaction_times = [round(rng.uniform(150, 900), 1) for _ in range(20)]
+                payload = {
+                    'score': rng.randint(0, 5000),
+                    'difficulty': rng.choice(['easy', 'medium', 'hard']),
+                    'time_played': rng.randint(30, 300),
+                    'is_completed': True,
+                    'reaction_times': reaction_times,
+                    'game_state': {'level': rng.randint(1, 10)},
+                }
+                started = time.perf_counter()
+                # Тестовый клиент не управляет подключениями, цикл WSGI-обработчика воспроизводится вручную
+                close_old_connections()
+                response = client.post('/api/games/sessions/', payload, format='json', secure=True)
+                close_old_connections()
+                if response.status_code == 201:
+                    local.append((time.perf_counter() - started) * 1000)
+                else:
+                    failed += 1
+            with lock:
+                latencies.extend(local)
+                errors.append(failed)
+            connections.close_all()
+
+        threads = [threading.Thread(target=client_loop, args=(number,)) for number in range(concurrency)]
+        started = time.perf_counter()
+        # Проверка достижений печатает диагностику на каждую сессию
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return latencies, sum(errors), time.perf_counter() - started
+
+    def _report(self, label, latencies, errors, elapsed):
+        if not latencies:
+            self.stdout.write(self.style.ERROR(f'{label}: ни одной сессии не сохранено, ошибок: {errors}'))
+            return
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f'{label}: {len(latencies) / elapsed:,.0f} сессий/с ({len(latencies)} за {elapsed:.1f} с, ошибок: {errors}), '
+            f'задержка, мс: p50={statistics.median(latencies):.1f} p95={p95:.1f} max={latencies[-1]:.1f}'
+        )
@@ -0,0 +1,92 @@
+import io
+import json
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from games.models import GameSession
+from games.serializers import GameSessionSerializer
+from reaction_game import fastjson
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare stdlib and fast JSON render/parse/JSONField decode times on a large session list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=5000, help='Сессий в списке')
+        parser.add_argument('--reactions', type=int, default=50, help='Времен реакции в каждой сессии')
+        parser.add_argument('--repeat', type=int, default=5, help='Повторов каждого замера')
+
+    def handle(self, *args, **options):
+        if fastjson.orjson is None:
+            self.stderr.write(self.style.WARNING('orjson не установлен, быстрый путь совпадает с stdlib'))
+
+        payload = self._payload(options['sessions'], options['reactions'])
+        repeat = options['repeat']
+
+        stdlib_body = JSONRenderer().render(payload)
+        fast_body = fastjson.FastJSONRenderer().render(payload)
+        if fast_body != stdlib_body:
+            self.stderr.write(self.style.WARNING('Вывод рендереров отличается'))
+        self.stdout.write(f'Размер ответа: {len(stdlib_body) / 1024:.0f} КБ')
+
+        self._compare('render', repeat, lambda: JSONRenderer().render(payload), lambda: fastjson.FastJSONRenderer().render(payload))
+        self._compare(
+            'parse', repeat,
+            lambda: JSONParser().parse(io.BytesIO(stdlib_body)),
+            lambda: fastjson.FastJSONParser().parse(io.BytesIO(stdlib_body)),
+        )
+        # Так JSONField разбирает значения при чтении из БД
+        column = [json.dumps(session['reaction_times']) for session in payload['results']]
+        self._compare(
+            'JSONField decode', repeat,
+            lambda: [json.loads(value) for value in column],
+            lambda: [json.loads(value, cls=fastjson.FastJSONDecoder) for value in column],
+        )
+
+    def _payload(self, count, reactions):
+        rng = random.Random(42)
+        user = User(id=1, username='bench')
+        now = timezone.now()
+        sessions = [
+            GameSession(
+                id=index,
+                user=user,
+                game_state={'level': rng.randint(1, 30), 'targets': [rng.randint(0, 9) for _ in range(10)], 'mode': 'classic'},
+                score=rng.randint(0, 5000),
+                difficulty=rng.choice(('easy', 'medium', 'hard')),
+                time_played=rng.randint(10, 600),
+                is_completed=rng.random() < 0.7,
+                reaction_times=[round(rng.uniform(150, 900), 3) for _ in range(reactions)],
+                avg_reaction_time=rng.uniform(150, 900),
+                created_at=now - timedelta(minutes=index),
+                updated_at=now,
+            )
+            for index in range(1, count + 1)
+        ]
+        return {'count': count, 'next': None, 'previous': None, 'results': GameSessionSerializer(sessions, many=True).data}
+
+    def _compare(self, label, repeat, stdlib, fast):
+        stdlib_time = self._best_of(stdlib, repeat)
+        fast_time = self._best_of(fast, repeat)
+        self.stdout.write(
+            f'{label}: stdlib {stdlib_time * 1000:.1f} мс, fast {fast_time * 1000:.1f} мс, '
+            f'ускорение x{stdlib_time / fast_time:.1f}'
+        )
+
+    @staticmethod
+    def _best_of(func, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+        return best
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.renderers import JSONRenderer
+
+from games.models import GameSession, Leaderboard
+from games.serializers import GameSessionSerializer, LeaderboardSerializer
+from games.views import GameSessionViewSet, LeaderboardViewSet
+
+ENDPOINTS = {
+    'sessions': (GameSession.objects.select_related('user').order_by('-created_at'), GameSessionSerializer, GameSessionViewSet),
+    'leaderboard': (Leaderboard.objects.select_related('user').order_by('-score'), LeaderboardSerializer, LeaderboardViewSet),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare rows per second of ModelSerializer and .values_list() list pages on existing data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='sessions', help='Какой список замерять')
+        parser.add_argument('--rows', type=int, default=100, help='Строк на странице')
+        parser.add_argument('--pages', type=int, default=50, help='Страниц в одном замере')
+        parser.add_argument('--repeat', type=int, default=3, help='Повторов замера')
+
+    def handle(self, *args, **options):
+        queryset, serializer_class, view_class = ENDPOINTS[options['endpoint']]
+        if options['endpoint'] == 'sessions':
+            # Список сессий всегда отфильтрован по пользователю, берем самого активного
+            busiest = GameSession.objects.values('user').annotate(total=Count('id')).order_by('-total').first()
+            queryset = queryset.filter(user=busiest['user'] if busiest else None)
+        rows = options['rows']
+        pages = options['pages']
+        if queryset.count() < rows * pages:
+            raise CommandError(f'Нужно хотя бы {rows * pages} строк, загрузите данные через import_sessions')
+
+        plan = view_class.values_plan
+        renderer = JSONRenderer()
+
+        def page(index):
+            return slice(index * rows, (index + 1) * rows)
+
+        def serializer_path():
+            return [serializer_class(queryset[page(index)], many=True).data for index in range(pages)]
+
+        def values_path():
+            return [plan.render(plan.values(queryset)[page(index)]) for index in range(pages)]
+
+        if renderer.render(serializer_path()) != renderer.render(values_path()):
+            raise CommandError('Вывод быстрого пути отличается от сериализатора')
+
+        total = rows * pages
+        before = total / self._best_of(serializer_path, options['repeat'])
+        after = total / self._best_of(values_path, options['repeat'])
+        self.stdout.write(f'ModelSerializer: {before:,.0f} строк/с')
+        self.stdout.write(f'ValuesPlan:      {after:,.0f} строк/с (x{after / before:.1f})')
+
+    @staticmethod
+    def _best_of(func, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+        return best
@@ -0,0 +1,96 @@
+import copy
+import json
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from games import autosave, fields, jsonpatch
+from games.models import GameSession
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare request bytes, column bytes and UPDATEs per autosave: full game_state writes, JSON Patch and the write-behind buffer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--targets', type=int, default=500, help='Мишеней в состоянии игры')
+        parser.add_argument('--reactions', type=int, default=200, help='Времен реакции в сессии')
+        parser.add_argument('--saves', type=int, default=200, help='Автосохранений в замере')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        state = {
+            'level': 1,
+            'score': 0,
+            'targets': [
+                {'id': index, 'x': rng.randint(0, 800), 'y': rng.randint(0, 600), 'size': rng.randint(20, 60), 'hit': False}
+                for index in range(options['targets'])
+            ],
+        }
+        reactions = [round(rng.uniform(150, 900), 3) for _ in range(options['reactions'])]
+        saves = [rng.randrange(options['targets']) for _ in range(options['saves'])]
+
+        # Замер пишет во временного пользователя и откатывается целиком
+        with transaction.atomic():
+            username = f'bench-autosave-{rng.randrange(10 ** 9)}'
+            user = User.objects.create_user(username=username, email=f'{username}@example.com')
+            full = self._full(GameSession.objects.create(user=user, game_state=state, reaction_times=reactions), copy.deepcopy(state), saves)
+            patch = self._patch(GameSession.objects.create(user=user, game_state=state, reaction_times=reactions), saves, False)
+            buffered = self._patch(GameSession.objects.create(user=user, game_state=state, reaction_times=reactions), saves, True)
+            transaction.set_rollback(True)
+
+        for label, (request_bytes, column_bytes, elapsed, writes) in (
+            ('Полная запись', full), ('JSON Patch', patch), ('JSON Patch + буфер', buffered),
+        ):
+            self.stdout.write(
+                f'{label}: запрос {request_bytes / len(saves):,.0f} Б, '
+                f'в колонки {column_bytes / len(saves):,.0f} Б, {elapsed * 1000 / len(saves):.2f} мс на автосохранение, '
+                f'UPDATE: {writes}'
+            )
+        self.stdout.write(f'Записано байт меньше в x{full[1] / patch[1]:.1f}, тело запроса меньше в x{full[0] / patch[0]:.1f}')
+        self.stdout.write(f'Буфер сократил число UPDATE в x{patch[3] / max(buffered[3], 1):.1f}')
+
+    @staticmethod
+    def _full(session, state, saves):
+        request_bytes = column_bytes = 0
+        started = time.perf_counter()
+        for target in saves:
+            state['targets'][target]['hit'] = True
+            state['score'] += 10
+            session.game_state = state
+            # Так сохраняет PATCH сессии: тело с полным состоянием, save() пишет все поля строки
+            request_bytes += len(json.dumps({'game_state': state}))
+            column_bytes += len(json.dumps(state)) + len(json.dumps(session.reaction_times))
+            session.save()
+        return request_bytes, column_bytes, time.perf_counter() - started, len(saves)
+
+    @staticmethod
+    def _patch(session, saves, buffered):
+        request_bytes = 0
+        version = session.state_version
+        state = session.game_state
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            for target in saves:
+                operations = [
+                    {'op': 'replace', 'path': f'/targets/{target}/hit', 'value': True},
+                    {'op': 'replace', 'path': '/score', 'value': state['score'] + 10},
+                ]
+                request_bytes += len(json.dumps(operations))
+                state = jsonpatch.apply(state, copy.deepcopy(operations))
+
+                # Как представление state: чтение только полей состояния
+                def load():
+                    return GameSession.objects.only('created_at', 'game_state', 'state_version', 'is_completed').get(pk=session.pk)
+
+                result = autosave.patch(session.user_id, session.pk, version, operations, load) if buffered else None
+                version, _ = result or autosave.write(load(), version, operations)
+            autosave.flush_dirty()
+        writes = sum(query['sql'].startswith('UPDATE') for query in queries.captured_queries)
+        column_bytes = writes * len(json.dumps(fields.pack(state)))
+        return request_bytes, column_bytes, time.perf_counter() - started, writes
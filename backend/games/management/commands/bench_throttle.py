@@ -0,0 +1,94 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import SimpleRateThrottle
+
+from reaction_game.throttling import TokenBucketThrottle
+
+User = get_user_model()
+
+
+class BenchTokenBucket(TokenBucketThrottle):
+    scope = 'bench'
+
+
+class BenchHistoryThrottle(SimpleRateThrottle):
+    """DRF's built-in throttle: a list of request timestamps per client."""
+    scope = 'bench'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': request.user.pk}
+
+
+class Command(BaseCommand):
+    help = (
+        'Cost of one throttle check: token bucket (reaction_game/throttling.py) '
+        'against the DRF request-history throttle, next to the latency of a cheap API request'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=50000, help='Проверок в замере')
+        parser.add_argument('--clients', type=int, default=100, help='Разных клиентов')
+        parser.add_argument('--rate', default='1000/min', help='Предел в формате N/period')
+        parser.add_argument('--concurrency', type=int, default=8, help='Потоков во втором замере')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        requests = []
+        for number in range(options['clients']):
+            request = factory.get('/')
+            request.user = User(pk=10 ** 9 + number, username=f'bench-throttle-{number}')
+            requests.append(request)
+        checks = options['checks']
+        rates = {'REST_FRAMEWORK': {'DEFAULT_THROTTLE_RATES': {'bench': options['rate']}}}
+        BenchHistoryThrottle.rate = options['rate']
+
+        with override_settings(**rates):
+            for label, throttle_class in (('Токен-бакет', BenchTokenBucket), ('История запросов DRF', BenchHistoryThrottle)):
+                cache.clear()
+                single = self._measure(throttle_class, requests, checks, 1)
+                cache.clear()
+                parallel = self._measure(throttle_class, requests, checks, options['concurrency'])
+                self.stdout.write(
+                    f'{label}: {single[0]:.1f} мкс на проверку, {checks / single[1]:,.0f} проверок/с; '
+                    f'{options["concurrency"]} потоков: {checks / parallel[1]:,.0f} проверок/с, '
+                    f'пропущено {single[2]} из {checks}'
+                )
+            self.stdout.write(f'Для сравнения, запрос каталога достижений: {self._request_latency():.0f} мкс')
+        cache.clear()
+
+    @staticmethod
+    def _measure(throttle_class, requests, checks, concurrency):
+        allowed = []
+        lock = threading.Lock()
+
+        def run(count, offset):
+            passed = 0
+            for index in range(count):
+                passed += throttle_class().allow_request(requests[(offset + index) % len(requests)], None)
+            with lock:
+                allowed.append(passed)
+
+        share = checks // concurrency
+        threads = [threading.Thread(target=run, args=(share, number)) for number in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return elapsed * 1_000_000 / (share * concurrency), elapsed, sum(allowed)
+
+    @staticmethod
+    def _request_latency(count=200):
+        client = Client(HTTP_HOST='localhost')
+        client.get('/api/games/achievements/', secure=True)
+        started = time.perf_counter()
+        for _ in range(count):
+            client.get('/api/games/achievements/', secure=True)
+        return (time.perf_counter() - started) * 1_000_000 / count
@@ -0,0 +1,50 @@
+import gzip
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from games.rollups import compact, cutoff
+
+
+class Command(BaseCommand):
+    help = 'Fold game sessions older than the retention period into daily rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=settings.SESSION_RETENTION_DAYS,
+            help='Сворачивать сессии старше указанного числа дней',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество сессий, сворачиваемых за одну транзакцию',
+        )
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            help='Сохранить исходные строки в NDJSON.gz в SESSION_ARCHIVE_DIR перед удалением',
+        )
+
+    def handle(self, *args, **options):
+        before = cutoff(options['older_than_days'])
+        self.stdout.write(f'Сворачиваются сессии до {before:%Y-%m-%d %H:%M %Z}')
+
+        def report(compacted):
+            self.stdout.write(f'Свернуто сессий: {compacted}')
+
+        if not options['archive']:
+            compacted = compact(before, batch_size=options['batch_size'], on_progress=report)
+        else:
+            os.makedirs(settings.SESSION_ARCHIVE_DIR, exist_ok=True)
+            path = os.path.join(
+                settings.SESSION_ARCHIVE_DIR,
+                f'game_sessions_compacted_{timezone.now():%Y%m%d_%H%M%S}.ndjson.gz',
+            )
+            with gzip.open(path, 'wt', encoding='utf-8') as archive:
+                compacted = compact(before, batch_size=options['batch_size'], archive=archive, on_progress=report)
+            self.stdout.write(f'Исходные строки сохранены в {path}')
+        self.stdout.write(self.style.SUCCESS(f'Готово! Свернуто сессий: {compacted}'))
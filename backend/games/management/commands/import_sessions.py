@@ -0,0 +1,64 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from games import leaderboard
+from games.importer import import_sessions
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load game session history from NDJSON or CSV and rebuild leaderboard best scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл с сессиями или "-" для чтения из stdin',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['ndjson', 'csv'],
+            help='Формат входных данных (по умолчанию по расширению файла)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Количество строк, загружаемых за одну транзакцию',
+        )
+        parser.add_argument(
+            '--skip-leaderboard',
+            action='store_true',
+            help='Не пересчитывать таблицу лидеров после загрузки',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        started = time.monotonic()
+
+        def report(imported, skipped):
+            rate = imported / max(time.monotonic() - started, 1e-9)
+            self.stdout.write(f'Загружено: {imported}, пропущено: {skipped} ({rate:.0f} строк/с)')
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        except OSError as exc:
+            raise CommandError(str(exc))
+        with stream:
+            imported, skipped, errors, user_ids = import_sessions(
+                stream, fmt, chunk_size=options['chunk_size'], on_progress=report
+            )
+
+        for line_number, message in errors:
+            self.stderr.write(f'Строка {line_number}: {message}')
+        if skipped > len(errors):
+            self.stderr.write(f'... и еще {skipped - len(errors)} пропущенных строк')
+
+        if user_ids and not options['skip_leaderboard']:
+            changed = leaderboard.rebuild(user_ids)
+            self.stdout.write(f'Записей таблицы лидеров обновлено: {changed}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово! Загружено сессий: {imported}, пропущено: {skipped}. '
+            'Для истории запустите rebuild_streaks, rebuild_reaction_sketches и backfill_achievements.'
+        ))
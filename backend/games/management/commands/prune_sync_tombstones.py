@@ -0,0 +1,15 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from games.sync import prune
+
+
+class Command(BaseCommand):
+    help = 'Delete delta sync tombstones older than SYNC_TOKEN_MAX_AGE_DAYS'
+
+    def handle(self, *args, **options):
+        deleted = prune(timezone.now() - timedelta(days=settings.SYNC_TOKEN_MAX_AGE_DAYS))
+        self.stdout.write(self.style.SUCCESS(f'Удалено отметок удаления: {deleted}'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from games.sketches import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute reaction time percentile sketches from completed game sessions'
+
+    def handle(self, *args, **options):
+        total = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Готово! Учтено сессий: {total}'))
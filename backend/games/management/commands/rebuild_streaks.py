@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from games.streaks import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute daily-play streaks from completed game session history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество серий, записываемых за один bulk-запрос',
+        )
+
+    def handle(self, *args, **options):
+        def report(written):
+            self.stdout.write(f'Пересчитано серий: {written}')
+
+        written = rebuild(batch_size=options['batch_size'], on_progress=report)
+        self.stdout.write(self.style.SUCCESS(f'Готово! Серий пересчитано: {written}'))
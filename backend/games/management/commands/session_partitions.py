@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from games import partitions
+
+
+def month_arg(value):
+    try:
+        return partitions.parse_month(value)
+    except ValueError:
+        raise CommandError(f'Ожидается месяц в формате ГГГГ-ММ, получено: {value}')
+
+
+class Command(BaseCommand):
+    help = 'Maintain, archive and restore monthly game session partitions (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=settings.SESSION_PARTITIONS_AHEAD,
+            help='Сколько будущих месяцев держать заранее созданными',
+        )
+        parser.add_argument(
+            '--archive-before',
+            type=month_arg,
+            metavar='YYYY-MM',
+            help='Архивировать и удалить все секции старше указанного месяца',
+        )
+        parser.add_argument(
+            '--restore',
+            type=month_arg,
+            nargs='+',
+            default=[],
+            metavar='YYYY-MM',
+            help='Восстановить секции указанных месяцев из архива',
+        )
+        parser.add_argument(
+            '--archive-dir',
+            default=settings.SESSION_ARCHIVE_DIR,
+            help='Каталог для архивов секций',
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.is_supported():
+            raise CommandError('Секционирование игровых сессий поддерживается только в PostgreSQL.')
+
+        for month in partitions.ensure_partitions(options['ahead']):
+            self.stdout.write(f'Создана секция {partitions.partition_name(month)}')
+
+        for month in options['restore']:
+            try:
+                rows = partitions.restore_partition(month, options['archive_dir'])
+            except (FileNotFoundError, ValueError) as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(f'Восстановлена секция {partitions.partition_name(month)}: {rows} строк')
+
+        if options['archive_before']:
+            current = partitions.month_start(timezone.now())
+            if options['archive_before'] > current:
+                raise CommandError('Нельзя архивировать текущий месяц.')
+            with connection.cursor() as cursor:
+                old = [month for month, _, _ in partitions.list_partitions(cursor) if month < options['archive_before']]
+            for month in old:
+                path, rows = partitions.archive_partition(month, options['archive_dir'])
+                self.stdout.write(f'Секция {partitions.partition_name(month)} ({rows} строк) -> {path}')
+
+        with connection.cursor() as cursor:
+            for _, name, rows in partitions.list_partitions(cursor):
+                self.stdout.write(f'{name}: ~{rows} строк')
+        self.stdout.write(self.style.SUCCESS('Готово!'))
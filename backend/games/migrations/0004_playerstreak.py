@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-19 03:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0003_alter_achievement_options_alter_friendship_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerStreak',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('current_streak', models.PositiveIntegerField(default=0, verbose_name='Текущая серия (дней)')),
+                ('best_streak', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Лучшая серия (дней)')),
+                ('last_day', models.DateField(blank=True, null=True, verbose_name='Последний учтенный день')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='streak', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Серия игр',
+                'verbose_name_plural': 'Серии игр',
+                'ordering': ['-best_streak'],
+            },
+        ),
+    ]
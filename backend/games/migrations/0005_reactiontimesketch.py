@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-19 03:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0004_playerstreak'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReactionTimeSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('difficulty', models.CharField(choices=[('easy', 'Легкий'), ('medium', 'Средний'), ('hard', 'Сложный')], max_length=10, unique=True, verbose_name='Уровень сложности')),
+                ('data', models.JSONField(default=dict, help_text='Счетчики логарифмических корзин времени реакции', verbose_name='Данные скетча')),
+                ('count', models.PositiveBigIntegerField(default=0, verbose_name='Количество значений')),
+            ],
+            options={
+                'verbose_name': 'Скетч времени реакции',
+                'verbose_name_plural': 'Скетчи времени реакции',
+                'ordering': ['difficulty'],
+            },
+        ),
+    ]
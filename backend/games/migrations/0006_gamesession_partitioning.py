@@ -0,0 +1,120 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:05
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# Копия DDL из games/partitions.py на момент миграции: модуль может меняться,
+# а миграция должна выполнять то же, что и при создании
+
+TABLE = 'games_gamesession'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def month_start(value):
+    if isinstance(value, datetime.datetime):
+        value = value.astimezone(datetime.timezone.utc)
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y_%m}'
+
+
+def _bound(month):
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def _range(month):
+    return f'FROM ({_bound(month)}) TO ({_bound(add_months(month, 1))})'
+
+
+def is_partitioned(cursor):
+    cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLE])
+    return cursor.fetchone() is not None
+
+
+def rebuild(cursor, partitioned, months_ahead=0):
+    legacy = f'{TABLE}_legacy'
+    cursor.execute(
+        'SELECT indexdef FROM pg_indexes '
+        'WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s',
+        [TABLE, f'{TABLE}_pkey'],
+    )
+    index_defs = [row[0].replace(' ON ONLY ', ' ON ') for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+        [TABLE],
+    )
+    foreign_keys = cursor.fetchall()
+
+    cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {legacy}')
+    cursor.execute(
+        f'CREATE TABLE {TABLE} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS)'
+        + (' PARTITION BY RANGE (created_at)' if partitioned else '')
+    )
+    if partitioned:
+        cursor.execute(f'SELECT MIN(created_at) FROM {legacy}')
+        oldest = cursor.fetchone()[0]
+        current = month_start(timezone.now())
+        month = month_start(oldest) if oldest else current
+        while month <= add_months(current, months_ahead):
+            cursor.execute(f'CREATE TABLE {partition_name(month)} PARTITION OF {TABLE} FOR VALUES {_range(month)}')
+            month = add_months(month, 1)
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+
+    cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {legacy}')
+    cursor.execute(f'DROP TABLE {legacy}')
+
+    key = 'id, created_at' if partitioned else 'id'
+    cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY ({key})')
+    for indexdef in index_defs:
+        cursor.execute(indexdef)
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+    sequence = cursor.fetchone()[0]
+    cursor.execute(f'SELECT setval(%s, COALESCE(MAX(id), 0) + 1, false) FROM {TABLE}', [sequence])
+    if sequence.rsplit('.', 1)[-1].strip('"') != f'{TABLE}_id_seq':
+        cursor.execute(f'ALTER SEQUENCE {sequence} RENAME TO {TABLE}_id_seq')
+
+
+def partition_sessions(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            rebuild(cursor, partitioned=True, months_ahead=getattr(settings, 'SESSION_PARTITIONS_AHEAD', 3))
+
+
+def unpartition_sessions(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if is_partitioned(cursor):
+            rebuild(cursor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0005_reactiontimesketch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(fields=['user', '-created_at'], name='games_sess_user_recent_idx'),
+        ),
+        migrations.RunPython(partition_sessions, unpartition_sessions),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0006_gamesession_partitioning'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('day', models.DateField(verbose_name='День')),
+                ('difficulty', models.CharField(choices=[('easy', 'Легкий'), ('medium', 'Средний'), ('hard', 'Сложный')], max_length=10, verbose_name='Уровень сложности')),
+                ('sessions_count', models.PositiveIntegerField(default=0, verbose_name='Количество сессий')),
+                ('completed_count', models.PositiveIntegerField(default=0, verbose_name='Завершенных игр')),
+                ('best_score', models.IntegerField(blank=True, null=True, verbose_name='Лучший счет')),
+                ('best_completed_score', models.IntegerField(blank=True, null=True, verbose_name='Лучший счет завершенной игры')),
+                ('best_reaction_time', models.FloatField(blank=True, null=True, verbose_name='Лучшее среднее время реакции (мс)')),
+                ('reaction_sum', models.FloatField(default=0, help_text='По завершенным играм', verbose_name='Сумма средних времен реакции (мс)')),
+                ('reaction_count', models.PositiveIntegerField(default=0, verbose_name='Количество средних времен реакции')),
+                ('histogram', models.JSONField(default=dict, help_text='Скетч средних времен реакции завершенных игр (см. games/sketches.py)', verbose_name='Гистограмма времени реакции')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_rollups', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Свертка игровых сессий',
+                'verbose_name_plural': 'Свертки игровых сессий',
+                'ordering': ['-day'],
+                'unique_together': {('user', 'day', 'difficulty')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:21
+
+import reaction_game.fastjson
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0007_sessionrollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gamesession',
+            name='game_state',
+            field=models.JSONField(decoder=reaction_game.fastjson.FastJSONDecoder, default=dict, help_text='JSON объект с данными о состоянии игры', verbose_name='Состояние игры'),
+        ),
+        migrations.AlterField(
+            model_name='gamesession',
+            name='reaction_times',
+            field=models.JSONField(decoder=reaction_game.fastjson.FastJSONDecoder, default=list, help_text='Список времен реакции в миллисекундах', verbose_name='Времена реакции'),
+        ),
+        migrations.AlterField(
+            model_name='sessionrollup',
+            name='histogram',
+            field=models.JSONField(decoder=reaction_game.fastjson.FastJSONDecoder, default=dict, help_text='Скетч средних времен реакции завершенных игр (см. games/sketches.py)', verbose_name='Гистограмма времени реакции'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0008_gamesession_fast_json_decoder'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('kind', models.CharField(choices=[('session', 'Игровая сессия'), ('achievement', 'Достижение пользователя'), ('friendship', 'Дружба'), ('reset', 'Полная перезагрузка')], max_length=12, verbose_name='Тип записи')),
+                ('object_id', models.BigIntegerField(blank=True, null=True, verbose_name='ID удаленной записи')),
+            ],
+            options={
+                'verbose_name': 'Отметка удаления',
+                'verbose_name_plural': 'Отметки удаления',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['from_user', 'updated_at'], name='games_friend_from_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['to_user', 'updated_at'], name='games_friend_to_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(fields=['user', 'updated_at'], name='games_sess_user_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userachievement',
+            index=models.Index(fields=['user', 'updated_at'], name='games_uach_user_changed_idx'),
+        ),
+        migrations.AddField(
+            model_name='synctombstone',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sync_tombstones', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['user', 'created_at'], name='games_tomb_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['created_at'], name='games_tomb_created_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:44
+
+import games.fields
+import reaction_game.fastjson
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0009_sync_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='state_version',
+            field=models.PositiveIntegerField(db_default=models.Value(0), default=0, help_text='Растет при каждом изменении game_state; JSON Patch применяется к известной версии', verbose_name='Версия состояния'),
+        ),
+        migrations.AlterField(
+            model_name='gamesession',
+            name='game_state',
+            field=games.fields.PackedJSONField(decoder=reaction_game.fastjson.FastJSONDecoder, default=dict, help_text='JSON объект с данными о состоянии игры', verbose_name='Состояние игры'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0010_gamesession_state_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reactiontimesketch',
+            name='generation',
+            field=models.PositiveIntegerField(db_default=models.Value(0), default=0, help_text='Растет при каждой пересборке; дельты воркеров от прошлого поколения отбрасываются', verbose_name='Поколение'),
+        ),
+    ]
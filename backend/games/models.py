@@ -6,6 +6,10 @@ from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 import json
 
+from reaction_game.fastjson import FastJSONDecoder
+
+from .fields import PackedJSONField
+
 User = get_user_model()
 
 
@@ -74,11 +78,19 @@ class GameSession(TimeStampedModel):
         related_name='game_sessions',
         verbose_name='Пользователь'
     )
-    game_state = models.JSONField(
+    # Большие состояния хранятся сжатыми (см. games/fields.py)
+    game_state = PackedJSONField(
         default=dict,
+        decoder=FastJSONDecoder,
         verbose_name='Состояние игры',
         help_text='JSON объект с данными о состоянии игры'
     )
+    state_version = models.PositiveIntegerField(
+        default=0,
+        db_default=0,
+        verbose_name='Версия состояния',
+        help_text='Растет при каждом изменении game_state; JSON Patch применяется к известной версии'
+    )
     score = models.IntegerField(
         default=0,
         validators=[MinValueValidator(0)],
@@ -101,6 +113,7 @@ class GameSession(TimeStampedModel):
     )
     reaction_times = models.JSONField(
         default=list,
+        decoder=FastJSONDecoder,
         verbose_name='Времена реакции',
         help_text='Список времен реакции в миллисекундах'
     )
@@ -115,6 +128,10 @@ class GameSession(TimeStampedModel):
         verbose_name_plural = 'Игровые сессии'
         ordering = ['-created_at']
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='games_sess_user_recent_idx'),
+            models.Index(fields=['user', 'updated_at'], name='games_sess_user_changed_idx'),
+        ]
 
     def __str__(self):
         return f'Сессия {self.user.username} - {self.score} очков ({self.difficulty})'
@@ -258,6 +275,9 @@ class UserAchievement(TimeStampedModel):
         verbose_name_plural = 'Достижения пользователей'
         ordering = ['-unlocked_at']
         unique_together = [['user', 'achievement']]
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='games_uach_user_changed_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user.username} - {self.achievement.name}'
@@ -297,6 +317,208 @@ class Friendship(TimeStampedModel):
         verbose_name_plural = 'Друзья'
         unique_together = [['from_user', 'to_user']]
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['from_user', 'updated_at'], name='games_friend_from_changed_idx'),
+            models.Index(fields=['to_user', 'updated_at'], name='games_friend_to_changed_idx'),
+        ]
 
     def __str__(self):
         return f'{self.from_user.username} -> {self.to_user.username} ({self.status})'
+
+
+class PlayerStreak(TimeStampedModel):
+    """
+    Daily-play streak, maintained incrementally on session completion.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='streak',
+        verbose_name='Пользователь'
+    )
+    current_streak = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Текущая серия (дней)'
+    )
+    best_streak = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        verbose_name='Лучшая серия (дней)'
+    )
+    last_day = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name='Последний учтенный день'
+    )
+
+    class Meta:
+        verbose_name = 'Серия игр'
+        verbose_name_plural = 'Серии игр'
+        ordering = ['-best_streak']
+
+    def __str__(self):
+        return f'{self.user.username} - {self.current_streak} дн. (лучшая {self.best_streak})'
+
+    def advance(self, day):
+        """Count a completed game played on the given day."""
+        if self.last_day is not None and day <= self.last_day:
+            return False
+        if self.last_day is not None and (day - self.last_day).days == 1:
+            self.current_streak += 1
+        else:
+            self.current_streak = 1
+        self.best_streak = max(self.best_streak, self.current_streak)
+        self.last_day = day
+        return True
+
+    def active_streak(self, today):
+        """Current streak as of today: it lapses once a full day is missed."""
+        if self.last_day is None or (today - self.last_day).days > 1:
+            return 0
+        return self.current_streak
+
+
+class ReactionTimeSketch(TimeStampedModel):
+    """
+    Persisted quantile sketch of session average reaction times per difficulty.
+    Worker processes merge their local updates into it periodically.
+    """
+    difficulty = models.CharField(
+        max_length=10,
+        choices=GameSession.DIFFICULTY_CHOICES,
+        unique=True,
+        verbose_name='Уровень сложности'
+    )
+    data = models.JSONField(
+        default=dict,
+        verbose_name='Данные скетча',
+        help_text='Счетчики логарифмических корзин времени реакции'
+    )
+    count = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Количество значений'
+    )
+    generation = models.PositiveIntegerField(
+        default=0,
+        db_default=0,
+        verbose_name='Поколение',
+        help_text='Растет при каждой пересборке; дельты воркеров от прошлого поколения отбрасываются'
+    )
+
+    class Meta:
+        verbose_name = 'Скетч времени реакции'
+        verbose_name_plural = 'Скетчи времени реакции'
+        ordering = ['difficulty']
+
+    def __str__(self):
+        return f'{self.get_difficulty_display()} - {self.count} значений'
+
+
+class SessionRollup(TimeStampedModel):
+    """
+    Aggregate of a user's compacted game sessions for one day and difficulty.
+    Sessions past SESSION_RETENTION_DAYS are folded into these rows and
+    deleted; history-wide statistics read rollups plus the recent raw tail.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='session_rollups',
+        verbose_name='Пользователь'
+    )
+    day = models.DateField(verbose_name='День')
+    difficulty = models.CharField(
+        max_length=10,
+        choices=GameSession.DIFFICULTY_CHOICES,
+        verbose_name='Уровень сложности'
+    )
+    sessions_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество сессий'
+    )
+    completed_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Завершенных игр'
+    )
+    best_score = models.IntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Лучший счет'
+    )
+    best_completed_score = models.IntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Лучший счет завершенной игры'
+    )
+    best_reaction_time = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='Лучшее среднее время реакции (мс)'
+    )
+    reaction_sum = models.FloatField(
+        default=0,
+        verbose_name='Сумма средних времен реакции (мс)',
+        help_text='По завершенным играм'
+    )
+    reaction_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество средних времен реакции'
+    )
+    histogram = models.JSONField(
+        default=dict,
+        decoder=FastJSONDecoder,
+        verbose_name='Гистограмма времени реакции',
+        help_text='Скетч средних времен реакции завершенных игр (см. games/sketches.py)'
+    )
+
+    class Meta:
+        verbose_name = 'Свертка игровых сессий'
+        verbose_name_plural = 'Свертки игровых сессий'
+        ordering = ['-day']
+        unique_together = [['user', 'day', 'difficulty']]
+
+    def __str__(self):
+        return f'{self.user.username} - {self.day} ({self.difficulty}): {self.sessions_count} сессий'
+
+
+class SyncTombstone(TimeStampedModel):
+    """
+    Deletion marker for delta sync (see games/sync.py).
+    A marker without a user tells every client to reload everything.
+    """
+    KIND_CHOICES = [
+        ('session', 'Игровая сессия'),
+        ('achievement', 'Достижение пользователя'),
+        ('friendship', 'Дружба'),
+        ('reset', 'Полная перезагрузка'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name='sync_tombstones',
+        verbose_name='Пользователь'
+    )
+    kind = models.CharField(
+        max_length=12,
+        choices=KIND_CHOICES,
+        verbose_name='Тип записи'
+    )
+    object_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='ID удаленной записи'
+    )
+
+    class Meta:
+        verbose_name = 'Отметка удаления'
+        verbose_name_plural = 'Отметки удаления'
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='games_tomb_user_created_idx'),
+            models.Index(fields=['created_at'], name='games_tomb_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id} ({self.created_at})'
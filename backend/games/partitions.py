@@ -0,0 +1,220 @@
+"""
+Monthly range partitioning of the game sessions table (PostgreSQL only).
+
+The table is partitioned by created_at into games_gamesession_pYYYY_MM
+partitions plus a default partition that catches rows outside every
+monthly range. Old partitions can be detached and archived to gzipped CSV
+files and restored later. Other database backends keep a plain table and
+every function here is skipped or refused by its caller.
+"""
+import datetime
+import gzip
+import os
+import re
+from pathlib import Path
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import sync, versions
+from .pgcopy import copy_from, copy_to
+
+TABLE = 'games_gamesession'
+DEFAULT_PARTITION = f'{TABLE}_default'
+_PARTITION_RE = re.compile(rf'^{TABLE}_p(\d{{4}})_(\d{{2}})$')
+_COLUMNS_RE = re.compile(r'^[a-z_][a-z0-9_]*(,[a-z_][a-z0-9_]*)*$')
+
+
+def is_supported(conn=None):
+    return (conn or connection).vendor == 'postgresql'
+
+
+def month_start(value):
+    if isinstance(value, datetime.datetime):
+        value = value.astimezone(datetime.timezone.utc)
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def parse_month(text):
+    """'2026-10' -> date(2026, 10, 1); raises ValueError for anything else."""
+    return datetime.datetime.strptime(text, '%Y-%m').date()
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y_%m}'
+
+
+def archive_path(month, directory):
+    return Path(directory) / f'{partition_name(month)}.csv.gz'
+
+
+def _bound(month):
+    # Границы секций всегда в UTC, чтобы не зависеть от TIME_ZONE сервера
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def _range(month):
+    return f'FROM ({_bound(month)}) TO ({_bound(add_months(month, 1))})'
+
+
+def is_partitioned(cursor):
+    cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLE])
+    return cursor.fetchone() is not None
+
+
+def list_partitions(cursor):
+    """Attached monthly partitions as (month, name, estimated rows), oldest first."""
+    cursor.execute(
+        'SELECT c.relname, c.reltuples::bigint FROM pg_inherits i '
+        'JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)',
+        [TABLE],
+    )
+    result = []
+    for name, rows in cursor.fetchall():
+        match = _PARTITION_RE.match(name)
+        if match:
+            result.append((datetime.date(int(match[1]), int(match[2]), 1), name, max(rows, 0)))
+    return sorted(result)
+
+
+def _rebuild(cursor, partitioned, months_ahead=0):
+    """
+    Recreate the sessions table as a partitioned (or plain) table with the
+    same columns, indexes, foreign keys and identity sequence position.
+    """
+    legacy = f'{TABLE}_legacy'
+    cursor.execute(
+        'SELECT indexdef FROM pg_indexes '
+        'WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s',
+        [TABLE, f'{TABLE}_pkey'],
+    )
+    index_defs = [row[0].replace(' ON ONLY ', ' ON ') for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+        [TABLE],
+    )
+    foreign_keys = cursor.fetchall()
+
+    cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {legacy}')
+    cursor.execute(
+        f'CREATE TABLE {TABLE} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS)'
+        + (' PARTITION BY RANGE (created_at)' if partitioned else '')
+    )
+    if partitioned:
+        cursor.execute(f'SELECT MIN(created_at) FROM {legacy}')
+        oldest = cursor.fetchone()[0]
+        current = month_start(timezone.now())
+        month = month_start(oldest) if oldest else current
+        while month <= add_months(current, months_ahead):
+            cursor.execute(f'CREATE TABLE {partition_name(month)} PARTITION OF {TABLE} FOR VALUES {_range(month)}')
+            month = add_months(month, 1)
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+
+    cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {legacy}')
+    cursor.execute(f'DROP TABLE {legacy}')
+
+    # Первичный ключ секционированной таблицы обязан включать ключ секционирования
+    key = 'id, created_at' if partitioned else 'id'
+    cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY ({key})')
+    for indexdef in index_defs:
+        cursor.execute(indexdef)
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+    sequence = cursor.fetchone()[0]
+    cursor.execute(f'SELECT setval(%s, COALESCE(MAX(id), 0) + 1, false) FROM {TABLE}', [sequence])
+    if sequence.rsplit('.', 1)[-1].strip('"') != f'{TABLE}_id_seq':
+        cursor.execute(f'ALTER SEQUENCE {sequence} RENAME TO {TABLE}_id_seq')
+
+
+def convert_to_partitioned(cursor, months_ahead=3):
+    """Turn the plain sessions table into a monthly partitioned one, keeping every row."""
+    if not is_partitioned(cursor):
+        _rebuild(cursor, partitioned=True, months_ahead=months_ahead)
+
+
+def convert_to_plain(cursor):
+    """Reverse of convert_to_partitioned()."""
+    if is_partitioned(cursor):
+        _rebuild(cursor, partitioned=False)
+
+
+def _attach_month(cursor, month, columns=None, source=None):
+    name = partition_name(month)
+    cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    if source is not None:
+        copy_from(cursor, f'COPY {name} ({columns}) FROM STDIN WITH (FORMAT csv)', source)
+    # Строки этого месяца, попавшие в секцию по умолчанию, переезжают в новую секцию
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+        f'WHERE created_at >= {_bound(month)} AND created_at < {_bound(add_months(month, 1))} '
+        f'RETURNING *) INSERT INTO {name} SELECT * FROM moved'
+    )
+    cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {_range(month)}')
+
+
+def ensure_partitions(months_ahead):
+    """Create missing partitions for the current and next months_ahead months."""
+    current = month_start(timezone.now())
+    created = []
+    with connection.cursor() as cursor:
+        existing = {month for month, _, _ in list_partitions(cursor)}
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing:
+                with transaction.atomic():
+                    _attach_month(cursor, month)
+                created.append(month)
+    return created
+
+
+def archive_partition(month, directory):
+    """
+    Detach a monthly partition, write it to a gzipped CSV file and drop it.
+    Returns (path, rows). The partition is only dropped after the file is
+    fully written and synced.
+    """
+    name = partition_name(month)
+    path = archive_path(month, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.partial')
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+        cursor.execute(f'SELECT COUNT(*) FROM {name}')
+        rows = cursor.fetchone()[0]
+        with open(partial, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as out:
+                copy_to(cursor, f'COPY {name} TO STDOUT WITH (FORMAT csv, HEADER true)', out)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(partial, path)
+        cursor.execute(f'DROP TABLE {name}')
+        sync.record_reset()
+        versions.bump([versions.ALL_USERS], versions.SESSIONS)
+    return path, rows
+
+
+def restore_partition(month, directory):
+    """Load an archived month back as an attached partition. Returns the number of rows."""
+    path = archive_path(month, directory)
+    if not path.exists():
+        raise FileNotFoundError(f'Архив {path} не найден.')
+    with transaction.atomic(), connection.cursor() as cursor:
+        if any(existing == month for existing, _, _ in list_partitions(cursor)):
+            raise ValueError(f'Секция {partition_name(month)} уже существует.')
+        with gzip.open(path, 'rb') as source:
+            columns = source.readline().decode().strip()
+            if not _COLUMNS_RE.match(columns):
+                raise ValueError(f'Неожиданный заголовок архива {path}.')
+            _attach_month(cursor, month, columns, source)
+        sync.record_reset()
+        versions.bump([versions.ALL_USERS], versions.SESSIONS)
+        cursor.execute(f'SELECT COUNT(*) FROM {partition_name(month)}')
+        return cursor.fetchone()[0]
@@ -0,0 +1,25 @@
+"""
+PostgreSQL COPY helpers that work with both psycopg2 and psycopg 3 cursors.
+"""
+
+
+def copy_to(cursor, sql, fileobj):
+    """Run a COPY ... TO STDOUT statement, writing its output to fileobj."""
+    raw = getattr(cursor, 'cursor', cursor)
+    if hasattr(raw, 'copy_expert'):
+        raw.copy_expert(sql, fileobj)
+        return
+    with raw.copy(sql) as copy:
+        for data in copy:
+            fileobj.write(bytes(data))
+
+
+def copy_from(cursor, sql, fileobj, chunk_size=1 << 16):
+    """Run a COPY ... FROM STDIN statement, reading its input from fileobj."""
+    raw = getattr(cursor, 'cursor', cursor)
+    if hasattr(raw, 'copy_expert'):
+        raw.copy_expert(sql, fileobj, size=chunk_size)
+        return
+    with raw.copy(sql) as copy:
+        while data := fileobj.read(chunk_size):
+            copy.write(data)
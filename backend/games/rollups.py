@@ -0,0 +1,122 @@
+"""
+Retention compaction of old game sessions into SessionRollup rows.
+
+Sessions created before the cutoff are folded into per-user/day/difficulty
+aggregates and deleted in batches. Each batch is one transaction, so an
+interrupted run just continues where it stopped, and folding into an
+existing rollup merges the counts. Raw rows can first be appended to a
+gzipped NDJSON file for cold storage.
+"""
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from . import sync, versions
+from .models import GameSession, SessionRollup
+from .sketches import QuantileSketch
+
+FIELDS = ('id', 'user_id', 'created_at', 'difficulty', 'score', 'is_completed', 'avg_reaction_time')
+ARCHIVE_FIELDS = FIELDS + ('updated_at', 'time_played', 'game_state', 'reaction_times')
+UPDATE_FIELDS = [
+    'sessions_count', 'completed_count', 'best_score', 'best_completed_score',
+    'best_reaction_time', 'reaction_sum', 'reaction_count', 'histogram', 'updated_at',
+]
+
+
+def cutoff(days):
+    """Start of the local day `days` days ago, so whole days are compacted at once."""
+    day = timezone.localdate() - datetime.timedelta(days=days)
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def _best(pick, *values):
+    values = [value for value in values if value is not None]
+    return pick(values) if values else None
+
+
+def _fold(rollup, sketch, row):
+    reaction = row['avg_reaction_time']
+    rollup.sessions_count += 1
+    rollup.best_score = _best(max, rollup.best_score, row['score'])
+    rollup.best_reaction_time = _best(min, rollup.best_reaction_time, reaction)
+    if row['is_completed']:
+        rollup.completed_count += 1
+        rollup.best_completed_score = _best(max, rollup.best_completed_score, row['score'])
+        if reaction is not None:
+            rollup.reaction_sum += reaction
+            rollup.reaction_count += 1
+            sketch.add(reaction)
+
+
+def _combine(rollup, other, sketch):
+    rollup.sessions_count += other.sessions_count
+    rollup.completed_count += other.completed_count
+    rollup.best_score = _best(max, rollup.best_score, other.best_score)
+    rollup.best_completed_score = _best(max, rollup.best_completed_score, other.best_completed_score)
+    rollup.best_reaction_time = _best(min, rollup.best_reaction_time, other.best_reaction_time)
+    rollup.reaction_sum += other.reaction_sum
+    rollup.reaction_count += other.reaction_count
+    rollup.histogram = QuantileSketch.from_dict(rollup.histogram, sketch.relative_accuracy).merge(sketch).to_dict()
+    rollup.updated_at = timezone.now()
+
+
+def _fold_batch(rows):
+    fresh = {}
+    for row in rows:
+        key = (row['user_id'], timezone.localdate(row['created_at']), row['difficulty'])
+        if key not in fresh:
+            fresh[key] = (SessionRollup(user_id=key[0], day=key[1], difficulty=key[2]), QuantileSketch())
+        _fold(*fresh[key], row)
+
+    existing = SessionRollup.objects.select_for_update().filter(
+        user_id__in={user_id for user_id, _, _ in fresh},
+        day__in={day for _, day, _ in fresh},
+    )
+    updated = []
+    for rollup in existing:
+        key = (rollup.user_id, rollup.day, rollup.difficulty)
+        if key in fresh:
+            other, sketch = fresh.pop(key)
+            _combine(rollup, other, sketch)
+            updated.append(rollup)
+
+    created = []
+    for rollup, sketch in fresh.values():
+        rollup.histogram = sketch.to_dict()
+        created.append(rollup)
+    SessionRollup.objects.bulk_create(created)
+    SessionRollup.objects.bulk_update(updated, UPDATE_FIELDS)
+
+
+def compact(before, batch_size=1000, archive=None, on_progress=None):
+    """
+    Fold every session created before `before` into rollups and delete it.
+    `archive` is an optional text file that receives the raw rows as NDJSON.
+    Returns the number of sessions compacted.
+    """
+    fields = ARCHIVE_FIELDS if archive is not None else FIELDS
+    compacted = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                GameSession.objects.filter(created_at__lt=before)
+                .order_by('id')
+                .values(*fields)[:batch_size]
+            )
+            if not rows:
+                break
+            _fold_batch(rows)
+            if archive is not None:
+                for row in rows:
+                    archive.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+            # Фильтр по created_at оставляет в плане только старые секции
+            GameSession.objects.filter(created_at__lt=before, id__in=[row['id'] for row in rows]).delete()
+            sync.record_deletions('session', [(row['user_id'], row['id']) for row in rows])
+            versions.bump({row['user_id'] for row in rows}, versions.SESSIONS)
+        compacted += len(rows)
+        if on_progress is not None:
+            on_progress(compacted)
+    return compacted
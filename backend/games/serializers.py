@@ -10,9 +10,12 @@ from .models import (
     UserAchievement,
     Friendship,
     Friendship,
-    UserProfile
+    UserProfile,
+    SessionRollup
 )
-from django.db.models import Sum, Avg, Q
+from django.db import transaction
+from django.db.models import Sum, Avg, Q, Count, Max
+from . import achievements, autosave, catalog
 
 User = get_user_model()
 
@@ -25,16 +28,41 @@ class GameSessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = GameSession
         fields = (
-            'id', 'user', 'username', 'game_state', 'score', 'difficulty',
+            'id', 'user', 'username', 'game_state', 'state_version', 'score', 'difficulty',
             'time_played', 'is_completed', 'reaction_times', 'avg_reaction_time',
             'created_at', 'updated_at'
         )
-        read_only_fields = ('id', 'user', 'created_at', 'updated_at', 'avg_reaction_time')
+        read_only_fields = ('id', 'user', 'state_version', 'created_at', 'updated_at', 'avg_reaction_time')
 
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
 
+    def update(self, instance, validated_data):
+        """
+        Write only the submitted fields. A new game_state bumps state_version
+        under a row lock and raises autosave.StaleVersion when a patch has
+        committed since `instance` was read, instead of overwriting it.
+        """
+        fields = [*validated_data, 'updated_at']
+        with transaction.atomic():
+            if 'game_state' in validated_data:
+                current = (
+                    GameSession.objects.select_for_update()
+                    .filter(pk=instance.pk).values_list('state_version', flat=True).first()
+                )
+                if current is not None and current > instance.state_version:
+                    raise autosave.StaleVersion(current)
+                # Полная запись состояния делает устаревшими патчи к прежней версии
+                instance.state_version += 1
+                fields.append('state_version')
+            if 'reaction_times' in validated_data:
+                fields.append('avg_reaction_time')
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save(update_fields=fields)
+        return instance
+
 
 class LeaderboardSerializer(serializers.ModelSerializer):
     """Serializer for leaderboard entries."""
@@ -163,30 +191,37 @@ class FriendProfileSerializer(serializers.ModelSerializer):
         )
 
     def get_games_played(self, obj):
-        return GameSession.objects.filter(user=obj.user, is_completed=True).count()
+        return achievements.games_played(obj.user)
 
     def get_avg_reaction_time(self, obj):
-        sessions = GameSession.objects.filter(user=obj.user, is_completed=True).exclude(avg_reaction_time__isnull=True)
-        if not sessions.exists():
+        # Среднее по свежим сессиям и сверткам старых игр
+        recent = GameSession.objects.filter(
+            user=obj.user, is_completed=True, avg_reaction_time__isnull=False
+        ).aggregate(total=Sum('avg_reaction_time'), count=Count('id'))
+        rolled = SessionRollup.objects.filter(user=obj.user).aggregate(
+            total=Sum('reaction_sum'), count=Sum('reaction_count')
+        )
+        count = recent['count'] + (rolled['count'] or 0)
+        if not count:
             return None
-        return sessions.aggregate(Avg('avg_reaction_time'))['avg_reaction_time__avg']
+        return ((recent['total'] or 0) + (rolled['total'] or 0)) / count
 
     def get_achievements(self, obj):
-        user_achievements = UserAchievement.objects.filter(user=obj.user).select_related('achievement')
-        return AchievementSerializer([ua.achievement for ua in user_achievements], many=True).data
+        return catalog.unlocked_achievements(obj.user, self.context.get('request'))
 
     def get_high_scores(self, obj):
         # Top score for each difficulty
-        scores = {}
-        for diff in ['easy', 'medium', 'hard']:
-            best = GameSession.objects.filter(
-                user=obj.user, 
-                difficulty=diff, 
-                is_completed=True
-            ).order_by('-score').first()
-            if best:
-                scores[diff] = best.score
-        return scores
+        best = {}
+        sources = (
+            GameSession.objects.filter(user=obj.user, is_completed=True)
+            .order_by().values('difficulty').annotate(best=Max('score')),
+            SessionRollup.objects.filter(user=obj.user, best_completed_score__isnull=False)
+            .order_by().values('difficulty').annotate(best=Max('best_completed_score')),
+        )
+        for rows in sources:
+            for row in rows:
+                best[row['difficulty']] = max(best.get(row['difficulty'], row['best']), row['best'])
+        return {diff: best[diff] for diff in ['easy', 'medium', 'hard'] if diff in best}
 
 
 class UserSearchSerializer(serializers.ModelSerializer):
@@ -1,10 +1,12 @@
 """
 Signals for games app.
 """
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import UserProfile
+from . import catalog, leaderboard, sync, versions
+from .models import UserProfile, Achievement, Leaderboard, GameSession, UserAchievement, Friendship
 
 User = get_user_model()
 
@@ -22,3 +24,60 @@ def save_user_profile(sender, instance, **kwargs):
     if hasattr(instance, 'profile'):
         instance.profile.save()
 
+
+
+@receiver(post_save, sender=Achievement)
+@receiver(post_delete, sender=Achievement)
+def invalidate_achievement_catalog(sender, instance, **kwargs):
+    """Rebuild the cached achievement catalog when an admin edits it."""
+    catalog.invalidate()
+    # Повторно после коммита, чтобы другие воркеры не закешировали старые данные
+    transaction.on_commit(catalog.invalidate)
+
+
+@receiver(post_save, sender=Leaderboard)
+@receiver(post_delete, sender=Leaderboard)
+def invalidate_leaderboard_top(sender, instance, **kwargs):
+    """Drop the cached leaderboard top when an entry changes."""
+    leaderboard.invalidate_top()
+    transaction.on_commit(leaderboard.invalidate_top)
+
+
+# post_delete для GameSession намеренно не подключен: он отключил бы быстрое
+# удаление при свертке сессий, удаления отмечаются явно (см. games/versions.py)
+@receiver(post_save, sender=GameSession)
+def bump_sessions_version(sender, instance, **kwargs):
+    versions.bump([instance.user_id], versions.SESSIONS)
+
+
+@receiver(post_save, sender=UserAchievement)
+@receiver(post_delete, sender=UserAchievement)
+def bump_achievements_version(sender, instance, **kwargs):
+    versions.bump([instance.user_id], versions.ACHIEVEMENTS)
+
+
+@receiver(post_save, sender=Friendship)
+@receiver(post_delete, sender=Friendship)
+def bump_friends_version(sender, instance, **kwargs):
+    versions.bump([instance.from_user_id, instance.to_user_id], versions.FRIENDS)
+
+
+@receiver(post_delete, sender=UserAchievement)
+def record_achievement_deletion(sender, instance, **kwargs):
+    sync.record_deletions('achievement', [(instance.user_id, instance.id)])
+
+
+@receiver(post_delete, sender=Friendship)
+def record_friendship_deletion(sender, instance, **kwargs):
+    sync.record_deletions('friendship', [(instance.from_user_id, instance.id), (instance.to_user_id, instance.id)])
+
+
+@receiver(post_save, sender=UserProfile)
+def bump_profile_version(sender, instance, **kwargs):
+    versions.bump([instance.user_id], versions.PROFILE)
+
+
+@receiver(post_save, sender=User)
+def bump_user_profile_version(sender, instance, **kwargs):
+    """The profile response includes the user's name and email."""
+    versions.bump([instance.pk], versions.PROFILE)
@@ -0,0 +1,276 @@
+"""
+Mergeable quantile sketches of average reaction time per difficulty.
+
+Uses logarithmic buckets (DDSketch-style): every value is counted in the
+bucket (gamma^(k-1), gamma^k], so quantiles and percentile ranks are exact
+for some value within the configured relative accuracy. Two sketches merge
+by adding bucket counts, which lets each worker keep a local delta and
+fold it into the persisted ReactionTimeSketch row periodically.
+"""
+import atexit
+import bisect
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import GameSession, ReactionTimeSketch, SessionRollup
+
+DIFFICULTIES = [choice for choice, _ in GameSession.DIFFICULTY_CHOICES]
+
+
+class QuantileSketch:
+    """Log-bucketed histogram with bounded relative error."""
+
+    def __init__(self, relative_accuracy=None):
+        if relative_accuracy is None:
+            relative_accuracy = settings.REACTION_SKETCH_RELATIVE_ACCURACY
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self._keys = None
+        self._cumulative = None
+
+    def key(self, value):
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def add(self, value, weight=1):
+        if value <= 0:
+            self.zero_count += weight
+        else:
+            k = self.key(value)
+            self.bins[k] = self.bins.get(k, 0) + weight
+        self.count += weight
+        self._keys = None
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Нельзя объединить скетчи с разной точностью.')
+        for k, n in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self._keys = None
+        return self
+
+    def _index(self):
+        if self._keys is None:
+            self._keys = sorted(self.bins)
+            running = self.zero_count
+            self._cumulative = []
+            for k in self._keys:
+                running += self.bins[k]
+                self._cumulative.append(running)
+        return self._keys, self._cumulative
+
+    def rank(self, value):
+        """Approximate number of values <= value."""
+        if value <= 0:
+            return self.zero_count
+        keys, cumulative = self._index()
+        position = bisect.bisect_right(keys, self.key(value))
+        return cumulative[position - 1] if position else self.zero_count
+
+    def percentile_of(self, value):
+        """Percentage of values <= value, or None for an empty sketch."""
+        if not self.count:
+            return None
+        return 100.0 * self.rank(value) / self.count
+
+    def quantile(self, q):
+        """Approximate value at quantile q in [0, 1]."""
+        if not self.count:
+            return None
+        target = q * (self.count - 1)
+        if target < self.zero_count:
+            return 0.0
+        keys, cumulative = self._index()
+        position = bisect.bisect_right(cumulative, target)
+        k = keys[min(position, len(keys) - 1)]
+        return 2 * self.gamma ** k / (self.gamma + 1)
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'zero_count': self.zero_count,
+            'bins': {str(k): n for k, n in self.bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data, relative_accuracy=None):
+        sketch = cls(data.get('relative_accuracy', relative_accuracy))
+        sketch.zero_count = data.get('zero_count', 0)
+        sketch.bins = {int(k): n for k, n in data.get('bins', {}).items()}
+        sketch.count = sketch.zero_count + sum(sketch.bins.values())
+        return sketch
+
+
+# Состояние процесса: загруженные из БД скетчи и локальные, еще не сохраненные дельты.
+# Дельта помнит поколение скетча в БД, поверх которого она набрана
+_lock = threading.RLock()
+_global = {}
+_generations = {}
+_local = {}
+_local_generations = {}
+_combined = {}
+_loaded_at = None
+_pending = 0
+_last_flush = time.monotonic()
+
+
+def record(difficulty, value):
+    """Count a completed session's average reaction time."""
+    global _pending
+    if value is None:
+        return
+    with _lock:
+        if _loaded_at is None:
+            _load()
+        if difficulty not in _local:
+            _local[difficulty] = QuantileSketch()
+            _local_generations[difficulty] = _generations.get(difficulty, 0)
+        _local[difficulty].add(value)
+        _combined.clear()
+        _pending += 1
+        due = (
+            _pending >= settings.REACTION_SKETCH_FLUSH_EVERY
+            or time.monotonic() - _last_flush >= settings.REACTION_SKETCH_FLUSH_INTERVAL
+        )
+    if due:
+        # Запись в БД идет после коммита запроса: блокировка строки скетча не держится до его конца
+        transaction.on_commit(flush, robust=True)
+
+
+def _requeue(difficulty, delta, generation):
+    """Return an unsaved delta to the local queue unless a rebuild made it stale."""
+    if _local_generations.get(difficulty, generation) != generation:
+        return
+    _local_generations[difficulty] = generation
+    _local.setdefault(difficulty, QuantileSketch(delta.relative_accuracy)).merge(delta)
+
+
+def flush():
+    """
+    Merge local deltas into the persisted sketches.
+
+    The deltas are taken under the process lock and written without it, so
+    recording threads never wait on the database. A delta whose generation
+    no longer matches the row was started before a rebuild(), which has
+    already counted its sessions from the database, and is dropped.
+    """
+    global _pending, _last_flush
+    with _lock:
+        deltas = {d: (s, _local_generations[d]) for d, s in _local.items() if s.count}
+        _local.clear()
+        _local_generations.clear()
+        _pending = 0
+        _last_flush = time.monotonic()
+    try:
+        for difficulty in list(deltas):
+            delta, generation = deltas[difficulty]
+            with transaction.atomic():
+                row, _ = ReactionTimeSketch.objects.select_for_update().get_or_create(difficulty=difficulty)
+                merged = QuantileSketch.from_dict(row.data, delta.relative_accuracy)
+                if row.generation == generation:
+                    merged.merge(delta)
+                    row.data = merged.to_dict()
+                    row.count = merged.count
+                    row.save(update_fields=['data', 'count', 'updated_at'])
+            with _lock:
+                _global[difficulty] = merged
+                _generations[difficulty] = row.generation
+                _combined.clear()
+            del deltas[difficulty]
+    finally:
+        # Несохраненные дельты возвращаются в очередь до следующей попытки
+        with _lock:
+            for difficulty, (delta, generation) in deltas.items():
+                _requeue(difficulty, delta, generation)
+            _combined.clear()
+
+
+def _load():
+    global _loaded_at
+    rows = ReactionTimeSketch.objects.all()
+    fresh = {row.difficulty: (QuantileSketch.from_dict(row.data), row.generation) for row in rows}
+    _global.clear()
+    _global.update({difficulty: sketch for difficulty, (sketch, _) in fresh.items()})
+    _generations.clear()
+    _generations.update({difficulty: generation for difficulty, (_, generation) in fresh.items()})
+    # Дельты, набранные до пересборки, уже учтены в ней
+    for difficulty in list(_local):
+        if _local_generations[difficulty] != _generations.get(difficulty, 0):
+            del _local[difficulty], _local_generations[difficulty]
+    _combined.clear()
+    _loaded_at = time.monotonic()
+
+
+def sketch_for(difficulty=None):
+    """Global sketch plus this process's unflushed updates, for one or all difficulties."""
+    with _lock:
+        if _loaded_at is None or time.monotonic() - _loaded_at >= settings.REACTION_SKETCH_FLUSH_INTERVAL:
+            _load()
+        if difficulty not in _combined:
+            combined = QuantileSketch()
+            for name in ([difficulty] if difficulty else DIFFICULTIES):
+                for source in (_global, _local):
+                    if name in source:
+                        combined.merge(source[name])
+            _combined[difficulty] = combined
+        return _combined[difficulty]
+
+
+def rebuild(batch_size=2000):
+    """
+    Recompute persisted sketches from every completed session and compacted
+    rollup, and bump their generation so that every worker drops the deltas
+    it collected before the rebuild instead of counting them twice.
+    """
+    sketches = {difficulty: QuantileSketch() for difficulty in DIFFICULTIES}
+    values = (
+        GameSession.objects.filter(is_completed=True, avg_reaction_time__isnull=False)
+        .values_list('difficulty', 'avg_reaction_time')
+    )
+    for difficulty, value in values.iterator(chunk_size=batch_size):
+        sketches[difficulty].add(value)
+    histograms = SessionRollup.objects.filter(reaction_count__gt=0).values_list('difficulty', 'histogram')
+    for difficulty, histogram in histograms.iterator(chunk_size=batch_size):
+        sketches[difficulty].merge(QuantileSketch.from_dict(histogram))
+    with transaction.atomic():
+        for difficulty, sketch in sketches.items():
+            row, _ = ReactionTimeSketch.objects.select_for_update().get_or_create(difficulty=difficulty)
+            row.data = sketch.to_dict()
+            row.count = sketch.count
+            row.generation += 1
+            row.save(update_fields=['data', 'count', 'generation', 'updated_at'])
+    reset()
+    return sum(sketch.count for sketch in sketches.values())
+
+
+def reset():
+    """Drop all process-local state (used after rebuilds and in tests)."""
+    global _loaded_at, _pending
+    with _lock:
+        _global.clear()
+        _generations.clear()
+        _local.clear()
+        _local_generations.clear()
+        _combined.clear()
+        _loaded_at = None
+        _pending = 0
+
+
+def _flush_on_exit():
+    try:
+        flush()
+    except Exception:
+        # При остановке процесса БД может быть уже недоступна
+        pass
+
+
+atexit.register(_flush_on_exit)
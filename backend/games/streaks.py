@@ -0,0 +1,80 @@
+"""
+Incremental maintenance of PlayerStreak rows.
+"""
+import heapq
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import GameSession, PlayerStreak, SessionRollup
+
+
+def session_day(game_session):
+    """Local calendar day a session counts towards."""
+    return timezone.localdate(game_session.created_at)
+
+
+def record_session(game_session):
+    """
+    Advance the user's streak for a completed session: one locked row
+    read and at most one write, independent of history size.
+    """
+    with transaction.atomic():
+        streak, _ = PlayerStreak.objects.select_for_update().get_or_create(user=game_session.user)
+        if streak.advance(session_day(game_session)):
+            streak.save(update_fields=['current_streak', 'best_streak', 'last_day', 'updated_at'])
+    # Кешируем на пользователе, чтобы проверка достижений не делала лишний запрос
+    game_session.user.streak = streak
+    return streak
+
+
+def rebuild(batch_size=1000, on_progress=None):
+    """
+    Recompute every streak from completed session history in one ordered pass
+    over recent sessions merged with compacted rollup days.
+    Returns the number of streak rows written.
+    """
+    sessions = (
+        GameSession.objects.filter(is_completed=True)
+        .order_by('user_id', 'created_at')
+        .values_list('user_id', 'created_at')
+    )
+    rolled_days = (
+        SessionRollup.objects.filter(completed_count__gt=0)
+        .order_by('user_id', 'day')
+        .values_list('user_id', 'day')
+    )
+    session_days = (
+        (user_id, timezone.localdate(created_at))
+        for user_id, created_at in sessions.iterator(chunk_size=batch_size)
+    )
+    pending = []
+    written = 0
+    current = None
+
+    def flush():
+        nonlocal written
+        PlayerStreak.objects.bulk_create(
+            pending,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['current_streak', 'best_streak', 'last_day', 'updated_at'],
+        )
+        written += len(pending)
+        pending.clear()
+        if on_progress is not None:
+            on_progress(written)
+
+    for user_id, day in heapq.merge(rolled_days.iterator(chunk_size=batch_size), session_days):
+        if current is None or current.user_id != user_id:
+            current = PlayerStreak(user_id=user_id)
+            pending.append(current)
+            if len(pending) > batch_size:
+                # Последняя серия может быть еще не досчитана, переносим ее в следующий пакет
+                pending.pop()
+                flush()
+                pending.append(current)
+        current.advance(day)
+    if pending:
+        flush()
+    return written
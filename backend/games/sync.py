@@ -0,0 +1,117 @@
+"""
+Delta sync of a user's sessions, achievements and friendships.
+
+A sync token is the server time in microseconds when the previous sync
+started. Changed rows are found through (user, updated_at) indexes and
+deleted rows through SyncTombstone markers. Rows are saved with
+updated_at set before their transaction commits, so each sync looks
+SYNC_OVERLAP_SECONDS further back and may repeat rows the client already
+has; clients upsert by id. Without a token, with a token older than
+SYNC_TOKEN_MAX_AGE_DAYS (tombstones are pruned after that), after a reset
+marker or when there are more than SYNC_MAX_CHANGES changes of one kind,
+the response asks for a full reload through the list endpoints instead.
+"""
+import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import catalog
+from .fastread import ValuesPlan
+from .models import Friendship, GameSession, SyncTombstone
+from .serializers import FriendshipSerializer, GameSessionSerializer
+
+SESSION_PLAN = ValuesPlan(GameSessionSerializer, {'user': 'user__username'})
+FRIENDSHIP_PLAN = ValuesPlan(FriendshipSerializer)
+KINDS = {'session': 'sessions', 'achievement': 'achievements', 'friendship': 'friendships'}
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def make_token(moment):
+    return str((moment - _EPOCH) // datetime.timedelta(microseconds=1))
+
+
+def parse_token(token, now=None):
+    """Datetime of a sync token; raises ValueError for malformed or future tokens."""
+    micros = int(token)
+    if micros < 0:
+        raise ValueError(token)
+    try:
+        moment = _EPOCH + datetime.timedelta(microseconds=micros)
+    except OverflowError:
+        raise ValueError(token) from None
+    # Часы воркеров могут немного расходиться: допускаем опережение в пределах перекрытия
+    if now is not None and moment > now + datetime.timedelta(seconds=settings.SYNC_OVERLAP_SECONDS):
+        raise ValueError(token)
+    return moment
+
+
+def record_deletions(kind, pairs):
+    """Store tombstones for deleted (user_id, object_id) pairs."""
+    SyncTombstone.objects.bulk_create(
+        [SyncTombstone(user_id=user_id, kind=kind, object_id=object_id) for user_id, object_id in pairs]
+    )
+
+
+def record_reset():
+    """Ask every client to reload everything on its next sync."""
+    SyncTombstone.objects.create(user=None, kind='reset')
+
+
+def prune(before):
+    """Delete tombstones older than `before`. Returns the number deleted."""
+    return SyncTombstone.objects.filter(created_at__lt=before).delete()[0]
+
+
+def _full(token):
+    return {'token': token, 'full': True, **{name: [] for name in KINDS.values()}, 'deleted': {name: [] for name in KINDS.values()}}
+
+
+def changes(user, since_token=None, request=None):
+    """
+    Everything that changed for the user since the token, as a dict with a
+    new token; 'full' is true when the client must reload instead.
+    """
+    now = timezone.now()
+    token = make_token(now)
+    if since_token is None:
+        return _full(token)
+    since = parse_token(since_token, now)
+    if since < now - datetime.timedelta(days=settings.SYNC_TOKEN_MAX_AGE_DAYS):
+        return _full(token)
+    since -= datetime.timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+    limit = settings.SYNC_MAX_CHANGES
+
+    deleted = {name: [] for name in KINDS.values()}
+    tombstones = (
+        SyncTombstone.objects.filter(Q(user=user) | Q(user__isnull=True), created_at__gte=since)
+        .order_by('created_at', 'id')
+        .values_list('kind', 'object_id')[:limit * len(KINDS) + 1]
+    )
+    for kind, object_id in tombstones:
+        if kind == 'reset':
+            return _full(token)
+        deleted[KINDS[kind]].append(object_id)
+    if any(len(ids) > limit for ids in deleted.values()):
+        return _full(token)
+
+    sessions = SESSION_PLAN.render(SESSION_PLAN.values(
+        GameSession.objects.filter(user=user, updated_at__gte=since).order_by('updated_at', 'id')
+    )[:limit + 1])
+    achievements = catalog.user_achievements(user, request, changed_since=since)[:limit + 1]
+    friendships = FRIENDSHIP_PLAN.render(FRIENDSHIP_PLAN.values(
+        Friendship.objects.filter(Q(from_user=user) | Q(to_user=user), updated_at__gte=since).order_by('updated_at', 'id')
+    )[:limit + 1])
+    if max(len(sessions), len(achievements), len(friendships)) > limit:
+        return _full(token)
+
+    return {
+        'token': token,
+        'full': False,
+        'sessions': sessions,
+        'achievements': achievements,
+        'friendships': friendships,
+        'deleted': deleted,
+    }
@@ -0,0 +1,30 @@
+"""
+Общие фикстуры для тестов приложения games.
+"""
+import pytest
+from django.core.cache import cache
+
+from games import autosave, catalog, sketches
+from reaction_game import compression, replicas
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Сбрасывает кеш, каталог достижений, скетчи, сжатые тела и буфер автосохранений между тестами (откат БД не шлет сигналы)."""
+    cache.clear()
+    autosave.reset()
+    compression.clear_cache()
+    catalog.invalidate()
+    sketches.reset()
+    yield
+    cache.clear()
+    sketches.reset()
+
+
+@pytest.fixture(autouse=True)
+def primary_only_unless_requested(request, monkeypatch):
+    """Тесты, не запросившие БД 'replica', читают только из основной БД."""
+    marker = request.node.get_closest_marker('django_db')
+    databases = marker.kwargs.get('databases', ()) if marker else ()
+    if replicas.REPLICA_ALIAS not in databases:
+        monkeypatch.setattr(replicas, 'replica_configured', lambda: False)
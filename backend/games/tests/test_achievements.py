@@ -0,0 +1,247 @@
+"""
+Тесты вычисления условий достижений и массовой выдачи.
+"""
+import time
+import pytest
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest.mock import Mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from games import achievements, sketches, streaks
+from games.admin import backfill_selected_achievements
+from games.models import GameSession, Achievement, UserAchievement, PlayerStreak, SessionRollup
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestAchievementBackfill:
+    """Тесты массовой выдачи достижений существующим игрокам."""
+
+    def test_backfill_awards_qualifying_users(self):
+        """Команда выдает достижение только тем, кто выполнил условия."""
+        strong = User.objects.create_user(username='strong', email='strong@test.com')
+        weak = User.objects.create_user(username='weak', email='weak@test.com')
+        fast = User.objects.create_user(username='fast', email='fast@test.com')
+        GameSession.objects.create(user=strong, score=1200, is_completed=True)
+        GameSession.objects.create(user=weak, score=100, is_completed=True)
+        GameSession.objects.create(user=fast, score=10, reaction_times=[150, 170])
+        score = Achievement.objects.create(name='Score', description='Test', requirement={'min_score': 1000})
+        reaction = Achievement.objects.create(name='Fast', description='Test', requirement={'max_reaction_time': 200})
+
+        out = StringIO()
+        call_command('backfill_achievements', '--chunk-size', '1', stdout=out)
+
+        assert set(UserAchievement.objects.filter(achievement=score).values_list('user__username', flat=True)) == {'strong'}
+        assert set(UserAchievement.objects.filter(achievement=reaction).values_list('user__username', flat=True)) == {'fast'}
+        assert '--start-after' in out.getvalue()
+
+    def test_backfill_is_idempotent(self):
+        """Повторный запуск не создает дубликатов."""
+        user = User.objects.create_user(username='player', email='player@test.com')
+        for _ in range(3):
+            GameSession.objects.create(user=user, score=10, is_completed=True)
+        games = Achievement.objects.create(name='Games', description='Test', requirement={'min_games': 3})
+
+        call_command('backfill_achievements', str(games.id), stdout=StringIO())
+        call_command('backfill_achievements', str(games.id), stdout=StringIO())
+
+        assert UserAchievement.objects.filter(user=user, achievement=games).count() == 1
+
+    def test_backfill_counts_only_inserted_awards(self, monkeypatch):
+        """Достижение, выданное параллельно после выборки, не попадает в счетчик."""
+        first = User.objects.create_user(username='first', email='first@test.com')
+        second = User.objects.create_user(username='second', email='second@test.com')
+        for user in (first, second):
+            GameSession.objects.create(user=user, score=1200, is_completed=True)
+        score = Achievement.objects.create(name='Score', description='Test', requirement={'min_score': 1000})
+        UserAchievement.objects.create(user=first, achievement=score)
+        monkeypatch.setattr(achievements, 'qualifying_user_ids', lambda achievement, lower, upper: [first.pk, second.pk])
+
+        assert achievements.backfill([score]) == 1
+        assert UserAchievement.objects.filter(achievement=score).count() == 2
+
+
+def _wait_for_backfill():
+    deadline = time.monotonic() + 10
+    while achievements.backfill_status()['state'] == 'running':
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return achievements.backfill_status()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAdminBackfill:
+    """Фоновая выдача из админки: одна на все процессы, с отчетом о результате."""
+
+    def test_runs_in_background_once_across_processes(self, admin_client):
+        user = User.objects.create_user(username='strong', email='strong@test.com')
+        GameSession.objects.create(user=user, score=1200, is_completed=True)
+        score = Achievement.objects.create(name='Score', description='Test', requirement={'min_score': 1000})
+        Achievement.objects.create(name='Other', description='Test', requirement={'min_score': 1})
+        modeladmin = Mock()
+
+        # Блокировку держит выдача в другом процессе
+        cache.add(achievements.BACKFILL_LOCK_KEY, 1)
+        backfill_selected_achievements(modeladmin, None, Achievement.objects.filter(pk=score.pk))
+        assert 'еще выполняется' in modeladmin.message_user.call_args.args[1]
+        cache.delete(achievements.BACKFILL_LOCK_KEY)
+
+        backfill_selected_achievements(modeladmin, None, Achievement.objects.filter(pk=score.pk))
+        assert 'в фоне' in modeladmin.message_user.call_args.args[1]
+
+        status = _wait_for_backfill()
+        assert (status['state'], status['awarded']) == ('finished', 1)
+        assert cache.get(achievements.BACKFILL_LOCK_KEY) is None
+        assert list(UserAchievement.objects.values_list('achievement__name', flat=True)) == ['Score']
+        assert 'завершена, выдано 1' in admin_client.get('/admin/games/achievement/').content.decode()
+
+    def test_failure_and_interruption_reported(self, admin_client, monkeypatch):
+        score = Achievement.objects.create(name='Score', description='Test', requirement={'min_score': 1000})
+
+        def broken(achievement_list, on_progress=None):
+            on_progress(500, 1000, 3)
+            raise RuntimeError('БД недоступна')
+
+        monkeypatch.setattr(achievements, 'backfill', broken)
+        assert achievements.start_backfill([score.pk])
+        status = _wait_for_backfill()
+        assert (status['state'], status['checkpoint']) == ('failed', 500)
+        assert f'backfill_achievements {score.pk} --start-after 500' in admin_client.get('/admin/games/achievement/').content.decode()
+
+        # Процесс погиб посреди выдачи: отчета нет, блокировка истекла
+        cache.set(achievements.BACKFILL_STATUS_KEY, {**status, 'state': 'running'})
+        assert achievements.backfill_status()['state'] == 'interrupted'
+
+
+@pytest.mark.django_db
+class TestStreaks:
+    """Тесты инкрементального подсчета серий."""
+
+    def _play(self, user, day):
+        session = GameSession.objects.create(user=user, score=10, is_completed=True)
+        GameSession.objects.filter(pk=session.pk).update(
+            created_at=timezone.make_aware(datetime.combine(day, datetime.min.time().replace(hour=12)))
+        )
+        session.refresh_from_db()
+        return streaks.record_session(session)
+
+    def test_streak_advances_on_consecutive_days(self):
+        """Серия растет по дням подряд и сбрасывается после пропуска."""
+        user = User.objects.create_user(username='daily', email='daily@test.com')
+        start = date(2026, 1, 1)
+
+        self._play(user, start)
+        self._play(user, start)
+        self._play(user, start + timedelta(days=1))
+        streak = self._play(user, start + timedelta(days=2))
+        assert (streak.current_streak, streak.best_streak) == (3, 3)
+
+        streak = self._play(user, start + timedelta(days=5))
+        assert (streak.current_streak, streak.best_streak) == (1, 3)
+        assert streak.active_streak(start + timedelta(days=7)) == 0
+
+    def test_rebuild_matches_incremental(self):
+        """Команда пересчета дает тот же результат, что и инкрементальный подсчет."""
+        user = User.objects.create_user(username='rebuild', email='rebuild@test.com')
+        start = date(2026, 3, 1)
+        for offset in (0, 1, 2, 4, 5):
+            self._play(user, start + timedelta(days=offset))
+        expected = PlayerStreak.objects.get(user=user)
+        PlayerStreak.objects.all().delete()
+
+        call_command('rebuild_streaks', '--batch-size', '1', stdout=StringIO())
+
+        rebuilt = PlayerStreak.objects.get(user=user)
+        assert (rebuilt.current_streak, rebuilt.best_streak, rebuilt.last_day) == (
+            expected.current_streak, expected.best_streak, expected.last_day
+        )
+
+    def test_streak_achievement_awarded(self):
+        """Достижение типа 'streak' выдается через API при завершении игры."""
+        user = User.objects.create_user(username='streaker', email='streaker@test.com')
+        PlayerStreak.objects.create(user=user, current_streak=2, best_streak=2, last_day=timezone.localdate() - timedelta(days=1))
+        achievement = Achievement.objects.create(
+            name='Streak', description='Test', achievement_type='streak', requirement={'min_streak': 3}
+        )
+        api = APIClient()
+        api.force_authenticate(user=user)
+
+        api.post('/api/games/sessions/', {'score': 10, 'is_completed': True}, format='json')
+
+        assert UserAchievement.objects.filter(user=user, achievement=achievement).exists()
+
+
+@pytest.mark.django_db
+class TestSessionCompaction:
+    """Тесты сворачивания старых сессий в суточные агрегаты."""
+
+    def _session(self, user, days_ago, **fields):
+        session = GameSession.objects.create(user=user, **fields)
+        GameSession.objects.filter(pk=session.pk).update(
+            created_at=timezone.now() - timedelta(days=days_ago)
+        )
+        return session
+
+    def _history(self, user):
+        for days_ago in (300, 300, 299, 298):
+            self._session(user, days_ago, score=900 + days_ago, is_completed=True, reaction_times=[days_ago])
+        self._session(user, 300, score=5000, difficulty='hard', reaction_times=[90])
+        self._session(user, 1, score=100, is_completed=True, reaction_times=[250])
+
+    def test_compaction_preserves_stats(self):
+        """После сворачивания статистика и счетчики не меняются."""
+        user = User.objects.create_user(username='veteran', email='veteran@test.com')
+        self._history(user)
+        streaks.rebuild()
+        before = achievements.user_stats(user)
+        streak_before = PlayerStreak.objects.values_list('best_streak', flat=True).get(user=user)
+        sketch_count = sketches.rebuild()
+
+        out = StringIO()
+        call_command('compact_sessions', '--older-than-days', '30', '--batch-size', '2', stdout=out)
+
+        assert GameSession.objects.filter(user=user).count() == 1
+        assert SessionRollup.objects.filter(user=user).count() == 4
+        assert achievements.user_stats(user) == before
+        assert achievements.games_played(user) == 5
+        assert streaks.rebuild() == 1
+        assert PlayerStreak.objects.values_list('best_streak', flat=True).get(user=user) == streak_before
+        assert sketches.rebuild() == sketch_count
+        assert 'Свернуто сессий: 5' in out.getvalue()
+
+    def test_compaction_merges_into_existing_rollup(self):
+        """Повторный запуск дополняет уже существующую свертку того же дня."""
+        user = User.objects.create_user(username='late', email='late@test.com')
+        self._session(user, 100, score=300, is_completed=True, reaction_times=[300])
+        call_command('compact_sessions', '--older-than-days', '30', stdout=StringIO())
+        self._session(user, 100, score=700, is_completed=True, reaction_times=[100])
+        call_command('compact_sessions', '--older-than-days', '30', stdout=StringIO())
+
+        rollup = SessionRollup.objects.get(user=user)
+        assert (rollup.sessions_count, rollup.completed_count, rollup.best_score) == (2, 2, 700)
+        assert (rollup.reaction_sum, rollup.reaction_count, rollup.best_reaction_time) == (400, 2, 100)
+        assert sketches.QuantileSketch.from_dict(rollup.histogram).count == 2
+
+    def test_backfill_counts_compacted_games(self):
+        """Массовая выдача учитывает игры из сверток вместе со свежими."""
+        user = User.objects.create_user(username='mixed', email='mixed@test.com')
+        self._session(user, 100, score=10, is_completed=True)
+        self._session(user, 100, score=10, is_completed=True)
+        call_command('compact_sessions', '--older-than-days', '30', stdout=StringIO())
+        GameSession.objects.create(user=user, score=10, is_completed=True)
+        compacted_only = User.objects.create_user(username='old', email='old@test.com')
+        self._session(compacted_only, 100, score=2000, is_completed=True)
+        call_command('compact_sessions', '--older-than-days', '30', stdout=StringIO())
+        games = Achievement.objects.create(name='Games', description='Test', requirement={'min_games': 3})
+        score = Achievement.objects.create(name='Score', description='Test', requirement={'min_score': 1000})
+
+        call_command('backfill_achievements', stdout=StringIO())
+
+        assert set(UserAchievement.objects.filter(achievement=games).values_list('user__username', flat=True)) == {'mixed'}
+        assert set(UserAchievement.objects.filter(achievement=score).values_list('user__username', flat=True)) == {'old'}
+
@@ -0,0 +1,78 @@
+"""
+Тесты колоночной выгрузки сессий для аналитики.
+"""
+import pytest
+from datetime import timedelta
+from io import StringIO
+import pyarrow.dataset as pa_dataset
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from games import analytics
+from games.models import GameSession
+
+User = get_user_model()
+
+
+def test_split_ranges_cover_interval():
+    assert analytics.split_ranges(0, 10, 3) == [(0, 4), (4, 8), (8, 10)]
+    assert analytics.split_ranges(5, 6, 4) == [(5, 6)]
+
+
+def _read(directory):
+    paths = sorted(str(path) for path in directory.glob('ids_*/part-*.parquet'))
+    return pa_dataset.dataset(paths, format='parquet').to_table().sort_by('id')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_export_parquet_parallel_and_incremental(tmp_path, settings):
+    """Параллельная выгрузка без потерь и инкрементальная догрузка по водяному знаку."""
+    settings.ANALYTICS_EXPORT_SETTLE_SECONDS = 0
+    user = User.objects.create_user(username='analyst', email='analyst@test.com')
+    for score in range(7):
+        GameSession.objects.create(
+            user=user, score=score, difficulty='hard', is_completed=True,
+            reaction_times=[200 + score, 300], game_state={'level': score},
+        )
+
+    call_command(
+        'export_sessions', '--output', str(tmp_path), '--workers', '3', '--row-group-size', '2',
+        stdout=StringIO(),
+    )
+
+    table = _read(tmp_path)
+    assert table.num_rows == 7
+    assert table.column('score').to_pylist() == list(range(7))
+    assert table.column('reaction_times').to_pylist()[3] == [203.0, 300.0]
+    assert table.column('username').to_pylist()[0] == 'analyst'
+    assert table.column('game_state').to_pylist()[2] == '{"level": 2}'
+
+    out = StringIO()
+    call_command('export_sessions', '--output', str(tmp_path), '--incremental', stdout=out)
+    assert 'Новых сессий для выгрузки нет' in out.getvalue()
+
+    GameSession.objects.create(user=user, score=100)
+    call_command('export_sessions', '--output', str(tmp_path), '--incremental', stdout=StringIO())
+    assert _read(tmp_path).num_rows == 8
+
+
+@pytest.mark.django_db
+def test_export_waits_for_recent_sessions_to_settle(tmp_path, settings):
+    """Свежие сессии не выгружаются и не сдвигают водяной знак, пока не устоятся."""
+    settings.ANALYTICS_EXPORT_SETTLE_SECONDS = 60
+    user = User.objects.create_user(username='late', email='late@test.com')
+    old = GameSession.objects.create(user=user, score=1, difficulty='easy')
+    fresh = GameSession.objects.create(user=user, score=2, difficulty='medium')
+    GameSession.objects.filter(pk=old.pk).update(updated_at=timezone.now() - timedelta(minutes=5))
+
+    call_command('export_sessions', '--output', str(tmp_path), '--incremental', '--format', 'arrow', stdout=StringIO())
+
+    assert analytics.read_watermark(tmp_path) == old.pk
+    table = pa_dataset.dataset(sorted(str(path) for path in tmp_path.glob('ids_*/part-*.arrow')), format='arrow').to_table()
+    assert table.column('score').to_pylist() == [1]
+    assert table.column('difficulty').type == analytics.schema().field('difficulty').type
+
+    GameSession.objects.filter(pk=fresh.pk).update(updated_at=timezone.now() - timedelta(minutes=5))
+    call_command('export_sessions', '--output', str(tmp_path), '--incremental', stdout=StringIO())
+    assert analytics.read_watermark(tmp_path) == fresh.pk
+    assert _read(tmp_path).column('difficulty').to_pylist() == ['medium']
@@ -0,0 +1,125 @@
+"""
+Тесты сжатия ответов и кеша сжатых тел.
+"""
+import gzip
+
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from games.models import Achievement, Leaderboard
+from reaction_game import compression
+
+User = get_user_model()
+
+
+@pytest.fixture
+def leaders():
+    for index in range(30):
+        user = User.objects.create_user(username=f'player{index}', email=f'player{index}@test.com')
+        Leaderboard.objects.create(user=user, difficulty='easy', score=100 * index, avg_reaction_time=300.5)
+
+
+def _decode(response):
+    encoding = response.get('Content-Encoding')
+    if encoding == 'br':
+        return pytest.importorskip('brotli').decompress(response.content)
+    if encoding == 'gzip':
+        return gzip.decompress(response.content)
+    return response.content
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, deflate, br', 'br'),
+    ('br;q=0, gzip', 'gzip'),
+    ('gzip;q=0.5', 'gzip'),
+    ('*', 'br'),
+    ('identity', None),
+    ('', None),
+])
+def test_accepted_encoding(header, expected, monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', object())
+    assert compression.accepted_encoding(header) == expected
+
+
+def test_accepted_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+    assert compression.accepted_encoding('br, gzip') == 'gzip'
+    assert compression.accepted_encoding('br') is None
+
+
+def test_accepted_encoding_limited_to_codings():
+    assert compression.accepted_encoding('br, gzip', codings=('gzip',)) == 'gzip'
+    assert compression.accepted_encoding('br, gzip;q=0', codings=('gzip',)) is None
+
+
+@pytest.mark.django_db
+class TestCompressionMiddleware:
+    """Тесты согласования и порога сжатия."""
+
+    def test_large_json_compressed(self, leaders):
+        client = APIClient()
+        plain = client.get('/api/games/leaderboard/')
+
+        for encoding in ('gzip', 'br'):
+            if encoding == 'br' and compression.brotli is None:
+                continue
+            response = client.get('/api/games/leaderboard/', HTTP_ACCEPT_ENCODING=encoding)
+            assert response['Content-Encoding'] == encoding
+            assert 'Accept-Encoding' in response['Vary']
+            assert int(response['Content-Length']) < len(plain.content)
+            assert _decode(response) == plain.content
+
+    def test_small_body_not_compressed(self):
+        response = APIClient().get('/api/games/leaderboard/', HTTP_ACCEPT_ENCODING='gzip')
+
+        assert len(response.content) < 1024
+        assert not response.has_header('Content-Encoding')
+
+    def test_html_not_compressed(self, leaders):
+        response = APIClient().get('/api/games/leaderboard/', HTTP_ACCEPT='text/html', HTTP_ACCEPT_ENCODING='gzip')
+
+        assert response['Content-Type'].startswith('text/html')
+        assert not response.has_header('Content-Encoding')
+
+    def test_cached_bodies_compressed_once(self, leaders, monkeypatch):
+        """Топ лидеров сжимается один раз и переиспользуется, пока данные не изменились."""
+        calls = []
+        original = compression.compress
+        monkeypatch.setattr(compression, 'compress', lambda *args, **kwargs: calls.append(args[1]) or original(*args, **kwargs))
+        client = APIClient()
+
+        first = client.get('/api/games/leaderboard/top/?limit=30', HTTP_ACCEPT_ENCODING='gzip')
+        second = client.get('/api/games/leaderboard/top/?limit=30', HTTP_ACCEPT_ENCODING='gzip')
+        assert calls == ['gzip']
+        assert first.content == second.content
+
+        Leaderboard.objects.filter(score=0).delete()
+        Leaderboard.objects.create(user=User.objects.get(username='player0'), difficulty='easy', score=5000)
+        third = client.get('/api/games/leaderboard/top/?limit=30', HTTP_ACCEPT_ENCODING='gzip')
+        assert calls == ['gzip', 'gzip']
+        assert b'"score":5000' in _decode(third)
+
+    def test_catalog_weak_etag_revalidates(self):
+        for index in range(20):
+            Achievement.objects.create(name=f'Достижение {index}', description='Описание достижения ' * 5, points=index)
+        client = APIClient()
+
+        response = client.get('/api/games/achievements/', HTTP_ACCEPT_ENCODING='gzip')
+        assert response['Content-Encoding'] == 'gzip'
+        assert response['ETag'].startswith('W/"')
+
+        response = client.get('/api/games/achievements/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 304
+
+    def test_schema_cached_and_compressed(self, monkeypatch):
+        client = APIClient()
+        first = client.get('/api/schema/', HTTP_ACCEPT_ENCODING='gzip')
+        calls = []
+        monkeypatch.setattr(compression, 'compress', lambda *args, **kwargs: calls.append(args))
+
+        second = client.get('/api/schema/', HTTP_ACCEPT_ENCODING='gzip')
+
+        assert first['Content-Encoding'] == 'gzip'
+        assert second.content == first.content
+        assert calls == []
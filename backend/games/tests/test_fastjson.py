@@ -0,0 +1,114 @@
+"""
+Тесты быстрого JSON-рендерера, парсера и декодера JSONField.
+"""
+import datetime
+import io
+import json
+import uuid
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils.functional import lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from games.models import GameSession
+from reaction_game import fastjson
+
+User = get_user_model()
+
+pytestmark = pytest.mark.skipif(fastjson.orjson is None, reason='orjson не установлен')
+
+
+def _payload():
+    moscow = datetime.timezone(datetime.timedelta(hours=3))
+    return {
+        'results': [{
+            'created_at': datetime.datetime(2024, 5, 1, 10, 0, 0, 123456, tzinfo=datetime.timezone.utc),
+            'updated_at': datetime.datetime(2024, 5, 1, 13, 0, tzinfo=moscow),
+            'naive': datetime.datetime(2024, 5, 1, 10, 0),
+            'day': datetime.date(2024, 5, 1),
+            'at': datetime.time(10, 30, 15, 500),
+            'duration': datetime.timedelta(seconds=90),
+            'ratio': Decimal('12.50'),
+            'token': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'label': lazy(lambda: 'Легкий', str)(),
+            'reaction_times': [215.5, 301.25, 0.1, 1.0],
+            'game_state': {'level': 3, 'text': 'строка\u2028с разделителем'},
+            'tuple': (1, 2),
+            1: 'числовой ключ',
+            'big': 2 ** 70,
+        }],
+        'next': None,
+    }
+
+
+def test_renderer_matches_drf_bytes():
+    """Вывод байт в байт совпадает с JSONRenderer, включая откат для больших целых."""
+    payload = _payload()
+    expected = JSONRenderer().render(payload)
+
+    assert fastjson.FastJSONRenderer().render(payload) == expected
+    assert b'\\u2028' in expected
+
+
+def test_renderer_orjson_path_matches_drf_bytes():
+    payload = _payload()
+    del payload['results'][0]['big']
+
+    assert fastjson.FastJSONRenderer().render(payload) == JSONRenderer().render(payload)
+
+
+def test_renderer_indent_and_fallback(monkeypatch):
+    payload = {'score': 10}
+    context = {'indent': 4}
+    assert fastjson.FastJSONRenderer().render(payload, renderer_context=context) == JSONRenderer().render(payload, renderer_context=context)
+
+    monkeypatch.setattr(fastjson, 'orjson', None)
+    assert fastjson.FastJSONRenderer().render(_payload()) == JSONRenderer().render(_payload())
+
+
+def test_parser_matches_drf():
+    body = json.dumps({'score': 10, 'reaction_times': [1.5, 2], 'big': 2 ** 70, 'name': 'игрок'}).encode()
+
+    assert fastjson.FastJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body))
+
+
+@pytest.mark.parametrize('body', [b'{broken', b'{"score": NaN}'])
+def test_parser_errors_match_drf(body):
+    with pytest.raises(ParseError) as expected:
+        JSONParser().parse(io.BytesIO(body))
+    with pytest.raises(ParseError) as actual:
+        fastjson.FastJSONParser().parse(io.BytesIO(body))
+
+    assert str(actual.value) == str(expected.value)
+
+
+def test_decoder_falls_back_to_stdlib():
+    assert json.loads('{"a": [1, 2.5]}', cls=fastjson.FastJSONDecoder) == {'a': [1, 2.5]}
+    assert json.loads('[NaN, 1e400]', cls=fastjson.FastJSONDecoder)[1] == float('inf')
+    with pytest.raises(json.JSONDecodeError):
+        json.loads('{broken', cls=fastjson.FastJSONDecoder)
+
+
+@pytest.mark.django_db
+def test_jsonfield_round_trip():
+    user = User.objects.create_user(username='json', email='json@test.com')
+    session = GameSession.objects.create(
+        user=user, reaction_times=[215.5, 300], game_state={'level': 2, 'name': 'уровень'},
+    )
+
+    loaded = GameSession.objects.get(pk=session.pk)
+    assert loaded.reaction_times == [215.5, 300]
+    assert loaded.game_state == {'level': 2, 'name': 'уровень'}
+    assert GameSession.objects.values_list('game_state__level', flat=True).get(pk=session.pk) == 2
+
+
+@pytest.mark.django_db
+def test_api_uses_fast_renderer(client):
+    response = client.get('/api/games/leaderboard/')
+
+    assert isinstance(response.accepted_renderer, fastjson.FastJSONRenderer)
+    assert response['Content-Type'] == 'application/json'
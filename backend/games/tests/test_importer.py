@@ -0,0 +1,116 @@
+"""
+Тесты массовой загрузки истории игровых сессий.
+"""
+import json
+import random
+import time
+import pytest
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from games import leaderboard, sync
+from games.importer import average_reaction_times, import_sessions
+from games.models import GameSession, Leaderboard
+
+User = get_user_model()
+
+
+def test_average_reaction_times_matches_python():
+    """Векторный расчет совпадает с GameSession.save() и пропускает пустые списки."""
+    rng = random.Random(7)
+    lists = [[rng.uniform(100, 900) for _ in range(rng.randint(0, 6))] for _ in range(500)]
+    lists[0] = []
+
+    averages = average_reaction_times(lists)
+
+    for values, avg in zip(lists, averages):
+        if values:
+            assert avg == pytest.approx(sum(values) / len(values))
+        else:
+            assert avg is None
+
+
+@pytest.mark.django_db
+class TestImportSessions:
+    """Тесты команды import_sessions."""
+
+    def test_sync_during_import_sees_later_chunks(self, settings):
+        """Синхронизация между чанками получает строки следующих чанков."""
+        settings.SYNC_OVERLAP_SECONDS = 0
+        user = User.objects.create_user(username='importer', email='importer@test.com')
+        lines = [json.dumps({'user_id': user.id, 'score': score}) for score in (1, 2)]
+        tokens = []
+
+        def sync_between_chunks(imported, skipped):
+            if imported == 1:
+                time.sleep(0.01)
+                tokens.append(sync.changes(user)['token'])
+                time.sleep(0.01)
+
+        import_sessions(StringIO('\n'.join(lines)), chunk_size=1, on_progress=sync_between_chunks)
+
+        result = sync.changes(user, tokens[0])
+        assert [row['score'] for row in result['sessions']] == [2]
+
+    def test_ndjson_import(self, tmp_path):
+        """Загружаются корректные строки, ошибки пропускаются с номером строки."""
+        alice = User.objects.create_user(username='alice', email='alice@test.com')
+        bob = User.objects.create_user(username='bob', email='bob@test.com')
+        lines = [
+            {'username': 'alice', 'score': 700, 'difficulty': 'hard', 'is_completed': True,
+             'reaction_times': [200, 300], 'created_at': '2024-05-01T10:00:00Z'},
+            {'user_id': bob.id, 'score': 900, 'difficulty': 'hard', 'is_completed': True,
+             'reaction_times': [250], 'game_state': {'level': 3}},
+            {'user_id': alice.id, 'score': 50, 'is_completed': False},
+            {'username': 'ghost', 'score': 10},
+            {'username': 'alice', 'difficulty': 'insane'},
+        ]
+        path = tmp_path / 'sessions.ndjson'
+        path.write_text('\n'.join(json.dumps(line) for line in lines) + '\n{broken\n', encoding='utf-8')
+
+        out, err = StringIO(), StringIO()
+        call_command('import_sessions', str(path), '--chunk-size', '2', stdout=out, stderr=err)
+
+        assert GameSession.objects.count() == 3
+        imported = GameSession.objects.get(user=alice, score=700)
+        assert imported.avg_reaction_time == 250
+        assert imported.created_at.year == 2024
+        assert GameSession.objects.get(user=bob).game_state == {'level': 3}
+        assert 'Строка 4' in err.getvalue() and 'Строка 6' in err.getvalue()
+
+        entries = {entry.user_id: entry for entry in Leaderboard.objects.filter(difficulty='hard')}
+        assert (entries[bob.id].score, entries[bob.id].rank) == (900, 1)
+        assert (entries[alice.id].score, entries[alice.id].rank) == (700, 2)
+        assert entries[alice.id].date_achieved.year == 2024
+
+    def test_csv_import(self, tmp_path):
+        """CSV с JSON-строками в составных полях."""
+        user = User.objects.create_user(username='carol', email='carol@test.com')
+        path = tmp_path / 'sessions.csv'
+        path.write_text(
+            'username,score,difficulty,is_completed,reaction_times,time_played\n'
+            'carol,400,easy,true,"[100, 200, 300]",30\n'
+            'carol,100,easy,false,,5\n',
+            encoding='utf-8',
+        )
+
+        call_command('import_sessions', str(path), stdout=StringIO(), stderr=StringIO())
+
+        sessions = GameSession.objects.filter(user=user).order_by('score')
+        assert [(s.score, s.is_completed, s.avg_reaction_time) for s in sessions] == [
+            (100, False, None), (400, True, 200),
+        ]
+        assert Leaderboard.objects.get(user=user, difficulty='easy').score == 400
+
+
+@pytest.mark.django_db
+def test_leaderboard_rebuild_never_lowers_scores():
+    """Пересчет поднимает рекорды, но не понижает существующие."""
+    user = User.objects.create_user(username='champ', email='champ@test.com')
+    Leaderboard.objects.create(user=user, difficulty='easy', score=1000)
+    GameSession.objects.create(user=user, difficulty='easy', score=500, is_completed=True)
+    GameSession.objects.create(user=user, difficulty='medium', score=300, is_completed=True)
+
+    assert leaderboard.rebuild() == 1
+    assert Leaderboard.objects.get(user=user, difficulty='easy').score == 1000
+    assert Leaderboard.objects.get(user=user, difficulty='medium').rank == 1
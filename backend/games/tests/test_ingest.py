@@ -0,0 +1,101 @@
+"""
+Тесты группового коммита завершенных сессий.
+"""
+import threading
+from concurrent.futures import Future
+
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from games import ingest, sketches
+from games.models import GameSession, Leaderboard, PlayerStreak
+
+User = get_user_model()
+
+
+def _batch(*sessions):
+    return [(session, Future()) for session in sessions]
+
+
+@pytest.mark.django_db
+class TestCommitBatch:
+    """Пачка сессий пишется одной транзакцией с рекордами и сериями."""
+
+    def test_batch_applies_records_and_streaks(self):
+        first = User.objects.create_user(username='first', email='first@test.com')
+        second = User.objects.create_user(username='second', email='second@test.com')
+        Leaderboard.objects.create(user=first, difficulty='easy', score=100)
+        Leaderboard.objects.create(user=second, difficulty='easy', score=900)
+        batch = _batch(
+            GameSession(user=first, difficulty='easy', score=50, is_completed=True, reaction_times=[200, 400]),
+            GameSession(user=first, difficulty='easy', score=300, is_completed=True, reaction_times=[250]),
+            GameSession(user=second, difficulty='hard', score=200, is_completed=True),
+            GameSession(user=second, difficulty='easy', score=10, is_completed=True),
+        )
+
+        ingest.commit(batch)
+
+        sessions = [future.result() for _, future in batch]
+        assert all(session.pk for session in sessions)
+        assert sessions[0].avg_reaction_time == 300
+        assert GameSession.objects.filter(user__in=[first, second]).count() == 4
+        record = Leaderboard.objects.get(user=first, difficulty='easy')
+        assert (record.score, record.avg_reaction_time, record.date_achieved) == (300, 250, sessions[1].created_at)
+        assert Leaderboard.objects.get(user=second, difficulty='easy').score == 900
+        assert Leaderboard.objects.get(user=second, difficulty='hard').rank == 1
+        assert PlayerStreak.objects.get(user=first).current_streak == 1
+        assert sessions[0].user.streak.best_streak == 1
+        assert sketches.sketch_for('easy').count == 2
+
+    def test_failed_batch_retries_sessions_one_by_one(self):
+        user = User.objects.create_user(username='player', email='player@test.com')
+        batch = _batch(
+            GameSession(user=user, score=10, is_completed=True),
+            GameSession(user=user, score=20, is_completed=True, game_state={'bad': object()}),
+            GameSession(user=user, score=30, is_completed=True),
+        )
+
+        ingest.commit(batch)
+
+        assert isinstance(batch[1][1].exception(), TypeError)
+        assert [future.result().score for _, future in (batch[0], batch[2])] == [10, 30]
+        assert sorted(GameSession.objects.values_list('score', flat=True)) == [10, 30]
+        assert Leaderboard.objects.get(user=user).score == 30
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_posts_share_a_commit(settings, monkeypatch):
+    """Параллельные запросы получают ответ после общего коммита."""
+    settings.SESSION_GROUP_COMMIT = True
+    settings.SESSION_GROUP_COMMIT_DELAY_MS = 300
+    sizes = []
+    commit = ingest.commit
+    monkeypatch.setattr(ingest, 'commit', lambda batch: sizes.append(len(batch)) or commit(batch))
+    users = [User.objects.create_user(username=f'racer{n}', email=f'racer{n}@test.com') for n in range(4)]
+    responses = []
+
+    def play(user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        responses.append(client.post('/api/games/sessions/', {
+            'score': 100 + user.pk, 'difficulty': 'medium', 'is_completed': True, 'reaction_times': [300],
+        }, format='json'))
+
+    threads = [threading.Thread(target=play, args=(user,)) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [response.status_code for response in responses] == [status.HTTP_201_CREATED] * 4
+    assert {response.data['id'] for response in responses} == set(GameSession.objects.values_list('id', flat=True))
+    assert max(sizes) > 1
+    assert Leaderboard.objects.filter(difficulty='medium').count() == 4
+
+    # Незавершенная сессия сохраняется в потоке запроса
+    client = APIClient()
+    client.force_authenticate(user=users[0])
+    assert client.post('/api/games/sessions/', {'score': 1}, format='json').status_code == status.HTTP_201_CREATED
+    assert sum(sizes) == 4
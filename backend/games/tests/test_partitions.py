@@ -0,0 +1,72 @@
+"""
+Тесты помесячного секционирования игровых сессий.
+
+Сами секции создаются только в PostgreSQL; здесь проверяются расчет
+границ месяцев, отказ команды на других СУБД и фильтр по дате в API.
+"""
+import datetime
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+from games import partitions
+from games.models import GameSession
+
+User = get_user_model()
+
+
+class TestMonths:
+    """Расчет месяцев и имен секций."""
+
+    def test_add_months_crosses_year(self):
+        assert partitions.add_months(datetime.date(2026, 11, 1), 3) == datetime.date(2027, 2, 1)
+        assert partitions.add_months(datetime.date(2026, 1, 1), -1) == datetime.date(2025, 12, 1)
+
+    def test_month_start_uses_utc(self):
+        """Граница месяца считается в UTC, как и границы секций."""
+        moscow = datetime.timezone(datetime.timedelta(hours=3))
+        value = datetime.datetime(2026, 11, 1, 1, 0, tzinfo=moscow)
+        assert partitions.month_start(value) == datetime.date(2026, 10, 1)
+
+    def test_partition_name_and_archive_path(self, tmp_path):
+        month = partitions.parse_month('2026-03')
+        assert partitions.partition_name(month) == 'games_gamesession_p2026_03'
+        assert partitions.archive_path(month, tmp_path) == tmp_path / 'games_gamesession_p2026_03.csv.gz'
+
+    def test_parse_month_rejects_garbage(self):
+        with pytest.raises(ValueError):
+            partitions.parse_month('2026-13')
+
+
+@pytest.mark.django_db
+class TestSessionPartitionsCommand:
+
+    @pytest.mark.skipif(connection.vendor == 'postgresql', reason='Проверка для СУБД без секционирования')
+    def test_refuses_without_postgresql(self):
+        with pytest.raises(CommandError):
+            call_command('session_partitions')
+
+    def test_bad_month_argument(self):
+        with pytest.raises(CommandError):
+            call_command('session_partitions', '--archive-before', 'last-year')
+
+
+@pytest.mark.django_db
+def test_sessions_filter_by_created_at():
+    """Фильтр по created_at позволяет читать только свежие месяцы."""
+    user = User.objects.create_user(username='player', password='testpass123')
+    old = GameSession.objects.create(user=user, score=100)
+    GameSession.objects.filter(pk=old.pk).update(created_at=timezone.now() - datetime.timedelta(days=90))
+    recent = GameSession.objects.create(user=user, score=200)
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    since = (timezone.now() - datetime.timedelta(days=30)).isoformat()
+    response = client.get('/api/games/sessions/', {'created_at__gte': since})
+
+    assert response.status_code == 200
+    rows = response.data['results'] if isinstance(response.data, dict) else response.data
+    assert [row['id'] for row in rows] == [recent.pk]
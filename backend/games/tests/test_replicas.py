@@ -0,0 +1,126 @@
+"""
+Тесты маршрутизации чтения на реплику.
+
+Интеграционные тесты запускаются, если настроена вторая БД
+(DB_REPLICA_HOST, например второй локальный экземпляр PostgreSQL).
+"""
+import pytest
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework import status
+from games.models import GameSession, Leaderboard
+from reaction_game import replicas
+
+User = get_user_model()
+
+replica_required = pytest.mark.skipif(
+    replicas.REPLICA_ALIAS not in settings.DATABASES,
+    reason='Реплика не настроена (DB_REPLICA_HOST)',
+)
+
+
+class TestReplicaRouter:
+    """Решения роутера в зависимости от состояния запроса."""
+
+    def test_falls_back_to_primary_without_replica(self, monkeypatch):
+        """Без настроенной реплики чтение идет в основную БД."""
+        monkeypatch.setattr(replicas, 'replica_configured', lambda: False)
+        router = replicas.ReplicaRouter()
+        token = replicas._use_replica.set(True)
+        try:
+            assert router.db_for_read(GameSession) is None
+        finally:
+            replicas._use_replica.reset(token)
+
+    def test_reads_after_write_stay_on_primary(self, monkeypatch):
+        """После записи в том же запросе чтение не уходит на реплику."""
+        monkeypatch.setattr(replicas, 'replica_configured', lambda: True)
+        router = replicas.ReplicaRouter()
+        replica_token = replicas._use_replica.set(True)
+        wrote_token = replicas._wrote.set(False)
+        try:
+            assert router.db_for_read(GameSession) == replicas.REPLICA_ALIAS
+            assert router.db_for_write(GameSession) == 'default'
+            assert router.db_for_read(GameSession) is None
+        finally:
+            replicas._use_replica.reset(replica_token)
+            replicas._wrote.reset(wrote_token)
+
+    def test_replica_is_never_migrated(self):
+        """Миграции не применяются к реплике."""
+        assert replicas.ReplicaRouter().allow_migrate(replicas.REPLICA_ALIAS, 'games') is False
+
+
+@pytest.mark.django_db
+class TestReplicaPinning:
+    """Закрепление клиента за основной БД после собственной записи."""
+
+    def test_write_sets_pin_cookie(self):
+        """Успешный POST выставляет cookie закрепления."""
+        user = User.objects.create_user(username='writer', email='writer@test.com')
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.post('/api/games/sessions/', {'score': 10}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.cookies[replicas.PIN_COOKIE].value == '1'
+        assert replicas.is_pinned(response.wsgi_request, user)
+
+    def test_token_client_pinned_by_header(self, settings):
+        """Клиент без cookie закреплен, пока возвращает подписанный заголовок."""
+        settings.REPLICA_PIN_SECONDS = 5
+        user = User.objects.create_user(username='token', email='token@test.com')
+        other = User.objects.create_user(username='other', email='other@test.com')
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        token = client.post('/api/games/sessions/', {'score': 10}, format='json')[replicas.PIN_HEADER]
+        # Пин в кеше процесса недоступен другому воркеру
+        cache.delete(replicas._user_pin_key(user.pk))
+        request = APIRequestFactory().get('/', HTTP_X_DB_PIN=token)
+
+        assert replicas.is_pinned(request, user)
+        assert not replicas.is_pinned(APIRequestFactory().get('/'), user)
+        assert not replicas.is_pinned(request, other)
+        assert not replicas.is_pinned(APIRequestFactory().get('/', HTTP_X_DB_PIN=token + 'x'), user)
+        settings.REPLICA_PIN_SECONDS = -1
+        assert not replicas.is_pinned(request, user)
+
+
+@replica_required
+@pytest.mark.django_db(databases=['default', 'replica'], transaction=True)
+class TestReplicaIntegration:
+    """Сквозная проверка с двумя подключениями (с коммитами, чтобы реплика видела данные)."""
+
+    def test_leaderboard_reads_from_replica(self):
+        """Лидерборд читается с реплики, пока клиент не закреплен."""
+        user = User.objects.create_user(username='reader', email='reader@test.com')
+        Leaderboard.objects.create(user=user, score=100, difficulty='easy')
+        client = APIClient()
+
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = client.get('/api/games/leaderboard/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(replica.captured_queries) > 0
+        assert len(primary.captured_queries) == 0
+        assert response.data['count'] == 1
+
+    def test_pinned_client_reads_from_primary(self):
+        """После собственной записи клиент читает из основной БД."""
+        user = User.objects.create_user(username='pinned', email='pinned@test.com')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        client.post('/api/games/sessions/', {'score': 10, 'is_completed': True}, format='json')
+
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = client.get('/api/games/leaderboard/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(replica.captured_queries) == 0
@@ -0,0 +1,124 @@
+"""
+Тесты скетчей перцентилей времени реакции.
+Сверяют приближенные ответы с точными перцентилями NumPy.
+"""
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from games import sketches
+from games.models import ReactionTimeSketch
+from games.sketches import QuantileSketch
+
+User = get_user_model()
+
+ACCURACY = 0.01
+
+
+@pytest.fixture
+def reaction_times():
+    """Воспроизводимый набор времен реакции (логнормальное распределение)."""
+    np = pytest.importorskip('numpy')
+    rng = np.random.default_rng(42)
+    return rng.lognormal(mean=np.log(320), sigma=0.35, size=20000)
+
+
+class TestQuantileSketch:
+    """Точность и объединяемость скетча."""
+
+    def test_quantiles_match_numpy(self, reaction_times):
+        """Квантили совпадают с точными в пределах относительной погрешности."""
+        np = pytest.importorskip('numpy')
+        sketch = QuantileSketch(ACCURACY)
+        for value in reaction_times:
+            sketch.add(float(value))
+
+        for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+            exact = np.percentile(reaction_times, q * 100, method='lower')
+            assert abs(sketch.quantile(q) - exact) <= ACCURACY * exact * 1.01
+
+    def test_percentile_rank_is_bounded(self, reaction_times):
+        """Ранг значения лежит между точными рангами для x(1-a) и x(1+a)."""
+        np = pytest.importorskip('numpy')
+        sketch = QuantileSketch(ACCURACY)
+        for value in reaction_times:
+            sketch.add(float(value))
+
+        for reaction_ms in (150, 250, 320, 400, 700):
+            approx = sketch.percentile_of(reaction_ms)
+            lower = np.mean(reaction_times <= reaction_ms * (1 - 2 * ACCURACY)) * 100
+            upper = np.mean(reaction_times <= reaction_ms * (1 + 2 * ACCURACY)) * 100
+            assert lower <= approx <= upper
+
+    def test_merge_equals_single_sketch(self, reaction_times):
+        """Объединение скетчей из разных процессов равно общему скетчу."""
+        whole = QuantileSketch(ACCURACY)
+        left = QuantileSketch(ACCURACY)
+        right = QuantileSketch(ACCURACY)
+        for i, value in enumerate(reaction_times):
+            whole.add(float(value))
+            (left if i % 2 else right).add(float(value))
+
+        merged = QuantileSketch.from_dict(left.to_dict()).merge(right)
+
+        assert merged.bins == whole.bins
+        assert merged.count == whole.count
+
+
+@pytest.mark.django_db
+class TestPercentileEndpoint:
+    """Тесты эндпоинта leaderboard/percentile/."""
+
+    def test_percentile_from_completed_sessions(self, settings, django_capture_on_commit_callbacks):
+        """Завершенные сессии учитываются и сохраняются в БД после сброса буфера."""
+        settings.REACTION_SKETCH_FLUSH_EVERY = 2
+        user = User.objects.create_user(username='sketch', email='sketch@test.com')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        for reaction in ([200], [300], [400], [500]):
+            with django_capture_on_commit_callbacks(execute=True):
+                client.post('/api/games/sessions/', {
+                    'score': 10, 'difficulty': 'easy', 'is_completed': True, 'reaction_times': reaction
+                }, format='json')
+
+        assert ReactionTimeSketch.objects.get(difficulty='easy').count == 4
+
+        sketches.reset()
+        response = APIClient().get('/api/games/leaderboard/percentile/?reaction_ms=300&difficulty=easy')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['sample_size'] == 4
+        assert response.data['percentile'] == 50.0
+        assert response.data['faster_than_percent'] == 50.0
+
+    def test_rebuild_discards_other_workers_deltas(self, settings, django_capture_on_commit_callbacks):
+        """Дельта, набранная воркером до пересборки, не учитывается повторно."""
+        settings.REACTION_SKETCH_FLUSH_EVERY = 100
+        user = User.objects.create_user(username='rebuilt', email='rebuilt@test.com')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        for reaction in ([200], [300]):
+            client.post('/api/games/sessions/', {
+                'score': 10, 'difficulty': 'easy', 'is_completed': True, 'reaction_times': reaction
+            }, format='json')
+        # Несброшенная дельта другого воркера переживает пересборку в этом процессе
+        stale = (dict(sketches._local), dict(sketches._local_generations))
+
+        assert sketches.rebuild() == 2
+        sketches._local.update(stale[0])
+        sketches._local_generations.update(stale[1])
+        sketches.flush()
+
+        row = ReactionTimeSketch.objects.get(difficulty='easy')
+        assert (row.count, row.generation) == (2, 1)
+        assert sketches.sketch_for('easy').count == 2
+
+        sketches.record('easy', 400)
+        sketches.flush()
+        assert ReactionTimeSketch.objects.get(difficulty='easy').count == 3
+
+    def test_percentile_requires_reaction_time(self):
+        """Без reaction_ms возвращается ошибка валидации."""
+        response = APIClient().get('/api/games/leaderboard/percentile/')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,291 @@
+"""
+Тесты JSON Patch для game_state, версий состояния и сжатого хранения.
+"""
+import json
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from games import autosave, fields, jsonpatch
+from games.models import GameSession
+from games.serializers import GameSessionSerializer
+
+User = get_user_model()
+PATCH = 'application/json-patch+json'
+
+
+@pytest.fixture
+def player():
+    user = User.objects.create_user(username='player', email='player@test.com', password='testpass123')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client, user
+
+
+def _patch(client, session, version, operations):
+    return client.generic(
+        'PATCH', f'/api/games/sessions/{session.id}/state/?version={version}',
+        json.dumps(operations), content_type=PATCH,
+    )
+
+
+def _stored(session):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT game_state FROM {GameSession._meta.db_table} WHERE id = %s', [session.id])
+        return json.loads(cursor.fetchone()[0])
+
+
+class TestJsonPatch:
+    """Операции RFC 6902 и примеры из приложения A."""
+
+    def test_operations(self):
+        document = {'foo': ['bar', 'baz'], 'a/b': {'~c': 1}}
+        result = jsonpatch.apply(document, [
+            {'op': 'add', 'path': '/foo/1', 'value': 'qux'},
+            {'op': 'add', 'path': '/foo/-', 'value': 'end'},
+            {'op': 'remove', 'path': '/foo/0'},
+            {'op': 'replace', 'path': '/a~1b/~0c', 'value': 2},
+            {'op': 'copy', 'from': '/foo', 'path': '/copy'},
+            {'op': 'move', 'from': '/copy/0', 'path': '/moved'},
+            {'op': 'test', 'path': '/moved', 'value': 'qux'},
+        ])
+        assert result == {'foo': ['qux', 'baz', 'end'], 'a/b': {'~c': 2}, 'copy': ['baz', 'end'], 'moved': 'qux'}
+        assert jsonpatch.apply({'a': 1}, [{'op': 'replace', 'path': '', 'value': [1]}]) == [1]
+
+    @pytest.mark.parametrize('operations', [
+        {'op': 'add', 'path': '/a', 'value': 1},
+        [{'op': 'nope', 'path': '/a'}],
+        [{'op': 'add', 'path': 'a', 'value': 1}],
+        [{'op': 'add', 'path': '/missing/child', 'value': 1}],
+        [{'op': 'remove', 'path': '/missing'}],
+        [{'op': 'replace', 'path': '/list/01', 'value': 1}],
+        [{'op': 'add', 'path': '/list/5', 'value': 1}],
+        [{'op': 'add', 'path': '/a'}],
+        [{'op': 'move', 'from': '/obj', 'path': '/obj/inner'}],
+        [{'op': 'test', 'path': '/flag', 'value': 1}],
+        [{'op': 'test', 'path': '/list', 'value': [1]}],
+    ])
+    def test_invalid_patches(self, operations):
+        with pytest.raises(jsonpatch.PatchError):
+            jsonpatch.apply({'list': [1, 2], 'obj': {}, 'flag': True}, operations)
+
+    def test_numbers_compare_by_value(self):
+        assert jsonpatch.equal({'a': [1, 2.0]}, {'a': [1.0, 2]})
+        assert not jsonpatch.equal(True, 1)
+
+
+@pytest.mark.django_db
+class TestPackedJSONField:
+    """Большие состояния сжимаются в колонке и прозрачно читаются."""
+
+    def test_large_state_stored_compressed(self, player, settings):
+        settings.GAME_STATE_COMPRESS_THRESHOLD = 256
+        client, user = player
+        state = {'targets': [{'x': index, 'y': index * 2, 'hit': False} for index in range(100)]}
+        session = GameSession.objects.create(user=user, game_state=state)
+
+        stored = _stored(session)
+        assert fields.is_packed(stored)
+        assert len(json.dumps(stored)) < len(json.dumps(state)) / 3
+        assert GameSession.objects.get(pk=session.pk).game_state == state
+        assert GameSession.objects.filter(pk=session.pk).values_list('game_state', flat=True)[0] == state
+        assert client.get(f'/api/games/sessions/{session.id}/').data['game_state'] == state
+        assert client.get('/api/games/sessions/latest/').data['game_state'] == state
+
+    def test_small_and_marker_shaped_states(self, player):
+        client, user = player
+        small = GameSession.objects.create(user=user, game_state={'level': 3})
+        assert _stored(small) == {'level': 3}
+
+        # Состояние в форме обертки сжимается всегда, иначе оно прочиталось бы как сжатое
+        lookalike = {fields.MARKER: 'eJyrVkrLz1eyUkrKz1eqBQAiggRx'}
+        session = GameSession.objects.create(user=user, game_state=lookalike)
+        assert _stored(session) != lookalike
+        assert GameSession.objects.get(pk=session.pk).game_state == lookalike
+
+
+@pytest.mark.django_db
+class TestStatePatchView:
+    """PATCH sessions/<id>/state/?version= с оптимистичной блокировкой."""
+
+    def test_patch_updates_only_state(self, player):
+        client, user = player
+        session = GameSession.objects.create(user=user, game_state={'level': 1, 'hits': []}, reaction_times=[300, 400])
+
+        response = _patch(client, session, 0, [
+            {'op': 'replace', 'path': '/level', 'value': 2},
+            {'op': 'add', 'path': '/hits/-', 'value': 250},
+        ])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['state_version'] == 1
+        session.refresh_from_db()
+        assert session.game_state == {'level': 2, 'hits': [250]}
+        assert session.state_version == 1
+        assert session.reaction_times == [300, 400]
+        data = client.get(f'/api/games/sessions/{session.id}/').data
+        assert data['state_version'] == 1
+        assert data['updated_at'] == response.data['updated_at']
+
+    def test_stale_version_conflicts(self, player):
+        client, user = player
+        session = GameSession.objects.create(user=user, game_state={'level': 1})
+        assert _patch(client, session, 0, [{'op': 'replace', 'path': '/level', 'value': 2}]).status_code == 200
+
+        response = _patch(client, session, 0, [{'op': 'replace', 'path': '/level', 'value': 3}])
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.data['state_version'] == 1
+        session.refresh_from_db()
+        assert session.game_state == {'level': 2}
+
+    def test_full_update_bumps_version(self, player):
+        client, user = player
+        session = GameSession.objects.create(user=user, game_state={'level': 1})
+        response = client.patch(f'/api/games/sessions/{session.id}/', {'game_state': {'level': 5}}, format='json')
+        assert response.data['state_version'] == 1
+        assert _patch(client, session, 0, [{'op': 'remove', 'path': '/level'}]).status_code == status.HTTP_409_CONFLICT
+
+    def test_full_update_does_not_overwrite_concurrent_patch(self, player):
+        client, user = player
+        session = GameSession.objects.create(user=user, game_state={'level': 1})
+        stale = GameSession.objects.get(pk=session.pk)
+        autosave.write(GameSession.objects.get(pk=session.pk), 0, [{'op': 'replace', 'path': '/level', 'value': 2}])
+
+        # Поля без game_state пишутся без него и без новой версии
+        serializer = GameSessionSerializer(stale, data={'score': 5}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        session.refresh_from_db()
+        assert (session.game_state, session.state_version, session.score) == ({'level': 2}, 1, 5)
+
+        serializer = GameSessionSerializer(stale, data={'game_state': {'level': 9}}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        with pytest.raises(autosave.StaleVersion):
+            serializer.save()
+        session.refresh_from_db()
+        assert (session.game_state, session.state_version) == ({'level': 2}, 1)
+
+    def test_invalid_requests(self, player):
+        client, user = player
+        session = GameSession.objects.create(user=user, game_state={'level': 1})
+        other = GameSession.objects.create(user=User.objects.create_user(username='other', email='o@test.com'))
+
+        assert _patch(client, session, 'x', []).status_code == status.HTTP_400_BAD_REQUEST
+        response = _patch(client, session, 0, [{'op': 'remove', 'path': '/missing'}])
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'patch' in response.data
+        assert _patch(client, other, 0, []).status_code == status.HTTP_404_NOT_FOUND
+        # Обычный JSON тоже принимается
+        response = client.patch(
+            f'/api/games/sessions/{session.id}/state/?version=0',
+            [{'op': 'add', 'path': '/mode', 'value': 'classic'}], format='json',
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestAutosaveBuffer:
+    """Буфер автосохранений: слияние записей, чтение буфера и сброс в БД."""
+
+    @pytest.fixture(autouse=True)
+    def buffer_on(self, settings):
+        settings.AUTOSAVE_BUFFER = True
+        settings.AUTOSAVE_MAX_PENDING = 3
+        settings.AUTOSAVE_FLUSH_SECONDS = 3600
+
+    def _score(self, client, session, version, score):
+        return _patch(client, session, version, [{'op': 'replace', 'path': '/score', 'value': score}])
+
+    def test_saves_coalesce_until_flush(self, player, django_assert_num_queries):
+        client, user = player
+        session = GameSession.objects.create(user=user, game_state={'score': 0})
+        assert self._score(client, session, 0, 10).data['state_version'] == 1
+
+        # Запись уже в буфере: ни чтения, ни записи в БД
+        with django_assert_num_queries(0):
+            assert self._score(client, session, 1, 20).status_code == status.HTTP_200_OK
+        session.refresh_from_db()
+        assert (session.game_state, session.state_version) == ({'score': 0}, 0)
+
+        retrieved = client.get(f'/api/games/sessions/{session.id}/').data
+        assert (retrieved['game_state'], retrieved['state_version']) == ({'score': 20}, 2)
+        assert client.get('/api/games/sessions/latest/').data['game_state'] == {'score': 20}
+        assert client.get('/api/games/dashboard/').data['latest_session']['game_state'] == {'score': 20}
+        assert self._score(client, session, 1, 99).status_code == status.HTTP_409_CONFLICT
+
+        # Третье сохранение достигает AUTOSAVE_MAX_PENDING и пишется сразу
+        self._score(client, session, 2, 30)
+        session.refresh_from_db()
+        assert (session.game_state, session.state_version) == ({'score': 30}, 3)
+        assert autosave.buffered(session.id) is None
+
+    def test_flush_dirty_writes_buffered_state(self, player):
+        client, user = player
+        session = GameSession.objects.create(user=user, game_state={'score': 0})
+        self._score(client, session, 0, 10)
+
+        assert autosave.flush_dirty() == 1
+
+        session.refresh_from_db()
+        assert (session.game_state, session.state_version) == ({'score': 10}, 1)
+        assert autosave.buffered(session.id) is None
+        assert autosave.flush_dirty() == 0
+
+    def test_flush_invalidates_conditional_get(self, player):
+        client, user = player
+        session = GameSession.objects.create(user=user, game_state={'level': 1})
+        _patch(client, session, 0, [{'op': 'replace', 'path': '/level', 'value': 2}])
+        listed = client.get('/api/games/sessions/')
+        assert listed.data['results'][0]['game_state'] == {'level': 1}
+
+        autosave.flush_dirty()
+
+        response = client.get('/api/games/sessions/', HTTP_IF_NONE_MATCH=listed['ETag'])
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'][0]['game_state'] == {'level': 2}
+
+    def test_entries_expire_after_missed_flushes(self, player, settings, monkeypatch):
+        client, user = player
+        # Запись живет ENTRY_TTL_FLUSHES интервалов сброса плюс LOCK_SECONDS
+        settings.AUTOSAVE_FLUSH_SECONDS = 30
+        monkeypatch.setattr(autosave, 'ENTRY_TTL_FLUSHES', 0)
+        monkeypatch.setattr(autosave, 'LOCK_SECONDS', 1)
+        session = GameSession.objects.create(user=user, game_state={'score': 0})
+        self._score(client, session, 0, 10)
+        assert autosave.buffered(session.id) is not None
+
+        time.sleep(1.1)
+
+        assert autosave.buffered(session.id) is None
+
+    def test_completion_takes_buffered_state(self, player):
+        client, user = player
+        session = GameSession.objects.create(user=user, game_state={'score': 0})
+        self._score(client, session, 0, 10)
+
+        response = client.patch(f'/api/games/sessions/{session.id}/', {'is_completed': True, 'score': 10}, format='json')
+
+        assert response.data['game_state'] == {'score': 10}
+        session.refresh_from_db()
+        assert session.is_completed
+        assert (session.game_state, session.state_version) == ({'score': 10}, 1)
+        # Завершенная сессия пишется сразу в БД
+        self._score(client, session, 1, 15)
+        session.refresh_from_db()
+        assert session.game_state == {'score': 15}
+        assert autosave.buffered(session.id) is None
+
+    def test_delete_discards_buffer(self, player):
+        client, user = player
+        session = GameSession.objects.create(user=user, game_state={'score': 0})
+        self._score(client, session, 0, 10)
+
+        client.delete(f'/api/games/sessions/{session.id}/')
+
+        assert autosave.buffered(session.id) is None
+        assert autosave.flush_dirty() == 0
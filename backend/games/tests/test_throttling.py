@@ -0,0 +1,119 @@
+"""
+Тесты ограничения частоты запросов токен-бакетом.
+"""
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+
+from reaction_game import throttling
+from reaction_game.throttling import TokenBucketThrottle
+
+User = get_user_model()
+
+
+@pytest.fixture
+def rates(settings):
+    def configure(**values):
+        settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': values}
+    return configure
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket:
+    """Ведро на N запросов пополняется со скоростью N за период."""
+
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        clock = Clock()
+        monkeypatch.setattr(TokenBucketThrottle, 'timer', clock)
+        return clock
+
+    def _request(self, user=None):
+        request = APIRequestFactory().get('/')
+        request.user = user
+        return request
+
+    def _check(self, scope='search', user=None):
+        throttle = TokenBucketThrottle()
+        throttle.scope = scope
+        return throttle.allow_request(self._request(user), None), throttle.wait()
+
+    def test_burst_then_refill(self, rates, clock):
+        rates(search='3/min')
+        assert [self._check()[0] for _ in range(3)] == [True, True, True]
+        allowed, wait = self._check()
+        assert not allowed
+        assert wait == pytest.approx(20)
+
+        # Отказ не расходует токен: через 20 секунд освобождается ровно один
+        clock.now += 20
+        assert [self._check()[0] for _ in range(2)] == [True, False]
+        # Простой дольше периода снова дает полное ведро, но не больше
+        clock.now += 3600
+        assert [self._check()[0] for _ in range(4)] == [True, True, True, False]
+
+    @pytest.mark.django_db
+    def test_guests_and_users_have_separate_rates(self, rates, clock):
+        rates(search='3/min', search_guest='1/min')
+        user = User.objects.create_user(username='member', email='member@test.com')
+        guest = User.objects.create_user(username='guest', email='guest@test.com', is_guest=True)
+
+        assert [self._check(user=guest)[0] for _ in range(2)] == [True, False]
+        assert [self._check(user=user)[0] for _ in range(4)] == [True, True, True, False]
+        # Анонимы считаются по IP с гостевым пределом
+        assert [self._check()[0] for _ in range(2)] == [True, False]
+
+    def test_missing_rate_disables_scope(self, rates, clock):
+        rates(search='')
+        assert all(self._check()[0] for _ in range(100))
+        assert all(self._check(scope='unknown')[0] for _ in range(100))
+
+    def test_parse_rate(self):
+        assert throttling.parse_rate('120/min') == (120, 500_000)
+        assert throttling.parse_rate('20/hour') == (20, 180_000_000)
+        assert throttling.parse_rate(None) is None
+
+
+@pytest.mark.django_db
+class TestThrottledEndpoints:
+    """Пределы подключены к созданию сессий, поиску, регистрации и входу."""
+
+    def test_session_create_throttled_but_reads_are_not(self, rates):
+        rates(session_create='2/min')
+        user = User.objects.create_user(username='player', email='player@test.com')
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        codes = [client.post('/api/games/sessions/', {'score': 1}, format='json').status_code for _ in range(3)]
+
+        assert codes == [status.HTTP_201_CREATED, status.HTTP_201_CREATED, status.HTTP_429_TOO_MANY_REQUESTS]
+        assert client.get('/api/games/sessions/').status_code == status.HTTP_200_OK
+
+    def test_search_throttled(self, rates):
+        rates(search='1/min')
+        user = User.objects.create_user(username='seeker', email='seeker@test.com')
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        assert client.get('/api/games/friends/search/?q=pl').status_code == status.HTTP_200_OK
+        response = client.get('/api/games/friends/search/?q=pl')
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response['Retry-After']) > 0
+
+    def test_login_and_register_throttled_by_ip(self, rates):
+        rates(login='1/min', register='1/hour')
+        client = APIClient()
+        credentials = {'username': 'nobody', 'password': 'wrong-password'}
+
+        assert client.post('/api/auth/login/', credentials, format='json').status_code == status.HTTP_401_UNAUTHORIZED
+        assert client.post('/api/auth/login/', credentials, format='json').status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert client.post('/api/auth/register/', {}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+        assert client.post('/api/auth/register/', {}, format='json').status_code == status.HTTP_429_TOO_MANY_REQUESTS
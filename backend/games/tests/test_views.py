@@ -2,11 +2,28 @@
 Тесты для API views (представлений).
 Проверяют HTTP-ответы, авторизацию, CRUD-операции.
 """
+import gzip
+import json
+import time
 import pytest
+from datetime import timedelta
+from io import StringIO
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from games.models import GameSession, Leaderboard, Achievement, Friendship
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.authentication import get_cached_user, invalidate_user
+from accounts.models import RevokedRefreshToken
+from games.models import GameSession, Leaderboard, Achievement, UserAchievement, Friendship, SyncTombstone, UserProfile
+from games import catalog, versions
+from games.serializers import GameSessionSerializer, LeaderboardSerializer
 
 User = get_user_model()
 
@@ -75,6 +92,127 @@ class TestAuthenticationViews:
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
 
+@pytest.mark.django_db
+class TestRefreshTokenBlacklist:
+    """Тесты черного списка refresh-токенов."""
+
+    def test_rotated_refresh_token_cannot_be_reused(self, api_client, create_user):
+        """После ротации старый refresh-токен отклоняется."""
+        user = create_user()
+        refresh = str(RefreshToken.for_user(user))
+
+        first = api_client.post('/api/auth/token/refresh/', {'refresh': refresh})
+        reused = api_client.post('/api/auth/token/refresh/', {'refresh': refresh})
+        rotated = api_client.post('/api/auth/token/refresh/', {'refresh': first.data['refresh']})
+
+        assert first.status_code == status.HTTP_200_OK
+        assert 'access' in first.data
+        assert reused.status_code == status.HTTP_401_UNAUTHORIZED
+        assert rotated.status_code == status.HTTP_200_OK
+
+    def test_refresh_is_single_insert(self, api_client, create_user, django_assert_num_queries):
+        """Ротация — одна вставка в черный список независимо от его размера."""
+        user = create_user()
+        RevokedRefreshToken.objects.bulk_create([
+            RevokedRefreshToken(jti=f'old-{i}', expires_at=timezone.now() + timedelta(days=1))
+            for i in range(100)
+        ])
+        refresh = str(RefreshToken.for_user(user))
+
+        with django_assert_num_queries(3) as captured:
+            response = api_client.post('/api/auth/token/refresh/', {'refresh': refresh})
+
+        statements = [q['sql'] for q in captured.captured_queries if 'SAVEPOINT' not in q['sql']]
+        assert response.status_code == status.HTTP_200_OK
+        assert len(statements) == 1
+        assert statements[0].startswith('INSERT')
+
+    def test_prune_removes_expired_entries(self):
+        """Команда очистки удаляет только истекшие записи."""
+        RevokedRefreshToken.objects.create(jti='expired', expires_at=timezone.now() - timedelta(minutes=1))
+        RevokedRefreshToken.objects.create(jti='active', expires_at=timezone.now() + timedelta(days=1))
+
+        call_command('prune_token_blacklist', stdout=StringIO())
+
+        assert list(RevokedRefreshToken.objects.values_list('jti', flat=True)) == ['active']
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+    """Тесты кеширования пользователя при JWT-аутентификации."""
+
+    def _token_client(self, api_client, user):
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return api_client
+
+    def test_user_resolved_from_cache(self, api_client, create_user, django_assert_num_queries):
+        """Повторные запросы не загружают пользователя из БД."""
+        user = create_user()
+        client = self._token_client(api_client, user)
+        client.get('/api/games/sessions/')
+
+        with django_assert_num_queries(1):
+            response = client.get('/api/games/sessions/')
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_deactivation_revokes_immediately(self, api_client, create_user):
+        """Деактивация пользователя сразу сбрасывает кеш."""
+        user = create_user()
+        client = self._token_client(api_client, user)
+        assert client.get('/api/games/sessions/').status_code == status.HTTP_200_OK
+
+        user.is_active = False
+        user.save()
+
+        assert client.get('/api/games/sessions/').status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_deactivation_during_user_load_not_cached(self, api_client, create_user, monkeypatch):
+        """Изменение между загрузкой пользователя и записью в кеш не оставляет старую копию."""
+        user = create_user()
+        client = self._token_client(api_client, user)
+        load = JWTAuthentication.get_user
+
+        def load_then_deactivate(self, validated_token):
+            loaded = load(self, validated_token)
+            User.objects.filter(pk=user.pk).update(is_active=False)
+            invalidate_user(user.pk)
+            return loaded
+
+        monkeypatch.setattr(JWTAuthentication, 'get_user', load_then_deactivate)
+        assert client.get('/api/games/sessions/').status_code == status.HTTP_200_OK
+        monkeypatch.setattr(JWTAuthentication, 'get_user', load)
+
+        assert get_cached_user(user.pk) is None
+        assert client.get('/api/games/sessions/').status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_revocation_honoured_within_ttl(self, api_client, create_user, settings):
+        """Изменение в обход сигналов вступает в силу не позже чем через TTL."""
+        settings.AUTH_USER_CACHE_TTL = 1
+        user = create_user()
+        client = self._token_client(api_client, user)
+        assert client.get('/api/games/sessions/').status_code == status.HTTP_200_OK
+
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        time.sleep(1.1)
+
+        assert client.get('/api/games/sessions/').status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_guest_and_staff_flags_preserved(self, api_client, create_user):
+        """Флаги is_guest и is_staff берутся из кешированного пользователя."""
+        user = create_user()
+        user.is_guest = True
+        user.is_staff = True
+        user.save()
+        client = self._token_client(api_client, user)
+        client.get('/api/games/sessions/')
+
+        cached = get_cached_user(user.pk)
+
+        assert cached.is_guest and cached.is_staff
+        assert not cached.is_authorized_user
+
+
 @pytest.mark.django_db
 class TestGameSessionViews:
     """Тесты для GameSession API."""
@@ -131,6 +269,22 @@ class TestGameSessionViews:
         assert response.status_code == status.HTTP_200_OK
         assert response.data['score'] == 500
 
+    def test_session_list_matches_serializer(self, authenticated_client):
+        """Быстрый путь списка дает те же байты, что и GameSessionSerializer."""
+        client, user = authenticated_client
+        for score in (100, 200, 300):
+            GameSession.objects.create(
+                user=user, score=score, difficulty='hard', is_completed=True,
+                reaction_times=[210.5, 340], game_state={'level': score // 100},
+            )
+        GameSession.objects.create(user=user, score=0)
+
+        response = client.get('/api/games/sessions/?ordering=score')
+
+        sessions = GameSession.objects.filter(user=user).order_by('score')
+        expected = {'count': 4, 'next': None, 'previous': None, 'results': GameSessionSerializer(sessions, many=True).data}
+        assert response.content == JSONRenderer().render(expected)
+
 
 @pytest.mark.django_db
 class TestLeaderboardViews:
@@ -160,6 +314,27 @@ class TestLeaderboardViews:
         for entry in results:
             assert entry['difficulty'] == 'easy'
 
+    def test_leaderboard_matches_serializer(self, api_client, create_user, django_assert_num_queries):
+        """Список и топ лидеров совпадают с LeaderboardSerializer байт в байт."""
+        for index in range(3):
+            user = create_user(username=f'leader{index}', email=f'leader{index}@test.com')
+            Leaderboard.objects.create(user=user, score=1000 * index, difficulty='easy', rank=3 - index, avg_reaction_time=250.5 if index else None)
+        entries = Leaderboard.objects.select_related('user').order_by('-score')
+
+        with django_assert_num_queries(2):
+            response = api_client.get('/api/games/leaderboard/')
+        expected = {'count': 3, 'next': None, 'previous': None, 'results': LeaderboardSerializer(entries, many=True).data}
+        assert response.content == JSONRenderer().render(expected)
+
+        response = api_client.get('/api/games/leaderboard/top/?limit=2')
+        top = Leaderboard.objects.select_related('user')[:2]
+        assert response.content == JSONRenderer().render(LeaderboardSerializer(top, many=True).data)
+
+    @pytest.mark.parametrize('query', ['limit=abc', 'limit=-1', 'limit=0', 'limit=101', 'difficulty=nope'])
+    def test_top_rejects_invalid_params(self, api_client, query):
+        """Параметры топа проверяются до обращения к кешу: мусор дает 400, а не 500 или новый ключ."""
+        assert api_client.get(f'/api/games/leaderboard/top/?{query}').status_code == status.HTTP_400_BAD_REQUEST
+
 
 @pytest.mark.django_db
 class TestAchievementViews:
@@ -179,6 +354,72 @@ class TestAchievementViews:
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data) > 0
     
+    def test_catalog_served_without_queries(self, api_client, django_assert_num_queries):
+        """Каталог достижений отдается из памяти без запросов к БД."""
+        Achievement.objects.create(name='Cached', description='Test', requirement={'min_score': 1})
+        api_client.get('/api/games/achievements/')
+
+        with django_assert_num_queries(0):
+            response = api_client.get('/api/games/achievements/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'][0]['name'] == 'Cached'
+        assert response['ETag'].startswith('"')
+        assert 'max-age' in response['Cache-Control']
+
+    def test_catalog_lifetime_bounded_without_shared_cache(self, api_client, settings):
+        """Без общего кеша версия каталога истекает, а max-age не больше CACHE_LOCAL_TTL."""
+        settings.ACHIEVEMENT_CATALOG_MAX_AGE = 300
+        settings.CACHE_SHARED = True
+        assert api_client.get('/api/games/achievements/')['Cache-Control'] == 'public, max-age=300'
+
+        settings.CACHE_SHARED = False
+        settings.CACHE_LOCAL_TTL = 1
+        catalog.invalidate()
+        assert api_client.get('/api/games/achievements/')['Cache-Control'] == 'public, max-age=1'
+        assert cache.get(catalog.VERSION_CACHE_KEY) is not None
+        time.sleep(1.1)
+        assert cache.get(catalog.VERSION_CACHE_KEY) is None
+
+    def test_catalog_conditional_get(self, api_client):
+        """Повторный запрос с If-None-Match возвращает 304."""
+        Achievement.objects.create(name='Etag', description='Test')
+        first = api_client.get('/api/games/achievements/')
+
+        response = api_client.get('/api/games/achievements/', HTTP_IF_NONE_MATCH=first['ETag'])
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == first['ETag']
+
+    def test_catalog_rebuilt_on_change(self, api_client):
+        """Изменение достижения публикует новую версию каталога."""
+        achievement = Achievement.objects.create(name='Old name', description='Test')
+        first = api_client.get('/api/games/achievements/')
+
+        achievement.name = 'New name'
+        achievement.save()
+        response = api_client.get('/api/games/achievements/')
+
+        assert response['ETag'] != first['ETag']
+        assert response.data['results'][0]['name'] == 'New name'
+
+        achievement.delete()
+        response = api_client.get(f'/api/games/achievements/{achievement.id}/')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_catalog_search_and_filter(self, api_client):
+        """Поиск и фильтрация работают по снимку каталога."""
+        Achievement.objects.create(name='Снайпер', description='Очки', achievement_type='score')
+        Achievement.objects.create(name='Молния', description='Быстрая реакция', achievement_type='reaction')
+
+        by_type = api_client.get('/api/games/achievements/?achievement_type=reaction')
+        by_search = api_client.get('/api/games/achievements/?search=снайп')
+        invalid = api_client.get('/api/games/achievements/?achievement_type=unknown')
+
+        assert [a['name'] for a in by_type.data['results']] == ['Молния']
+        assert [a['name'] for a in by_search.data['results']] == ['Снайпер']
+        assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+
     def test_get_user_achievements(self, authenticated_client):
         """Получение достижений пользователя."""
         client, user = authenticated_client
@@ -187,6 +428,351 @@ class TestAchievementViews:
         
         assert response.status_code == status.HTTP_200_OK
 
+    def test_user_achievements_constant_queries(self, authenticated_client, django_assert_num_queries):
+        """Список достижений пользователя — один запрос независимо от их количества."""
+        client, user = authenticated_client
+        for i in range(3):
+            achievement = Achievement.objects.create(name=f'A{i}', description='Test')
+            UserAchievement.objects.create(user=user, achievement=achievement)
+        client.get('/api/games/user-achievements/')
+
+        with django_assert_num_queries(1):
+            response = client.get('/api/games/user-achievements/')
+
+        results = response.data['results']
+        assert len(results) == 3
+        assert {r['achievement']['name'] for r in results} == {'A0', 'A1', 'A2'}
+        assert set(results[0]) == {'id', 'achievement', 'unlocked_at', 'created_at'}
+
+    def test_achievement_progress(self, authenticated_client, django_assert_num_queries):
+        """Прогресс по всем достижениям считается одним агрегатным запросом."""
+        client, user = authenticated_client
+        Achievement.objects.create(name='Score', description='Test', requirement={'min_score': 1000})
+        Achievement.objects.create(name='Games', description='Test', requirement={'min_games': 4})
+        Achievement.objects.create(name='Fast', description='Test', requirement={'max_reaction_time': 200})
+        GameSession.objects.create(user=user, score=250, is_completed=True, reaction_times=[400])
+        GameSession.objects.create(user=user, score=500, is_completed=True, reaction_times=[200])
+        client.get('/api/games/achievements/')
+
+        # Статистика одним запросом плюс список открытых достижений
+        with django_assert_num_queries(2):
+            response = client.get('/api/games/user-achievements/progress/')
+
+        assert response.status_code == status.HTTP_200_OK
+        progress = {row['name']: row for row in response.data}
+        assert progress['Score']['current'] == 500
+        assert progress['Score']['target'] == 1000
+        assert progress['Score']['percent'] == 50
+        assert progress['Games']['percent'] == 50
+        assert progress['Fast']['percent'] == 100
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    """Тесты ETag/304 по версиям ресурсов пользователя."""
+
+    def test_sessions_not_modified_without_queries(self, authenticated_client, django_assert_num_queries):
+        client, user = authenticated_client
+        GameSession.objects.create(user=user, score=100)
+        response = client.get('/api/games/sessions/')
+        etag = response['ETag']
+
+        with django_assert_num_queries(0):
+            response = client.get('/api/games/sessions/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert client.get('/api/games/sessions/?ordering=score')['ETag'] != etag
+
+        client.post('/api/games/sessions/', {'score': 50}, format='json')
+        response = client.get('/api/games/sessions/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    def test_stamps_expire_without_shared_cache(self, authenticated_client, settings):
+        """Без общего кеша другой воркер перестает отвечать 304 не позже CACHE_LOCAL_TTL."""
+        client, user = authenticated_client
+        settings.CACHE_SHARED = False
+        settings.CACHE_LOCAL_TTL = 1
+        client.get('/api/games/sessions/')
+        settings.CACHE_SHARED = True
+        versions.bump([user.pk], versions.FRIENDS)
+        local = versions._key(user.pk, versions.SESSIONS)
+        shared = versions._key(user.pk, versions.FRIENDS)
+        assert cache.get(local) is not None
+
+        time.sleep(1.1)
+
+        assert cache.get(local) is None
+        assert cache.get(shared) is not None
+
+    def test_session_delete_and_other_users_writes(self, authenticated_client, create_user):
+        client, user = authenticated_client
+        session = GameSession.objects.create(user=user, score=100)
+        etag = client.get('/api/games/sessions/')['ETag']
+
+        GameSession.objects.create(user=create_user(username='other', email='other@test.com'), score=10)
+        assert client.get('/api/games/sessions/', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+        client.delete(f'/api/games/sessions/{session.id}/')
+        assert client.get('/api/games/sessions/', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_user_achievements_follow_awards_and_catalog(self, authenticated_client):
+        client, user = authenticated_client
+        achievement = Achievement.objects.create(name='Первая игра', description='Сыграйте игру')
+        etag = client.get('/api/games/user-achievements/')['ETag']
+
+        UserAchievement.objects.create(user=user, achievement=achievement)
+        response = client.get('/api/games/user-achievements/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response['ETag']
+
+        achievement.description = 'Новое описание'
+        achievement.save()
+        assert client.get('/api/games/user-achievements/', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_profile_conditional_get(self, authenticated_client):
+        client, user = authenticated_client
+        etag = client.get('/api/auth/profile/')['ETag']
+        assert client.get('/api/auth/profile/', HTTP_IF_NONE_MATCH=f'W/{etag}').status_code == status.HTTP_304_NOT_MODIFIED
+
+        client.patch('/api/auth/profile/', {'bio': 'Новая био'}, format='json')
+        response = client.get('/api/auth/profile/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['bio'] == 'Новая био'
+
+        user.first_name = 'Иван'
+        user.save()
+        assert client.get('/api/auth/profile/', HTTP_IF_NONE_MATCH=response['ETag']).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestSyncView:
+    """Тесты дельта-синхронизации."""
+
+    @pytest.fixture(autouse=True)
+    def no_overlap(self, settings):
+        settings.SYNC_OVERLAP_SECONDS = 0
+
+    def test_first_sync_requests_full_reload(self, authenticated_client):
+        client, user = authenticated_client
+
+        response = client.get('/api/games/sync/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['full'] is True
+        assert int(response.data['token']) > 0
+        assert client.get('/api/games/sync/?since=abc').status_code == status.HTTP_400_BAD_REQUEST
+        assert client.get('/api/games/sync/?since=99999999999999999999999').status_code == status.HTTP_400_BAD_REQUEST
+        future = int(response.data['token']) + 3600 * 10 ** 6
+        assert client.get(f'/api/games/sync/?since={future}').status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_changes_and_deletions_since_token(self, authenticated_client, create_user):
+        client, user = authenticated_client
+        friend = create_user(username='friend', email='friend@test.com')
+        old = GameSession.objects.create(user=user, score=10)
+        gone = GameSession.objects.create(user=user, score=20)
+        friendship = Friendship.objects.create(from_user=friend, to_user=user)
+        token = client.get('/api/games/sync/').data['token']
+
+        new = GameSession.objects.create(user=user, score=30)
+        GameSession.objects.create(user=friend, score=40)
+        client.delete(f'/api/games/sessions/{gone.id}/')
+        friendship.status = 'accepted'
+        friendship.save()
+        achievement = Achievement.objects.create(name='Синхронизация', description='Тест')
+        UserAchievement.objects.create(user=user, achievement=achievement)
+
+        response = client.get(f'/api/games/sync/?since={token}')
+
+        data = response.data
+        assert data['full'] is False
+        assert [row['id'] for row in data['sessions']] == [new.id]
+        assert data['sessions'][0]['username'] == user.username
+        assert data['deleted']['sessions'] == [gone.id]
+        assert [(row['id'], row['status']) for row in data['friendships']] == [(friendship.id, 'accepted')]
+        assert [row['achievement']['name'] for row in data['achievements']] == ['Синхронизация']
+        assert old.id not in [row['id'] for row in data['sessions']]
+
+        token = data['token']
+        friendship_id = friendship.id
+        friendship.delete()
+        data = client.get(f'/api/games/sync/?since={token}').data
+        assert data['deleted']['friendships'] == [friendship_id]
+        assert data['sessions'] == []
+
+    def test_reset_and_overflow_request_full_reload(self, authenticated_client, settings):
+        client, user = authenticated_client
+        token = client.get('/api/games/sync/').data['token']
+        settings.SYNC_MAX_CHANGES = 1
+        GameSession.objects.create(user=user, score=1)
+        assert client.get(f'/api/games/sync/?since={token}').data['full'] is False
+
+        GameSession.objects.create(user=user, score=2)
+        assert client.get(f'/api/games/sync/?since={token}').data['full'] is True
+
+        token = client.get('/api/games/sync/').data['token']
+        SyncTombstone.objects.create(user=None, kind='reset')
+        assert client.get(f'/api/games/sync/?since={token}').data['full'] is True
+
+    def test_compaction_leaves_tombstones(self, authenticated_client):
+        client, user = authenticated_client
+        session = GameSession.objects.create(user=user, score=5, is_completed=True)
+        GameSession.objects.filter(pk=session.pk).update(created_at=timezone.now() - timedelta(days=60))
+        token = client.get('/api/games/sync/').data['token']
+
+        call_command('compact_sessions', '--older-than-days', '30', stdout=StringIO())
+
+        assert client.get(f'/api/games/sync/?since={token}').data['deleted']['sessions'] == [session.id]
+
+
+@pytest.mark.django_db
+class TestDashboardView:
+    """Тесты сводки стартовых данных."""
+
+    @pytest.fixture
+    def populated(self, authenticated_client, create_user):
+        client, user = authenticated_client
+        friend = create_user(username='friend', email='friend@test.com')
+        GameSession.objects.create(user=user, score=10)
+        GameSession.objects.create(user=user, score=20)
+        Leaderboard.objects.create(user=friend, difficulty='medium', score=500)
+        achievement = Achievement.objects.create(name='Сводка', description='Тест')
+        UserAchievement.objects.create(user=user, achievement=achievement)
+        Friendship.objects.create(from_user=friend, to_user=user)
+        return client, user
+
+    def test_matches_separate_endpoints(self, populated):
+        client, user = populated
+
+        data = client.get('/api/games/dashboard/').data
+
+        assert data['profile'] == client.get('/api/auth/profile/').data
+        assert data['latest_session'] == client.get('/api/games/sessions/latest/').data
+        assert data['achievements'] == client.get('/api/games/user-achievements/').data['results']
+        assert data['leaderboard_top'] == client.get('/api/games/leaderboard/top/?limit=10').data
+        assert data['friend_requests'] == client.get('/api/games/friends/requests_received/').data
+        assert set(data['versions']) == set(data) - {'versions'}
+
+    def test_one_query_per_section(self, populated, django_assert_num_queries):
+        client, user = populated
+        client.get('/api/games/dashboard/')
+
+        # Профиль, последняя сессия, достижения, входящие запросы; топ берется из кеша
+        with django_assert_num_queries(4):
+            client.get('/api/games/dashboard/')
+
+    def test_known_versions_skip_unchanged_sections(self, populated, django_assert_num_queries):
+        client, user = populated
+        versions = client.get('/api/games/dashboard/').data['versions']
+        known = ','.join(f'{section}:{version}' for section, version in versions.items())
+
+        with django_assert_num_queries(0):
+            response = client.get(f'/api/games/dashboard/?known={known}')
+        assert response.data == {'versions': versions}
+
+        latest = GameSession.objects.create(user=user, score=30)
+        data = client.get(f'/api/games/dashboard/?known={known}').data
+        assert set(data) == {'versions', 'latest_session'}
+        assert data['latest_session']['id'] == latest.id
+        assert data['versions']['latest_session'] != versions['latest_session']
+        assert client.get('/api/games/dashboard/?limit=5&known=' + known).data.keys() >= {'leaderboard_top'}
+
+    def test_validation_and_auth(self, authenticated_client):
+        assert APIClient().get('/api/games/dashboard/').status_code == status.HTTP_401_UNAUTHORIZED
+        client, user = authenticated_client
+        data = client.get('/api/games/dashboard/').data
+        assert data['latest_session'] is None
+        assert data['friend_requests'] == []
+        assert client.get('/api/games/dashboard/?limit=0').status_code == status.HTTP_400_BAD_REQUEST
+        assert client.get('/api/games/dashboard/?difficulty=nope').status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_dashboard_does_not_create_profile(self, authenticated_client):
+        """Сводка только читает: отсутствующий профиль не создается."""
+        client, user = authenticated_client
+        UserProfile.objects.filter(user=user).delete()
+
+        response = client.get('/api/games/dashboard/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['profile']['username'] == user.username
+        assert not UserProfile.objects.filter(user=user).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dashboard_parallel_sections_match_serial(authenticated_client, settings):
+    """Секции, прочитанные в пуле потоков, совпадают с последовательным чтением."""
+    client, user = authenticated_client
+    GameSession.objects.create(user=user, score=10)
+    serial = client.get('/api/games/dashboard/').data
+
+    settings.DASHBOARD_PARALLEL = True
+    parallel = client.get('/api/games/dashboard/').data
+
+    assert parallel == serial
+
+
+@pytest.mark.django_db
+class TestExportView:
+    """Тесты потоковой выгрузки персональных данных."""
+
+    def _export(self, client, **extra):
+        response = client.get('/api/games/export/', **extra)
+        assert response.status_code == status.HTTP_200_OK
+        return response, b''.join(response.streaming_content)
+
+    def test_guest_cannot_export(self, api_client):
+        assert api_client.get('/api/games/export/').status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_export_contains_all_records(self, authenticated_client, create_user):
+        """Выгрузка содержит профиль, сессии, достижения и дружбы."""
+        client, user = authenticated_client
+        friend = create_user(username='friend', email='friend@test.com')
+        GameSession.objects.create(user=user, score=100, reaction_times=[200, 300])
+        GameSession.objects.create(user=friend, score=999)
+        achievement = Achievement.objects.create(name='First', description='Test')
+        UserAchievement.objects.create(user=user, achievement=achievement)
+        Friendship.objects.create(from_user=friend, to_user=user, status='accepted')
+
+        response, body = self._export(client)
+
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        records = [json.loads(line) for line in body.decode().splitlines()]
+        assert [r['type'] for r in records] == ['user', 'session', 'achievement', 'friendship']
+        assert records[0]['username'] == user.username
+        assert records[1]['reaction_times'] == [200, 300] and records[1]['avg_reaction_time'] == 250
+        assert records[2]['name'] == 'First'
+        assert records[3]['from_username'] == 'friend'
+
+    def test_export_gzip(self, authenticated_client):
+        """При Accept-Encoding: gzip поток сжимается на лету."""
+        client, user = authenticated_client
+        for score in range(50):
+            GameSession.objects.create(user=user, score=score)
+
+        response, body = self._export(client, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        assert response['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response['Vary']
+        lines = gzip.decompress(body).decode().splitlines()
+        assert len(lines) == 51
+
+        # gzip;q=0 запрещает кодирование, даже если подстрока gzip есть в заголовке
+        response, body = self._export(client, HTTP_ACCEPT_ENCODING='br, gzip;q=0')
+        assert not response.has_header('Content-Encoding')
+        assert len(body.decode().splitlines()) == 51
+
+    def test_export_queries_independent_of_history(self, authenticated_client):
+        """Число запросов не зависит от объема истории."""
+        client, user = authenticated_client
+        GameSession.objects.create(user=user, score=1)
+        with CaptureQueriesContext(connection) as small:
+            self._export(client)
+        GameSession.objects.bulk_create([GameSession(user=user, score=i) for i in range(3000)])
+        with CaptureQueriesContext(connection) as large:
+            _, body = self._export(client)
+
+        assert len(body.splitlines()) == 3002
+        assert len(large) == len(small)
+
 
 @pytest.mark.django_db
 class TestFriendshipViews:
@@ -8,7 +8,10 @@ from .views import (
     LeaderboardViewSet,
     AchievementViewSet,
     UserAchievementViewSet,
-    FriendshipViewSet
+    FriendshipViewSet,
+    ExportView,
+    SyncView,
+    DashboardView
 )
 
 router = DefaultRouter()
@@ -19,6 +22,9 @@ router.register(r'user-achievements', UserAchievementViewSet, basename='userachi
 router.register(r'friends', FriendshipViewSet, basename='friendship')
 
 urlpatterns = [
+    path('export/', ExportView.as_view(), name='export'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
     path('', include(router.urls)),
 ]
 
@@ -0,0 +1,100 @@
+"""
+Per-user version stamps for conditional GET.
+
+Every per-user resource (sessions, achievements, profile, friends) has a
+random version token in the shared cache that writes replace. A stamp
+for all users of a resource covers bulk operations that touch unknown
+users, such as detaching a session partition. ETags are derived from the
+stamps plus the request variant, so an If-None-Match revalidation costs
+one cache round trip and no database work. Bumps are repeated after
+commit so a concurrent read cannot publish old rows under a new stamp.
+
+Stamps only stay coherent across workers in a shared cache (CACHE_URL).
+With the process-local default cache they expire after CACHE_LOCAL_TTL,
+so a worker that missed another worker's bump stops answering 304 for
+the old ETag within that time.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from reaction_game import caching
+
+SESSIONS = 'sessions'
+ACHIEVEMENTS = 'achievements'
+PROFILE = 'profile'
+FRIENDS = 'friends'
+
+ALL_USERS = '*'
+
+
+def _key(user_id, resource):
+    return f'games:resource_version:{user_id}:{resource}'
+
+
+def stamps(user_id, resources):
+    """Current stamps for the user's resources, in order, in one cache lookup."""
+    keys = [_key(owner, resource) for resource in resources for owner in (user_id, ALL_USERS)]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, uuid.uuid4().hex, timeout=caching.coherence_timeout())
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def _publish(user_ids, resources):
+    cache.set_many(
+        {_key(user_id, resource): uuid.uuid4().hex for user_id in user_ids for resource in resources},
+        timeout=caching.coherence_timeout(),
+    )
+
+
+def bump(user_ids, *resources):
+    """Replace the stamps of the given users (or ALL_USERS) for resources."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    _publish(user_ids, resources)
+    transaction.on_commit(lambda: _publish(user_ids, resources))
+
+
+def etag(request, resources, extra=''):
+    """Strong ETag for the requested representation of the user's resources."""
+    parts = stamps(request.user.pk, resources)
+    parts += [request.build_absolute_uri(), request.META.get('HTTP_ACCEPT', ''), extra]
+    return '"%s"' % hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+
+def not_modified(request, current):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    # Слабое сравнение: сжатый ответ отдает ETag с префиксом W/
+    tags = [tag.removeprefix('W/') for tag in parse_etags(if_none_match)]
+    return '*' in tags or current in tags
+
+
+class VersionedResponseMixin:
+    """
+    View mixin for conditional GET: versioned() answers 304 when the
+    client's ETag matches, without calling build().
+    """
+    version_resources = ()
+
+    def versioned(self, request, build, extra=''):
+        current = etag(request, self.version_resources, extra)
+        if not_modified(request, current):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = current
+        response['Cache-Control'] = 'private, no-cache'
+        return response
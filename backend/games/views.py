@@ -1,12 +1,29 @@
 """
 Views for games app - game sessions, leaderboard, achievements, friends.
 """
+import logging
+import math
+from functools import partial
+
 from rest_framework import generics, viewsets, status, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.fields import DateTimeField
+from rest_framework.settings import api_settings
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
+from reaction_game import compression
+from reaction_game.fastjson import FastJSONParser, JSONPatchParser
+from reaction_game.replicas import ReplicaReadMixin
+from reaction_game.throttling import SessionCreateThrottle, UserSearchThrottle
+from . import achievements, autosave, catalog, dashboard, exports, ingest, jsonpatch, leaderboard, sketches, streaks, sync, versions
+from .fastread import ValuesListMixin, ValuesPlan
 from .models import (
     GameSession,
     Leaderboard,
@@ -25,38 +42,147 @@ from .serializers import (
 )
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
-class GameSessionViewSet(viewsets.ModelViewSet):
+class GameSessionViewSet(versions.VersionedResponseMixin, ValuesListMixin, viewsets.ModelViewSet):
     """
     ViewSet for game sessions.
     Users can save and load their game sessions.
     """
     serializer_class = GameSessionSerializer
+    # Список читается через .values_list() без создания моделей (см. games/fastread.py)
+    values_plan = ValuesPlan(GameSessionSerializer, {'user': 'user__username'})
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ['difficulty', 'is_completed']
+    # Фильтр по created_at позволяет PostgreSQL читать только нужные месячные секции
+    filterset_fields = {
+        'difficulty': ['exact'],
+        'is_completed': ['exact'],
+        'created_at': ['gte', 'lt'],
+    }
     ordering_fields = ['score', 'created_at', 'time_played']
     ordering = ['-created_at']
+    version_resources = (versions.SESSIONS,)
+
+    def get_throttles(self):
+        # Ограничивается только создание сессий: автосохранения и чтения не тратят токены
+        if self.action == 'create':
+            return [SessionCreateThrottle()]
+        return super().get_throttles()
 
     def get_queryset(self):
         return GameSession.objects.filter(user=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        return self.versioned(request, partial(super().list, request, *args, **kwargs))
+
     @action(detail=False, methods=['get'])
     def latest(self, request):
         """Get the latest game session for the current user."""
+        return self.versioned(request, self._latest)
+
+    def _latest(self):
         latest_session = self.get_queryset().first()
         if latest_session:
             serializer = self.get_serializer(latest_session)
-            return Response(serializer.data)
+            return Response(autosave.overlay(serializer.data))
         return Response(
             {'message': 'Нет сохраненных игровых сессий.'},
             status=status.HTTP_404_NOT_FOUND
         )
 
+    @action(detail=True, methods=['patch'], parser_classes=[JSONPatchParser, FastJSONParser])
+    def state(self, request, pk=None):
+        """
+        Apply an RFC 6902 JSON Patch to game_state of the given ?version=.
+        Only game_state, state_version and updated_at are written (or, with
+        AUTOSAVE_BUFFER, buffered; see games/autosave.py); a concurrent
+        change of the state answers 409 with the current version.
+        """
+        try:
+            version = int(request.query_params['version'])
+        except (KeyError, ValueError):
+            raise ValidationError({'version': ['Укажите версию состояния, к которой применяется патч.']})
+        if not str(pk).isdigit():
+            raise NotFound()
+        session_id = int(pk)
+        # reaction_times и прочие поля не читаются и не перезаписываются
+        queryset = self.get_queryset().only('id', 'created_at', 'game_state', 'state_version', 'is_completed')
+        loaded = []
+
+        def load():
+            if not loaded:
+                loaded.append(generics.get_object_or_404(queryset, pk=session_id))
+            return loaded[0]
+
+        try:
+            result = None
+            if settings.AUTOSAVE_BUFFER:
+                result = autosave.patch(request.user.pk, session_id, version, request.data, load)
+            if result is None:
+                result = autosave.write(load(), version, request.data)
+        except autosave.StaleVersion as exc:
+            return self._state_conflict(exc.current)
+        except TimeoutError:
+            return self._state_conflict(None)
+        except jsonpatch.PatchError as exc:
+            raise ValidationError({'patch': [str(exc)]})
+
+        new_version, updated_at = result
+        versions.bump([request.user.pk], versions.SESSIONS)
+        return Response({
+            'id': session_id,
+            'state_version': new_version,
+            'updated_at': DateTimeField().to_representation(updated_at),
+        })
+
+    @staticmethod
+    def _state_conflict(current_version):
+        return Response(
+            {'detail': 'Состояние игры изменилось, загрузите актуальную версию.', 'state_version': current_version},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        response.data = autosave.overlay(response.data)
+        return response
+
+    def update(self, request, *args, **kwargs):
+        try:
+            return super().update(request, *args, **kwargs)
+        except autosave.StaleVersion as exc:
+            return self._state_conflict(exc.current)
+
+    def perform_update(self, serializer):
+        # Полная запись (в том числе завершение игры) забирает буферизованное состояние
+        if settings.AUTOSAVE_BUFFER:
+            autosave.absorb(serializer.instance)
+        super().perform_update(serializer)
+
+    def perform_destroy(self, instance):
+        # post_delete для GameSession не подключен: он отключил бы быстрое удаление при свертке
+        session_id = instance.id
+        autosave.discard(session_id)
+        super().perform_destroy(instance)
+        sync.record_deletions('session', [(instance.user_id, session_id)])
+        versions.bump([instance.user_id], versions.SESSIONS)
+
     def perform_create(self, serializer):
-        game_session = serializer.save()
-        
+        # Завершенные сессии в режиме группового коммита пишутся пачкой вместе с рекордами и сериями
+        if serializer.validated_data.get('is_completed') and ingest.enabled():
+            game_session = ingest.submit(GameSession(user=self.request.user, **serializer.validated_data))
+            serializer.instance = game_session
+        else:
+            game_session = serializer.save()
+            self._record_completion(game_session)
+
+        # Check for achievements
+        self._check_achievements(game_session.user, game_session)
+
+    def _record_completion(self, game_session):
+        """Leaderboard, streak and sketch updates for one saved session (see games/ingest.py for batches)."""
         # Обновляем лидерборд только если игра завершена (is_completed=True)
         if game_session.is_completed:
             leaderboard_entry, created = Leaderboard.objects.get_or_create(
@@ -74,9 +200,10 @@ class GameSessionViewSet(viewsets.ModelViewSet):
                 leaderboard_entry.date_achieved = game_session.created_at # Сохраняем дату нового рекорда
                 leaderboard_entry.save()
         
-        # Check for achievements
-        self._check_achievements(game_session.user, game_session)
-    
+            # Серия обновляется инкрементально, без просмотра всей истории
+            streaks.record_session(game_session)
+            sketches.record(game_session.difficulty, game_session.avg_reaction_time)
+
     def _check_achievements(self, user, game_session):
         """Check and award achievements based on game session."""
         achievements = Achievement.objects.all()
@@ -122,26 +249,48 @@ class GameSessionViewSet(viewsets.ModelViewSet):
         
         # Достижение: Количество сыгранных игр
         elif achievement_type == 'games_played' or 'min_games' in requirement:
-            user_games = GameSession.objects.filter(
-                user=user, 
-                is_completed=True
-            ).count()
+            user_games = achievements.games_played(user)
             min_games = requirement.get('min_games', 3)
             result = user_games >= min_games
             print(f"  Games played check: {user_games} >= {min_games} = {result}")
             return result
+
+        # Достижение: Серия игровых дней подряд
+        elif achievement_type == 'streak' or 'min_streak' in requirement:
+            streak = getattr(user, 'streak', None)
+            best_streak = streak.best_streak if streak else 0
+            min_streak = requirement.get('min_streak', 3)
+            result = best_streak >= min_streak
+            logger.debug('Streak check for %s: %s >= %s = %s', user.username, best_streak, min_streak, result)
+            return result
         
         print("  No matching achievement type")
         return False
 
 
-class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
+def _top_params(request):
+    """Validated (difficulty, limit) of a leaderboard top request; raises ValidationError."""
+    # Параметры входят в ключ кеша топа, поэтому произвольные значения не допускаются
+    difficulty = request.query_params.get('difficulty') or None
+    if difficulty and difficulty not in sketches.DIFFICULTIES:
+        raise ValidationError({'difficulty': ['Неизвестный уровень сложности.']})
+    try:
+        limit = int(request.query_params.get('limit', 10))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= dashboard.TOP_LIMIT_MAX:
+        raise ValidationError({'limit': [f'Укажите число от 1 до {dashboard.TOP_LIMIT_MAX}.']})
+    return difficulty, limit
+
+
+class LeaderboardViewSet(ReplicaReadMixin, ValuesListMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for leaderboard.
     Read-only, accessible to everyone.
     """
     queryset = Leaderboard.objects.select_related('user').all()
     serializer_class = LeaderboardSerializer
+    values_plan = ValuesPlan(LeaderboardSerializer)
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
     filterset_fields = ['difficulty']
@@ -151,23 +300,46 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, methods=['get'])
     def top(self, request):
-        """Get top N players (default 10)."""
-        limit = int(request.query_params.get('limit', 10))
-        difficulty = request.query_params.get('difficulty', None)
-        
-        queryset = self.get_queryset()
-        if difficulty:
-            queryset = queryset.filter(difficulty=difficulty)
-        
-        top_players = queryset[:limit]
-        serializer = self.get_serializer(top_players, many=True)
-        return Response(serializer.data)
+        """Get top N players (default 10, at most dashboard.TOP_LIMIT_MAX)."""
+        difficulty, limit = _top_params(request)
+        response = Response(leaderboard.top(difficulty, limit))
+        # Одинаковое тело отдается многим клиентам, сжатый вариант хранится в памяти процесса
+        response.cache_compressed = True
+        return response
+
+    @action(detail=False, methods=['get'])
+    def percentile(self, request):
+        """Percentile of a reaction time among all completed sessions."""
+        try:
+            reaction_ms = float(request.query_params['reaction_ms'])
+        except (KeyError, ValueError):
+            raise ValidationError({'reaction_ms': ['Укажите время реакции в миллисекундах.']})
+        if not math.isfinite(reaction_ms) or reaction_ms <= 0:
+            raise ValidationError({'reaction_ms': ['Время реакции должно быть положительным числом.']})
+
+        difficulty = request.query_params.get('difficulty') or None
+        if difficulty and difficulty not in sketches.DIFFICULTIES:
+            raise ValidationError({'difficulty': ['Неизвестный уровень сложности.']})
+
+        sketch = sketches.sketch_for(difficulty)
+        percentile = sketch.percentile_of(reaction_ms)
+        return Response({
+            'reaction_ms': reaction_ms,
+            'difficulty': difficulty,
+            'percentile': percentile,
+            'faster_than_percent': None if percentile is None else 100.0 - percentile,
+            'sample_size': sketch.count,
+            'relative_accuracy': sketch.relative_accuracy,
+        })
 
 
 class AchievementViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for achievements.
     Read-only, accessible to everyone.
+
+    Served from the in-memory catalog snapshot (see games/catalog.py),
+    so steady-state requests do not touch the database.
     """
     queryset = Achievement.objects.all()
     serializer_class = AchievementSerializer
@@ -177,26 +349,111 @@ class AchievementViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_fields = ['achievement_type']
     search_fields = ['name', 'description']
 
+    def list(self, request, *args, **kwargs):
+        snapshot = catalog.get_snapshot()
+        etag = snapshot.etag(request.get_full_path())
+        if self._not_modified(request, etag):
+            return self._catalog_response(None, etag, status.HTTP_304_NOT_MODIFIED)
+
+        achievement_type = request.query_params.get('achievement_type')
+        valid_types = dict(Achievement.ACHIEVEMENT_TYPES)
+        if achievement_type and achievement_type not in valid_types:
+            raise ValidationError({
+                'achievement_type': [f'Выберите корректный вариант. {achievement_type} нет среди допустимых значений.']
+            })
+        rows = snapshot.filter(
+            achievement_type=achievement_type,
+            search=request.query_params.get(api_settings.SEARCH_PARAM, ''),
+        )
+        rows = [catalog.with_absolute_icon(row, request) for row in rows]
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            response = self.get_paginated_response(page)
+        else:
+            response = Response(rows)
+        return self._apply_cache_headers(response, etag)
 
-class UserAchievementViewSet(viewsets.ReadOnlyModelViewSet):
+    def retrieve(self, request, *args, **kwargs):
+        snapshot = catalog.get_snapshot()
+        try:
+            row = snapshot.by_id[int(kwargs[self.lookup_field])]
+        except (KeyError, ValueError):
+            raise NotFound()
+        etag = snapshot.etag(request.get_full_path())
+        if self._not_modified(request, etag):
+            return self._catalog_response(None, etag, status.HTTP_304_NOT_MODIFIED)
+        return self._catalog_response(catalog.with_absolute_icon(row, request), etag)
+
+    @staticmethod
+    def _not_modified(request, etag):
+        return versions.not_modified(request, etag)
+
+    def _catalog_response(self, data, etag, status_code=status.HTTP_200_OK):
+        return self._apply_cache_headers(Response(data, status=status_code), etag)
+
+    @staticmethod
+    def _apply_cache_headers(response, etag):
+        response['ETag'] = etag
+        response['Cache-Control'] = f'public, max-age={catalog.max_age()}'
+        response.cache_compressed = True
+        return response
+
+
+class UserAchievementViewSet(versions.VersionedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for user achievements.
     Users can view their own achievements.
     """
     serializer_class = UserAchievementSerializer
     permission_classes = [permissions.IsAuthenticated]
+    version_resources = (versions.ACHIEVEMENTS,)
 
     def get_queryset(self):
-        return UserAchievement.objects.filter(user=self.request.user)
+        return UserAchievement.objects.filter(user=self.request.user).select_related('user', 'achievement')
+
+    def list(self, request, *args, **kwargs):
+        # Описания достижений берутся из каталога, поэтому его версия входит в ETag
+        return self.versioned(request, self._list, extra=catalog.get_snapshot().version)
+
+    def _list(self):
+        # Одна выборка id разблокированных достижений + каталог из памяти
+        rows = catalog.user_achievements(self.request.user, self.request)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(rows)
 
+    @action(detail=False, methods=['get'])
+    def progress(self, request):
+        """Progress towards every achievement, computed from one aggregate query."""
+        stats = achievements.user_stats(request.user)
+        unlocked_ids = {achievement_id for _, achievement_id, _, _ in catalog.unlocked_rows(request.user)}
+        data = []
+        for row in catalog.get_snapshot().rows:
+            entry = achievements.progress(row['requirement'], stats)
+            unlocked = row['id'] in unlocked_ids
+            data.append({
+                'achievement_id': row['id'],
+                'name': row['name'],
+                'achievement_type': row['achievement_type'],
+                'unlocked': unlocked,
+                'current': entry['current'],
+                'target': entry['target'],
+                'percent': 100 if unlocked else entry['percent'],
+            })
+        return Response(data)
 
-class FriendshipViewSet(viewsets.ModelViewSet):
+
+class FriendshipViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for friendship system.
     Users can send friend requests, accept/reject them, and view friends.
     """
     serializer_class = FriendshipSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Тяжелые агрегаты профиля читаются с реплики
+    replica_actions = {'profile'}
 
     def get_queryset(self):
         user = self.request.user
@@ -283,7 +540,7 @@ class FriendshipViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(requests, many=True)
         return Response(serializer.data)
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], throttle_classes=[UserSearchThrottle])
     def search(self, request):
         """Search for users to add as friends."""
         query = request.query_params.get('q', '')
@@ -386,3 +643,61 @@ class FriendshipViewSet(viewsets.ModelViewSet):
                 return game_session.avg_reaction_time <= requirement['min_reaction_time']
         return False
 
+
+class ExportView(APIView):
+    """
+    Full personal data export of the current user as streamed NDJSON.
+
+    Records are read with server-side cursors and encoded as they are sent,
+    so memory stays bounded regardless of history size. Clients that accept
+    gzip get the stream compressed on the fly.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        chunks = exports.ndjson(exports.user_records(request.user))
+        # Потоковое сжатие есть только для gzip; q=0 и '*' разбираются как в CompressionMiddleware
+        compress = compression.accepted_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), codings=('gzip',)) == 'gzip'
+        if compress:
+            chunks = exports.gzipped(chunks)
+
+        response = StreamingHttpResponse(chunks, content_type='application/x-ndjson; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{request.user.username}-export.ndjson"'
+        response['Cache-Control'] = 'private, no-store'
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+
+class SyncView(APIView):
+    """
+    Delta sync: sessions, achievements and friendships of the current user
+    changed or deleted since ?since=<token> (see games/sync.py).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        since = request.query_params.get('since') or None
+        try:
+            data = sync.changes(request.user, since, request)
+        except ValueError:
+            raise ValidationError({'since': ['Некорректный токен синхронизации.']})
+        response = Response(data)
+        response['Cache-Control'] = 'private, no-store'
+        return response
+
+
+class DashboardView(APIView):
+    """
+    Everything the frontend reads on startup in one response; sections whose
+    version the client sends in ?known= are omitted (see games/dashboard.py).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        difficulty, limit = _top_params(request)
+        known = dashboard.parse_known(request.query_params.get('known', ''))
+        response = Response(dashboard.build(request.user, request, known, (difficulty, limit)))
+        response['Cache-Control'] = 'private, no-store'
+        return response
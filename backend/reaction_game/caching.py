@@ -0,0 +1,24 @@
+"""
+Cache timeouts for entries that every worker must see change.
+
+Version tokens (achievement catalog, conditional GET stamps) and similar
+markers are kept without expiry in a shared cache (CACHE_URL). With the
+process-local LocMemCache a write in one worker cannot reach the others,
+so such entries expire after CACHE_LOCAL_TTL seconds instead, which bounds
+how long another worker can serve stale data.
+"""
+from django.conf import settings
+
+
+def coherence_timeout():
+    """Timeout for entries other workers must observe: None when the cache is shared."""
+    if settings.CACHE_SHARED:
+        return None
+    return settings.CACHE_LOCAL_TTL
+
+
+def bounded(seconds):
+    """`seconds`, capped at CACHE_LOCAL_TTL when the cache is process-local."""
+    if settings.CACHE_SHARED:
+        return seconds
+    return min(seconds, settings.CACHE_LOCAL_TTL)
@@ -0,0 +1,96 @@
+"""
+Fast JSON rendering and parsing.
+
+The renderer, parser and JSONField decoder below use orjson when it is
+installed and fall back to the standard library otherwise. Output follows
+DRF's JSONRenderer: datetimes, dates and times go through DRF's own
+encoder, Decimal becomes a float, U+2028/U+2029 are escaped. Two known
+differences remain: very large or small floats spell the exponent without
+"+" or leading zeros (1e16 instead of 1e+16), and NaN/Infinity render as
+null instead of failing the response. Whenever orjson cannot handle the
+data (integers beyond 64 bits, invalid input, indented output) the stdlib
+path runs, so results and error messages are the same.
+"""
+import io
+import json
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - необязательная зависимость
+    orjson = None
+
+UTF8_CHARSETS = {'utf-8', 'utf8'}
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that serializes compact output with orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        # Отступы и ASCII-экранирование orjson не поддерживает
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser that parses UTF-8 request bodies with orjson."""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower() not in UTF8_CHARSETS:
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # Ошибку и нестандартные случаи разбирает stdlib, чтобы ответ совпадал с JSONParser
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class JSONPatchParser(FastJSONParser):
+    """Parser for RFC 6902 documents (application/json-patch+json)."""
+    media_type = 'application/json-patch+json'
+
+
+_stdlib_decoder = json.JSONDecoder()
+
+
+class FastJSONDecoder(json.JSONDecoder):
+    """JSONField decoder: orjson with a stdlib fallback for anything it rejects."""
+
+    def __init__(self, **kwargs):
+        # json.loads() создает декодер на каждое значение, поэтому сканер stdlib
+        # собирается только если переданы нестандартные параметры
+        self._custom = json.JSONDecoder(**kwargs) if kwargs else None
+
+    def decode(self, s, _w=None):
+        if self._custom is not None:
+            return self._custom.decode(s)
+        if orjson is not None:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass
+        return _stdlib_decoder.decode(s)
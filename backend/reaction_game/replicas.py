@@ -0,0 +1,133 @@
+"""
+Read-replica routing.
+
+Views opt in with ReplicaReadMixin; their safe requests read from the
+replica alias. After a user's own successful write, reads are pinned to
+the primary for REPLICA_PIN_SECONDS and for the rest of the request, so
+users always see their own writes. Browsers carry the pin in a cookie.
+Token clients get a signed PIN_HEADER in the response and send it back
+with their next requests; the per-user cache entry covers clients that
+do not, and is only reliable when workers share the cache (CACHE_URL).
+Without a configured replica everything goes to default.
+"""
+import contextvars
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'db_pin'
+PIN_HEADER = 'X-DB-Pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+_wrote = contextvars.ContextVar('wrote', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def _user_pin_key(user_id):
+    return f'db_pin:user:{user_id}'
+
+
+def _pin_signer():
+    return signing.TimestampSigner(salt='reaction_game.replicas.pin')
+
+
+def pin_token(user=None):
+    """Signed pin for PIN_HEADER, bound to the user who wrote."""
+    return _pin_signer().sign(str(user.pk if user is not None and user.is_authenticated else ''))
+
+
+def _header_pinned(request, user):
+    token = request.META.get('HTTP_' + PIN_HEADER.upper().replace('-', '_'))
+    if not token:
+        return False
+    try:
+        owner = _pin_signer().unsign(token, max_age=settings.REPLICA_PIN_SECONDS)
+    except signing.BadSignature:
+        return False
+    return owner == str(user.pk if user is not None and user.is_authenticated else '')
+
+
+def is_pinned(request, user=None):
+    """Whether the client wrote recently and must read from the primary."""
+    if request.COOKIES.get(PIN_COOKIE):
+        return True
+    if _header_pinned(request, user):
+        return True
+    if user is not None and user.is_authenticated:
+        return cache.get(_user_pin_key(user.pk)) is not None
+    return False
+
+
+class ReplicaRouter:
+    """Sends opted-in reads to the replica; everything else to default."""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and not _wrote.get() and replica_configured():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Чтения после записи в том же запросе идут в основную БД
+        _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_ALIAS:
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """Resets routing state per request and pins clients after their writes."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replica_token = _use_replica.set(False)
+        wrote_token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(replica_token)
+            _wrote.reset(wrote_token)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+            # DRF переносит аутентифицированного пользователя в HttpRequest
+            user = getattr(request, 'user', None)
+            response[PIN_HEADER] = pin_token(user)
+            if user is not None and user.is_authenticated:
+                cache.set(_user_pin_key(user.pk), 1, timeout=seconds)
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    DRF view mixin: safe requests read from the replica unless the client
+    is pinned. Set replica_actions to limit it to specific viewset actions.
+    """
+    replica_actions = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS:
+            return
+        if self.replica_actions is not None and getattr(self, 'action', None) not in self.replica_actions:
+            return
+        if not is_pinned(request, request.user):
+            _use_replica.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        _use_replica.set(False)
+        return super().finalize_response(request, response, *args, **kwargs)
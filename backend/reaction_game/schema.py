@@ -0,0 +1,33 @@
+"""
+OpenAPI schema served from memory.
+
+The schema only changes on deploy, so it is generated once per process,
+API version and language, and its compressed bodies are kept by the
+compression middleware (see reaction_game/compression.py).
+"""
+import threading
+
+from django.utils import translation
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework.response import Response
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    _lock = threading.Lock()
+    _schemas = {}
+
+    def _get_schema_response(self, request):
+        version = self.api_version or request.version or self._get_version_parameter(request)
+        key = (version, translation.get_language())
+        schema = self._schemas.get(key)
+        if schema is None:
+            generator = self.generator_class(urlconf=self.urlconf, api_version=version, patterns=self.patterns)
+            schema = generator.get_schema(request=request, public=self.serve_public)
+            with self._lock:
+                self._schemas[key] = schema
+        response = Response(
+            data=schema,
+            headers={'Content-Disposition': f'inline; filename="{self._get_filename(request, version)}"'},
+        )
+        response.cache_compressed = True
+        return response
@@ -3,6 +3,7 @@ Django settings for reaction_game project.
 """
 
 from pathlib import Path
+from corsheaders.defaults import default_headers as default_cors_headers
 from decouple import config
 import os
 
@@ -36,11 +37,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'reaction_game.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'reaction_game.replicas.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -77,6 +80,56 @@ DATABASES = {
     }
 }
 
+# Управление подключениями к БД:
+#   none       - новое подключение на каждый запрос
+#   persistent - переиспользование подключения воркером с проверкой перед запросом (WSGI)
+DB_CONN_MODE = config('DB_CONN_MODE', default='persistent')
+
+if DB_CONN_MODE == 'persistent':
+    DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+elif DB_CONN_MODE != 'none':
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(f"Неизвестный DB_CONN_MODE: {DB_CONN_MODE}")
+
+# Реплика для чтения (лидерборд, профили). Без DB_REPLICA_HOST все идет в default
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'USER': config('DB_REPLICA_USER', default=DATABASES['default']['USER']),
+        'PASSWORD': config('DB_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        'HOST': DB_REPLICA_HOST,
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['reaction_game.replicas.ReplicaRouter']
+
+# Сколько секунд после собственной записи пользователь читает из основной БД
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Общий кеш воркеров: redis://host:6379/0 (пакет redis) или memcached://host:11211 (пакет pymemcache).
+# Версии каталога и ETag, закрепления за основной БД, буфер автосохранений и токен-бакеты
+# согласованы между процессами только с общим кешем. Без CACHE_URL у каждого процесса свой
+# LocMemCache, и метки, которые должны видеть другие воркеры, живут не дольше CACHE_LOCAL_TTL секунд
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+elif CACHE_URL.startswith('memcached://'):
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': CACHE_URL.removeprefix('memcached://'),
+    }}
+elif CACHE_URL:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(f"Неизвестная схема CACHE_URL: {CACHE_URL}")
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+CACHE_SHARED = bool(CACHE_URL)
+CACHE_LOCAL_TTL = config('CACHE_LOCAL_TTL', default=5, cast=int)
+
 # Password validation
 # Password validation
 # Для разработки упрощены требования к паролю
@@ -122,7 +175,7 @@ AUTH_USER_MODEL = 'accounts.User'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -135,8 +188,86 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # orjson с откатом на stdlib (см. reaction_game/fastjson.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'reaction_game.fastjson.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'reaction_game.fastjson.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Токен-бакеты (см. reaction_game/throttling.py): '<scope>_guest' действует для гостей и анонимов,
+    # пустое значение отключает ограничение
+    'DEFAULT_THROTTLE_RATES': {
+        'session_create': config('THROTTLE_SESSION_CREATE_RATE', default='120/min'),
+        'session_create_guest': config('THROTTLE_SESSION_CREATE_GUEST_RATE', default='30/min'),
+        'search': config('THROTTLE_SEARCH_RATE', default='60/min'),
+        'search_guest': config('THROTTLE_SEARCH_GUEST_RATE', default='15/min'),
+        'register': config('THROTTLE_REGISTER_RATE', default='20/hour'),
+        'login': config('THROTTLE_LOGIN_RATE', default='30/min'),
+    },
 }
 
+# Каталог достижений отдается из памяти процесса (см. games/catalog.py); без общего кеша
+# max-age не больше CACHE_LOCAL_TTL
+ACHIEVEMENT_CATALOG_MAX_AGE = config('ACHIEVEMENT_CATALOG_MAX_AGE', default=300, cast=int)
+
+# Скетчи времени реакции для перцентилей (см. games/sketches.py)
+REACTION_SKETCH_RELATIVE_ACCURACY = config('REACTION_SKETCH_RELATIVE_ACCURACY', default=0.01, cast=float)
+REACTION_SKETCH_FLUSH_INTERVAL = config('REACTION_SKETCH_FLUSH_INTERVAL', default=30, cast=int)
+REACTION_SKETCH_FLUSH_EVERY = config('REACTION_SKETCH_FLUSH_EVERY', default=100, cast=int)
+
+# Помесячные секции игровых сессий в PostgreSQL (см. games/partitions.py)
+SESSION_PARTITIONS_AHEAD = config('SESSION_PARTITIONS_AHEAD', default=3, cast=int)
+SESSION_ARCHIVE_DIR = config('SESSION_ARCHIVE_DIR', default=os.path.join(BASE_DIR, 'archive'))
+
+# Сессии старше этого срока сворачиваются в суточные агрегаты (см. games/rollups.py)
+SESSION_RETENTION_DAYS = config('SESSION_RETENTION_DAYS', default=180, cast=int)
+
+# Каталог колоночных выгрузок для аналитики (см. games/analytics.py)
+ANALYTICS_EXPORT_DIR = config('ANALYTICS_EXPORT_DIR', default=os.path.join(BASE_DIR, 'exports'))
+# Выгружаются только сессии до последней, не менявшейся столько секунд: строки с меньшими id
+# из еще открытых транзакций (групповой коммит, импорт) успевают закоммититься
+ANALYTICS_EXPORT_SETTLE_SECONDS = config('ANALYTICS_EXPORT_SETTLE_SECONDS', default=300, cast=int)
+
+# Сжатие ответов brotli/gzip (см. reaction_game/compression.py)
+COMPRESSION_MIN_LENGTH = config('COMPRESSION_MIN_LENGTH', default=1024, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+COMPRESSION_GZIP_LEVEL = config('COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+COMPRESSION_CACHE_ENTRIES = config('COMPRESSION_CACHE_ENTRIES', default=256, cast=int)
+
+# Сколько секунд кешируется топ таблицы лидеров (сбрасывается при изменении записей)
+LEADERBOARD_TOP_CACHE_SECONDS = config('LEADERBOARD_TOP_CACHE_SECONDS', default=30, cast=int)
+
+# Дельта-синхронизация sync/?since= (см. games/sync.py)
+SYNC_OVERLAP_SECONDS = config('SYNC_OVERLAP_SECONDS', default=10, cast=int)
+SYNC_TOKEN_MAX_AGE_DAYS = config('SYNC_TOKEN_MAX_AGE_DAYS', default=30, cast=int)
+SYNC_MAX_CHANGES = config('SYNC_MAX_CHANGES', default=1000, cast=int)
+
+# Состояния игры от этого размера (байты JSON) хранятся сжатыми zlib (см. games/fields.py)
+GAME_STATE_COMPRESS_THRESHOLD = config('GAME_STATE_COMPRESS_THRESHOLD', default=2048, cast=int)
+GAME_STATE_COMPRESS_LEVEL = config('GAME_STATE_COMPRESS_LEVEL', default=6, cast=int)
+
+# Буфер автосохранений (см. games/autosave.py): состояние незавершенных сессий копится в кеше
+# и пишется в БД раз в AUTOSAVE_FLUSH_SECONDS или после AUTOSAVE_MAX_PENDING сохранений.
+# Несколько воркеров должны использовать общий кеш (Redis/Memcached), а не LocMemCache
+AUTOSAVE_BUFFER = config('AUTOSAVE_BUFFER', default=False, cast=bool)
+AUTOSAVE_FLUSH_SECONDS = config('AUTOSAVE_FLUSH_SECONDS', default=30, cast=int)
+AUTOSAVE_MAX_PENDING = config('AUTOSAVE_MAX_PENDING', default=20, cast=int)
+
+# Сводка dashboard/ (см. games/dashboard.py). Параллельное чтение секций выключено по умолчанию:
+# каждый поток открывает собственное подключение к БД
+DASHBOARD_PARALLEL = config('DASHBOARD_PARALLEL', default=False, cast=bool)
+DASHBOARD_WORKERS = config('DASHBOARD_WORKERS', default=4, cast=int)
+
+# Групповой коммит завершенных сессий (см. games/ingest.py): поток процесса пишет накопленные
+# сессии одной транзакцией раз в SESSION_GROUP_COMMIT_DELAY_MS или по SESSION_GROUP_COMMIT_MAX_ROWS штук
+SESSION_GROUP_COMMIT = config('SESSION_GROUP_COMMIT', default=False, cast=bool)
+SESSION_GROUP_COMMIT_DELAY_MS = config('SESSION_GROUP_COMMIT_DELAY_MS', default=10, cast=int)
+SESSION_GROUP_COMMIT_MAX_ROWS = config('SESSION_GROUP_COMMIT_MAX_ROWS', default=500, cast=int)
+
 # JWT Settings
 from datetime import timedelta
 
@@ -145,8 +276,13 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    # Собственный компактный черный список вместо token_blacklist (см. accounts/tokens.py)
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.TokenRefreshSerializer',
 }
 
+# Время жизни кеша пользователя для CachedJWTAuthentication (секунды)
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=60, cast=int)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
@@ -164,6 +300,11 @@ CSRF_TRUSTED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Закрепление за основной БД после записи (reaction_game/replicas.py):
+# клиент читает заголовок из ответа и возвращает его в следующих запросах
+CORS_ALLOW_HEADERS = (*default_cors_headers, 'x-db-pin')
+CORS_EXPOSE_HEADERS = ['X-DB-Pin']
+
 # Security settings
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
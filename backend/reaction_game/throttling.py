@@ -0,0 +1,112 @@
+"""
+Token-bucket request throttling.
+
+A scope's rate 'N/period' in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] is a
+bucket of N requests refilled at N per period, so a client may burst N
+requests and then continue at the sustained rate. Guests (User.is_guest)
+and anonymous clients use the '<scope>_guest' rate when it is set. Users
+are keyed by id, anonymous clients by IP. A missing or empty rate turns
+the scope off.
+
+The bucket is one integer in the cache: the time in microseconds at which
+it will be full again (the theoretical arrival time of GCRA). An allowed
+request costs one atomic cache.incr(). Refilling an idle bucket adds a
+set() and a denial adds a decr(). No history is read and nothing is
+serialized, whatever the rate. Idleness is read from the value, so the
+key only expires to free memory, KEY_TIMEOUT after the bucket was last
+refilled; a client that never idles gets one extra burst per KEY_TIMEOUT.
+Concurrent requests that find the same idle bucket each start it afresh,
+so a few extra requests can pass at that moment. Workers must share the
+cache; the default LocMemCache counts per process.
+"""
+import functools
+import math
+import time
+
+from django.core.cache import cache as default_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+MICROSECONDS = 1_000_000
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+KEY_TIMEOUT = 86400
+
+
+@functools.lru_cache(maxsize=None)
+def parse_rate(rate):
+    """(bucket size, microseconds per token) of 'N/period', or None when off."""
+    if not rate:
+        return None
+    count, period = rate.split('/')
+    count = int(count)
+    return count, PERIODS[period[0]] * MICROSECONDS // count
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle `scope` with a token bucket per client."""
+    scope = None
+    cache = default_cache
+    timer = time.time
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_rate(self, request):
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        user = request.user
+        if user is not None and user.is_authenticated and not getattr(user, 'is_guest', False):
+            return rates.get(self.scope)
+        return rates.get(f'{self.scope}_guest', rates.get(self.scope))
+
+    def get_cache_key(self, request, view):
+        user = request.user
+        if user is not None and user.is_authenticated:
+            return f'throttle:{self.scope}:user:{user.pk}'
+        return f'throttle:{self.scope}:ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        rate = parse_rate(self.get_rate(request))
+        if rate is None:
+            return True
+        size, step = rate
+        burst = size * step
+        key = self.get_cache_key(request, view)
+        now = int(self.timer() * MICROSECONDS)
+
+        try:
+            full_at = self.cache.incr(key, step)
+        except ValueError:
+            full_at = None
+        # Ведро простаивало (ключа нет или оно уже полное): этот запрос берет первый токен
+        if full_at is None or full_at - step < now:
+            self.cache.set(key, now + step, timeout=max(KEY_TIMEOUT, math.ceil(burst / MICROSECONDS)))
+            return True
+        if full_at - now <= burst:
+            return True
+
+        # Отказ не расходует токен
+        try:
+            self.cache.decr(key, step)
+        except ValueError:
+            pass
+        self.retry_after = (full_at - now - burst) / MICROSECONDS
+        return False
+
+    def wait(self):
+        return self.retry_after
+
+
+class SessionCreateThrottle(TokenBucketThrottle):
+    scope = 'session_create'
+
+
+class UserSearchThrottle(TokenBucketThrottle):
+    scope = 'search'
+
+
+class RegisterThrottle(TokenBucketThrottle):
+    scope = 'register'
+
+
+class LoginThrottle(TokenBucketThrottle):
+    scope = 'login'
@@ -4,6 +4,7 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'reaction_game.settings')
 django.setup()
 
+from games.achievements import backfill
 from games.models import Achievement
 
 def seed_achievements():
@@ -31,6 +32,7 @@ def seed_achievements():
         }
     ]
 
+    seeded = []
     for data in achievements:
         achievement, created = Achievement.objects.get_or_create(
             name=data['name'],
@@ -45,6 +47,11 @@ def seed_achievements():
             achievement.points = data['points']
             achievement.save()
             print(f"Достижение '{achievement.name}' обновлено.")
+        seeded.append(achievement)
+
+    # Существующие игроки получают новые достижения сразу, а не после следующей игры
+    awarded = backfill(seeded)
+    print(f"Выдано достижений существующим игрокам: {awarded}")
 
 if __name__ == '__main__':
     seed_achievements()
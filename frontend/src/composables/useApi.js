@@ -11,6 +11,12 @@ const user = ref(null)
 const accessToken = ref(localStorage.getItem('access_token'))
 const refreshToken = ref(localStorage.getItem('refresh_token'))
 
+// Закрепление за основной БД после записи: сервер выдает X-DB-Pin, клиент возвращает его
+let dbPin = null
+
+// Dashboard sections and their versions, kept between dashboard loads
+let dashboardCache = { versions: {}, sections: {} }
+
 // Check if user is authenticated on load
 if (accessToken.value) {
   isAuthenticated.value = true
@@ -31,12 +37,21 @@ async function apiRequest(endpoint, options = {}) {
     headers['Authorization'] = `Bearer ${accessToken.value}`
   }
 
+  if (dbPin) {
+    headers['X-DB-Pin'] = dbPin
+  }
+
   try {
     const response = await fetch(url, {
       ...options,
       headers,
     })
 
+    const pin = response.headers.get('X-DB-Pin')
+    if (pin) {
+      dbPin = pin
+    }
+
     // Handle token refresh on 401
     if (response.status === 401 && refreshToken.value) {
       const refreshed = await refreshAccessToken()
@@ -186,6 +201,7 @@ export const useAuth = () => {
   }
 
   const logout = () => {
+    dashboardCache = { versions: {}, sections: {} }
     accessToken.value = null
     refreshToken.value = null
     user.value = null
@@ -253,6 +269,24 @@ export const useGameSessions = () => {
     }
   }
 
+  // Autosave as an RFC 6902 patch against the known state_version;
+  // a 409 means the state changed elsewhere and must be reloaded
+  const patchGameState = async (sessionId, stateVersion, operations) => {
+    try {
+      const data = await apiRequest(`/games/sessions/${sessionId}/state/?version=${stateVersion}`, {
+        method: 'PATCH',
+        headers: {
+          'Content-Type': 'application/json-patch+json',
+        },
+        body: JSON.stringify(operations),
+      })
+      return data
+    } catch (error) {
+      console.error('Failed to patch game state:', error)
+      throw error
+    }
+  }
+
   const loadLatestSession = async () => {
     try {
       const data = await apiRequest('/games/sessions/latest/')
@@ -276,11 +310,44 @@ export const useGameSessions = () => {
 
   return {
     saveGameSession,
+    patchGameState,
     loadLatestSession,
     getGameSessions,
   }
 }
 
+/**
+ * Startup data in one request: profile, latest session, achievements,
+ * leaderboard top and incoming friend requests. Sections whose version
+ * did not change are not sent again and come from the local copy.
+ */
+export const useDashboard = () => {
+  const loadDashboard = async (limit = 10) => {
+    const known = Object.entries(dashboardCache.versions)
+      .filter(([section]) => section in dashboardCache.sections)
+      .map(([section, version]) => `${section}:${version}`)
+      .join(',')
+    let endpoint = `/games/dashboard/?limit=${limit}`
+    if (known) {
+      endpoint += `&known=${encodeURIComponent(known)}`
+    }
+
+    const data = await apiRequest(endpoint)
+    for (const section of Object.keys(data.versions)) {
+      if (section in data) {
+        dashboardCache.sections[section] = data[section]
+      }
+    }
+    dashboardCache.versions = data.versions
+    user.value = dashboardCache.sections.profile
+    return { ...dashboardCache.sections }
+  }
+
+  return {
+    loadDashboard,
+  }
+}
+
 /**
  * Leaderboard methods
  */